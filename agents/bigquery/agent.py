@@ -1,21 +1,44 @@
+from typing import Any, Optional
+
 from google.adk.agents.llm_agent import Agent
 from google.adk.agents.callback_context import CallbackContext
+from google.adk.tools import BaseTool, ToolContext
 from google.adk.tools.bigquery import BigQueryToolset
 from google.adk.tools.bigquery.config import BigQueryToolConfig, WriteMode
 
 from google.genai import types
 
 from .tools import bigquery_nl2sql
+from .tools.query_cache import QueryResultCache
+from .tools.result_store import ResultStore, summarize_result
+from .tools.result_tools import create_result_tools
+from .tools.nl2sql import MAX_NUM_ROWS, sqlValidationConfig
+from .tools.sql_validator import validate_sql
 
-from .config import BigqueryDataConfig
+from .config import (
+    BigqueryDataConfig,
+    QueryCacheConfig,
+    ResultStoreConfig,
+    SchemaConfig,
+    SqlEngineConfig,
+)
+from .schema import create_schema_provider
 
 # BigQuery built-in tools in ADK
 # https://google.github.io/adk-docs/tools/built-in-tools/#bigquery
 ADK_BUILTIN_BQ_EXECUTE_SQL_TOOL = "execute_sql"
 bigquery_tool_filter = [ADK_BUILTIN_BQ_EXECUTE_SQL_TOOL]
+
+# 実行結果の全行はサーバー側に保存し、モデルには要約と先頭の行だけを渡す
+result_store_config = ResultStoreConfig.from_env()
+result_store = ResultStore(result_store_config) if result_store_config.passthrough else None
+
 bigquery_tool_config = BigQueryToolConfig(
     write_mode=WriteMode.BLOCKED, application_name="bigquery-agent/0.1.0"
 )
+if result_store:
+    # 行はモデルに渡らないので、結果ストアの上限までまとめて取得する
+    bigquery_tool_config.max_query_result_rows = result_store_config.fetch_max_rows
 bigquery_toolset = BigQueryToolset(
     tool_filter=bigquery_tool_filter, bigquery_tool_config=bigquery_tool_config
 )
@@ -23,16 +46,127 @@ bigquery_toolset = BigQueryToolset(
 
 bigquery_data_config = BigqueryDataConfig.from_env()
 
+# SQL_ENGINE=local ではGCPに接続せず、ローカルのCSV・Parquetに対してexecute_sqlを実行する
+sql_engine_config = SqlEngineConfig.from_env()
+local_engine = None
+query_tools = [bigquery_toolset]
+if sql_engine_config.engine == "local":
+    from .tools.local_engine import LocalSqlEngine, create_execute_sql_tool
+
+    local_engine = LocalSqlEngine(
+        sql_engine_config.local_data_dir,
+        bigquery_data_config.data_project_id,
+        bigquery_data_config.dataset_id,
+        bigquery_tool_config.max_query_result_rows,
+        database=sql_engine_config.local_database,
+        threads=sql_engine_config.local_threads,
+        memory_limit=sql_engine_config.local_memory_limit,
+    )
+    query_tools = [create_execute_sql_tool(local_engine)]
 
-def set_database_settings_before_agent_call(callback_context: CallbackContext) -> None:
-    if "database_settings" not in callback_context.state:
+# SCHEMA_SOURCEがstatic以外ならスキーマをカタログから取得する（初回利用時に読み込む）
+schema_provider = create_schema_provider(SchemaConfig.from_env(), bigquery_data_config)
+
+
+async def set_database_settings_before_agent_call(callback_context: CallbackContext) -> None:
+    schema = bigquery_data_config.schema
+    if schema_provider:
+        # 取得に失敗した場合は固定のスキーマを使う
+        schema = await schema_provider.get() or schema
+
+    settings = callback_context.state.get("database_settings")
+    if settings is None or settings.get("schema") != schema:
         callback_context.state["database_settings"] = {
             "data_project_id": bigquery_data_config.data_project_id,
             "dataset_id": bigquery_data_config.dataset_id,
-            "schema": bigquery_data_config.schema,
+            "schema": schema,
         }
 
 
+async def validate_sql_before_tool_call(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext
+) -> Optional[dict]:
+    if tool.name != ADK_BUILTIN_BQ_EXECUTE_SQL_TOOL or not sqlValidationConfig.enabled:
+        return None
+    # スキーマに合わないSQLはBigQueryに送らずにエラーを返す
+    validation = validate_sql(
+        args.get("query", ""), tool_context.state["database_settings"]["schema"], MAX_NUM_ROWS
+    )
+    if not validation.ok:
+        return validation.to_error_response()
+    args["query"] = validation.sql
+    return None
+
+
+# WriteMode.BLOCKEDで読み取り専用なので、同じSQLの実行結果はキャッシュから返す
+query_cache_config = QueryCacheConfig.from_env()
+query_result_cache = QueryResultCache(query_cache_config) if query_cache_config.enabled else None
+
+
+async def lookup_query_cache_before_tool_call(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext
+) -> Optional[dict]:
+    if tool.name != ADK_BUILTIN_BQ_EXECUTE_SQL_TOOL or query_result_cache is None:
+        return None
+    return await query_result_cache.get(
+        args.get("project_id", ""),
+        tool_context.state["database_settings"]["dataset_id"],
+        args.get("query", ""),
+    )
+
+
+async def store_query_cache_after_tool_call(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext, tool_response: dict
+) -> Optional[dict]:
+    if tool.name != ADK_BUILTIN_BQ_EXECUTE_SQL_TOOL or query_result_cache is None:
+        return None
+    await query_result_cache.put(
+        args.get("project_id", ""),
+        tool_context.state["database_settings"]["dataset_id"],
+        args.get("query", ""),
+        tool_response,
+    )
+    return None
+
+
+async def pass_through_result_after_tool_call(
+    tool: BaseTool, args: dict[str, Any], tool_context: ToolContext, tool_response: dict
+) -> Optional[dict]:
+    if (
+        tool.name != ADK_BUILTIN_BQ_EXECUTE_SQL_TOOL
+        or result_store is None
+        or tool_response.get("status") != "SUCCESS"
+        or "rows" not in tool_response
+    ):
+        return None
+    stored = result_store.put(
+        tool_context.session.user_id,
+        tool_context.session.id,
+        args.get("query", ""),
+        tool_response,
+    )
+    return summarize_result(stored, result_store_config.top_k_rows)
+
+
+result_tools = []
+if result_store:
+    SQL_RESULTS_INSTRUCTION = f"""the "result_handle" returned by
+            {ADK_BUILTIN_BQ_EXECUTE_SQL_TOOL}. The full rows are sent to the user
+            directly, so NEVER copy rows into the answer"""
+    # 保存した結果の続きのページや集計は、再実行せずに結果ストアから返す
+    result_tools = create_result_tools(result_store)
+    RESULT_TOOLS_INSTRUCTION = """
+        For follow-up questions about a result that was already executed, use
+        fetch_result_page to read more rows and aggregate_result for counts,
+        totals, averages, minimums and maximums (optionally per group) with its
+        result_handle, instead of generating and executing the SQL again.
+    """
+else:
+    SQL_RESULTS_INSTRUCTION = f"""raw sql execution query_result from
+            {ADK_BUILTIN_BQ_EXECUTE_SQL_TOOL}"""
+    RESULT_TOOLS_INSTRUCTION = ""
+
+
 root_agent = Agent(
     model="gemini-2.0-flash",
     name="bigquery_agent",
@@ -49,8 +183,7 @@ root_agent = Agent(
         * "explain": "write out step-by-step reasoning to explain how you are
             generating the query based on the schema, example, and question.",
         * "sql": "Output your generated SQL!",
-        * "sql_results": "raw sql execution query_result from
-            {ADK_BUILTIN_BQ_EXECUTE_SQL_TOOL}"
+        * "sql_results": "{SQL_RESULTS_INSTRUCTION}"
         * "nl_results": "Natural language summary of results, otherwise None if
             generated SQL is invalid"
         4. If there are any syntax errors in the query, go back and address the
@@ -66,8 +199,12 @@ root_agent = Agent(
         NOTE: you must ALWAYS PASS the project_id
         {bigquery_data_config.data_project_id} to the execute_sql tool. DO NOT
         pass any other project id.
+        {RESULT_TOOLS_INSTRUCTION}
     """,
-    tools=[bigquery_nl2sql, bigquery_toolset],
+    tools=[bigquery_nl2sql, *query_tools, *result_tools],
     before_agent_callback=set_database_settings_before_agent_call,
+    before_tool_callback=[validate_sql_before_tool_call, lookup_query_cache_before_tool_call],
+    # キャッシュには全行を保存してから、モデルに渡す結果を要約に差し替える
+    after_tool_callback=[store_query_cache_after_tool_call, pass_through_result_after_tool_call],
     generate_content_config=types.GenerateContentConfig(temperature=0.01),
 )
@@ -1,4 +1,21 @@
 from .nl2sql_model import Nl2SqlModelConfig
 from .bigquery_data_config import BigqueryDataConfig
+from .nl2sql_cache_config import Nl2SqlCacheConfig
+from .nl2sql_candidate_config import Nl2SqlCandidateConfig
+from .query_cache_config import QueryCacheConfig
+from .result_store_config import ResultStoreConfig
+from .schema_config import SchemaConfig
+from .sql_engine_config import SqlEngineConfig
+from .sql_validation_config import SqlValidationConfig
 
-__all__ = ["Nl2SqlModelConfig", "BigqueryDataConfig"]
+__all__ = [
+    "Nl2SqlModelConfig",
+    "BigqueryDataConfig",
+    "Nl2SqlCacheConfig",
+    "Nl2SqlCandidateConfig",
+    "QueryCacheConfig",
+    "ResultStoreConfig",
+    "SchemaConfig",
+    "SqlEngineConfig",
+    "SqlValidationConfig",
+]
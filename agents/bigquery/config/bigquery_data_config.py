@@ -21,7 +21,7 @@ class BigqueryDataConfig:
         return cls(
             data_project_id=os.environ["BQ_DATA_PROJECT_ID"],
             dataset_id=os.environ["BQ_DATASET_ID"],
-            # TODO: big queryのschemaを自動取得するようにする
+            # SCHEMA_SOURCE=bigquery / local ではカタログから取得したスキーマを使う
             schema=f"""
                 table: `{os.environ["BQ_DATASET_ID"]}.products`
                 columns:
@@ -0,0 +1,27 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class Nl2SqlCacheConfig:
+    enabled: bool
+    path: str
+    max_entries: int
+    ttl: float
+    templates: bool
+
+    @classmethod
+    def from_env(cls) -> "Nl2SqlCacheConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            Nl2SqlCacheConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            enabled=os.getenv("NL2SQL_CACHE_ENABLED", "1") == "1",
+            # 空文字ならディスクに永続化せずメモリだけで保持する
+            path=os.getenv("NL2SQL_CACHE_PATH", ".cache/nl2sql_cache.db"),
+            max_entries=int(os.getenv("NL2SQL_CACHE_MAX_ENTRIES", "5000")),
+            ttl=float(os.getenv("NL2SQL_CACHE_TTL", "86400")),
+            templates=os.getenv("NL2SQL_CACHE_TEMPLATES", "1") == "1",
+        )
@@ -0,0 +1,43 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class Nl2SqlCandidateConfig:
+    mode: str
+    candidates: int
+    temperatures: list[float]
+    hedge_percentile: float
+    hedge_initial_delay: float
+    hedge_min_samples: int
+    latency_window: int
+
+    @classmethod
+    def from_env(cls) -> "Nl2SqlCandidateConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            Nl2SqlCandidateConfig: Configuration instance populated from environment variables.
+
+        Raises:
+            ValueError: If NL2SQL_CANDIDATE_MODE is not one of single, parallel or hedged.
+        """
+        mode = os.getenv("NL2SQL_CANDIDATE_MODE", "single")
+        if mode not in ("single", "parallel", "hedged"):
+            raise ValueError(f"Unsupported NL2SQL_CANDIDATE_MODE: {mode}")
+        return cls(
+            # single: 1回だけ生成, parallel: 候補を同時に生成して最初に検証を通ったものを使う,
+            # hedged: 最初の生成が遅い（レイテンシのパーセンタイルを超えた）場合だけ次の候補を出す
+            mode=mode,
+            candidates=max(1, int(os.getenv("NL2SQL_CANDIDATES", "3"))),
+            # 候補ごとの温度（候補数より少なければ繰り返して使う）
+            temperatures=[
+                float(value)
+                for value in os.getenv("NL2SQL_CANDIDATE_TEMPERATURES", "0.1,0.5,0.9").split(",")
+            ],
+            hedge_percentile=float(os.getenv("NL2SQL_HEDGE_PERCENTILE", "90")),
+            # レイテンシの標本が少ないうちは固定の待ち時間を使う
+            hedge_initial_delay=float(os.getenv("NL2SQL_HEDGE_INITIAL_DELAY", "10")),
+            hedge_min_samples=int(os.getenv("NL2SQL_HEDGE_MIN_SAMPLES", "20")),
+            latency_window=int(os.getenv("NL2SQL_LATENCY_WINDOW", "200")),
+        )
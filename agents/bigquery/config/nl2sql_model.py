@@ -7,6 +7,8 @@ class Nl2SqlModelConfig:
     google_cloud_project: str
     google_cloud_location: str
     nl2sql_model: str
+    timeout: float
+    max_concurrency: int
 
     @classmethod
     def from_env(cls) -> "Nl2SqlModelConfig":
@@ -22,4 +24,6 @@ class Nl2SqlModelConfig:
             google_cloud_project=os.environ["GOOGLE_CLOUD_PROJECT"],
             google_cloud_location=os.environ["GOOGLE_CLOUD_LOCATION"],
             nl2sql_model=os.environ["NL2SQL_MODEL"],
+            timeout=float(os.getenv("NL2SQL_TIMEOUT", "90")),
+            max_concurrency=int(os.getenv("NL2SQL_MAX_CONCURRENCY", "8")),
         )
@@ -0,0 +1,29 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class QueryCacheConfig:
+    enabled: bool
+    ttl: float
+    max_bytes: int
+    max_entry_bytes: int
+    spill_dir: str
+    spill_max_bytes: int
+
+    @classmethod
+    def from_env(cls) -> "QueryCacheConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            QueryCacheConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            enabled=os.getenv("QUERY_CACHE_ENABLED", "1") == "1",
+            ttl=float(os.getenv("QUERY_CACHE_TTL", "300")),
+            max_bytes=int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            max_entry_bytes=int(os.getenv("QUERY_CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024))),
+            # 空文字ならメモリから溢れた結果は破棄する
+            spill_dir=os.getenv("QUERY_CACHE_SPILL_DIR", ""),
+            spill_max_bytes=int(os.getenv("QUERY_CACHE_SPILL_MAX_BYTES", str(512 * 1024 * 1024))),
+        )
@@ -0,0 +1,41 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class ResultStoreConfig:
+    passthrough: bool
+    top_k_rows: int
+    max_bytes: int
+    session_max_bytes: int
+    ttl: float
+    stream_chunk_rows: int
+    fetch_max_rows: int
+    page_rows: int
+    max_groups: int
+
+    @classmethod
+    def from_env(cls) -> "ResultStoreConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            ResultStoreConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            # 有効にするとexecute_sqlの結果はサーバー側に保存し、モデルには要約と先頭の行だけを渡す。
+            # 全行はクライアントへ直接ストリーミングする
+            passthrough=os.getenv("RESULT_PASSTHROUGH", "0") == "1",
+            top_k_rows=int(os.getenv("RESULT_TOP_K_ROWS", "5")),
+            max_bytes=int(os.getenv("RESULT_STORE_MAX_BYTES", str(256 * 1024 * 1024))),
+            # 1セッションが保持できる結果の合計。超える分は古い結果から捨て、1つの結果が超える場合は途中で打ち切る
+            session_max_bytes=int(
+                os.getenv("RESULT_STORE_SESSION_MAX_BYTES", str(16 * 1024 * 1024))
+            ),
+            ttl=float(os.getenv("RESULT_STORE_TTL", "3600")),
+            stream_chunk_rows=int(os.getenv("RESULT_STREAM_CHUNK_ROWS", "500")),
+            # パススルー時は行がモデルに渡らないので、execute_sqlで取得する行数の上限を引き上げる
+            fetch_max_rows=int(os.getenv("RESULT_FETCH_MAX_ROWS", "10000")),
+            # fetch_result_pageの1ページの行数とaggregate_resultが返すグループ数の上限
+            page_rows=int(os.getenv("RESULT_PAGE_ROWS", "50")),
+            max_groups=int(os.getenv("RESULT_AGGREGATE_MAX_GROUPS", "100")),
+        )
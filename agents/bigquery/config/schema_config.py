@@ -0,0 +1,41 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class SchemaConfig:
+    source: str
+    cache_dir: str
+    refresh_interval: float
+    sample_rows: int
+    local_data_dir: str
+    prune_min_tables: int
+    top_k_tables: int
+    max_columns_per_table: int
+
+    @classmethod
+    def from_env(cls) -> "SchemaConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            SchemaConfig: Configuration instance populated from environment variables.
+
+        Raises:
+            ValueError: If SCHEMA_SOURCE is not one of static, bigquery or local.
+        """
+        source = os.getenv("SCHEMA_SOURCE", "static")
+        if source not in ("static", "bigquery", "local"):
+            raise ValueError(f"Unsupported SCHEMA_SOURCE: {source}")
+        return cls(
+            # static: BigqueryDataConfigの固定スキーマ, bigquery: INFORMATION_SCHEMAから取得,
+            # local: CSVのディレクトリをカタログとして使う（テスト・ローカル実行用）
+            source=source,
+            cache_dir=os.getenv("SCHEMA_CACHE_DIR", ".cache/schema"),
+            refresh_interval=float(os.getenv("SCHEMA_REFRESH_INTERVAL", "3600")),
+            sample_rows=int(os.getenv("SCHEMA_SAMPLE_ROWS", "3")),
+            local_data_dir=os.getenv("SCHEMA_LOCAL_DATA_DIR", "agents/bigquery/data"),
+            # テーブル数がこれを超えるスキーマは質問に関係するテーブルと列だけをプロンプトに入れる
+            prune_min_tables=int(os.getenv("SCHEMA_PRUNE_MIN_TABLES", "8")),
+            top_k_tables=int(os.getenv("SCHEMA_TOP_K_TABLES", "5")),
+            max_columns_per_table=int(os.getenv("SCHEMA_MAX_COLUMNS_PER_TABLE", "30")),
+        )
@@ -0,0 +1,36 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class SqlEngineConfig:
+    engine: str
+    local_data_dir: str
+    local_database: str
+    local_threads: int
+    local_memory_limit: str
+
+    @classmethod
+    def from_env(cls) -> "SqlEngineConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            SqlEngineConfig: Configuration instance populated from environment variables.
+
+        Raises:
+            ValueError: If SQL_ENGINE is not one of bigquery or local.
+        """
+        engine = os.getenv("SQL_ENGINE", "bigquery")
+        if engine not in ("bigquery", "local"):
+            raise ValueError(f"Unsupported SQL_ENGINE: {engine}")
+        return cls(
+            # bigquery: BigQueryToolsetのexecute_sql,
+            # local: データディレクトリのCSV・ParquetをDuckDBに読み込んで実行する（開発・ベンチマーク用）
+            engine=engine,
+            local_data_dir=os.getenv("LOCAL_ENGINE_DATA_DIR", "agents/bigquery/data"),
+            # ファイルを指定すると読み込んだテーブルを保存し、変更のないファイルは再起動時に読み直さない
+            local_database=os.getenv("LOCAL_ENGINE_DATABASE", ":memory:"),
+            # 0 はDuckDBの既定値（CPU数）
+            local_threads=int(os.getenv("LOCAL_ENGINE_THREADS", "0")),
+            local_memory_limit=os.getenv("LOCAL_ENGINE_MEMORY_LIMIT", ""),
+        )
@@ -0,0 +1,21 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class SqlValidationConfig:
+    enabled: bool
+    repair_attempts: int
+
+    @classmethod
+    def from_env(cls) -> "SqlValidationConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            SqlValidationConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            enabled=os.getenv("SQL_VALIDATION_ENABLED", "1") == "1",
+            # 検証エラーをNL2SQLモデルに返して生成し直す回数
+            repair_attempts=int(os.getenv("NL2SQL_REPAIR_ATTEMPTS", "1")),
+        )
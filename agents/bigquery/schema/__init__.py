@@ -0,0 +1,42 @@
+from pathlib import Path
+from typing import Optional
+
+from ..config import BigqueryDataConfig, SchemaConfig
+from .catalog import BigQueryCatalog, LocalCatalog, TableSchema, render_schema
+from .index import SchemaIndex, prune_schema
+from .provider import SchemaProvider
+
+
+def create_schema_provider(
+    config: SchemaConfig, data_config: BigqueryDataConfig
+) -> Optional[SchemaProvider]:
+    """Builds the schema provider for SCHEMA_SOURCE, or None for the static schema."""
+    if config.source == "static":
+        return None
+    if config.source == "bigquery":
+        catalog = BigQueryCatalog(data_config.data_project_id, data_config.dataset_id)
+    else:
+        catalog = LocalCatalog(config.local_data_dir)
+    cache_path = (
+        Path(config.cache_dir)
+        / f"{config.source}.{data_config.data_project_id}.{data_config.dataset_id}.json"
+    )
+    return SchemaProvider(
+        catalog,
+        data_config.dataset_id,
+        cache_path,
+        config.refresh_interval,
+        config.sample_rows,
+    )
+
+
+__all__ = [
+    "BigQueryCatalog",
+    "LocalCatalog",
+    "SchemaIndex",
+    "SchemaProvider",
+    "TableSchema",
+    "create_schema_provider",
+    "prune_schema",
+    "render_schema",
+]
@@ -0,0 +1,289 @@
+import csv
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ColumnSchema:
+    name: str
+    data_type: str
+    description: str = ""
+
+
+@dataclass
+class TableSchema:
+    name: str
+    version: str
+    description: str = ""
+    columns: list[ColumnSchema] = field(default_factory=list)
+    sample_rows: list[dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TableSchema":
+        return cls(
+            name=data["name"],
+            version=data["version"],
+            description=data.get("description", ""),
+            columns=[ColumnSchema(**column) for column in data.get("columns", [])],
+            sample_rows=data.get("sample_rows", []),
+        )
+
+
+class SchemaCatalog(Protocol):
+    """Source of table metadata. Methods are blocking and run in a worker thread."""
+
+    def list_tables(self) -> dict[str, str]:
+        """Returns a version string (last modification time, etag) per table."""
+        ...
+
+    def describe_tables(
+        self, names: list[str], versions: dict[str, str], sample_rows: int
+    ) -> dict[str, TableSchema]:
+        """Fetches columns, descriptions and sample rows of the given tables."""
+        ...
+
+
+class BigQueryCatalog:
+    """
+    Catalog backed by the dataset's INFORMATION_SCHEMA views.
+
+    Table versions come from ``__TABLES__.last_modified_time`` so unchanged
+    tables are never described again. Sample rows are read with
+    ``list_rows``, which does not run a query.
+    """
+
+    def __init__(self, project_id: str, dataset_id: str):
+        self.project_id = project_id
+        self.dataset_id = dataset_id
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google.cloud import bigquery
+
+            self._client = bigquery.Client(project=self.project_id)
+        return self._client
+
+    def list_tables(self) -> dict[str, str]:
+        rows = self.client.query_and_wait(
+            f"SELECT table_id, last_modified_time "
+            f"FROM `{self.project_id}.{self.dataset_id}.__TABLES__`"
+        )
+        return {row["table_id"]: str(row["last_modified_time"]) for row in rows}
+
+    def describe_tables(
+        self, names: list[str], versions: dict[str, str], sample_rows: int
+    ) -> dict[str, TableSchema]:
+        from google.cloud import bigquery
+
+        if not names:
+            return {}
+        dataset = f"{self.project_id}.{self.dataset_id}"
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("tables", "STRING", names)]
+        )
+
+        tables = {name: TableSchema(name=name, version=versions[name]) for name in names}
+        columns = self.client.query_and_wait(
+            f"""
+            SELECT c.table_name, c.column_name, c.data_type, f.description
+            FROM `{dataset}.INFORMATION_SCHEMA.COLUMNS` AS c
+            LEFT JOIN `{dataset}.INFORMATION_SCHEMA.COLUMN_FIELD_PATHS` AS f
+              ON f.table_name = c.table_name
+              AND f.column_name = c.column_name
+              AND f.field_path = c.column_name
+            WHERE c.table_name IN UNNEST(@tables)
+            ORDER BY c.table_name, c.ordinal_position
+            """,
+            job_config=job_config,
+        )
+        for row in columns:
+            tables[row["table_name"]].columns.append(
+                ColumnSchema(row["column_name"], row["data_type"], row["description"] or "")
+            )
+
+        options = self.client.query_and_wait(
+            f"""
+            SELECT table_name, option_value
+            FROM `{dataset}.INFORMATION_SCHEMA.TABLE_OPTIONS`
+            WHERE option_name = 'description' AND table_name IN UNNEST(@tables)
+            """,
+            job_config=job_config,
+        )
+        for row in options:
+            tables[row["table_name"]].description = _unquote_option(row["option_value"])
+
+        if sample_rows > 0:
+            for table in tables.values():
+                try:
+                    rows = self.client.list_rows(f"{dataset}.{table.name}", max_results=sample_rows)
+                    table.sample_rows = [dict(row.items()) for row in rows]
+                except Exception:
+                    # ビューなどlist_rowsで読めないテーブルは例を付けない
+                    logger.debug("No sample rows for %s", table.name, exc_info=True)
+        return tables
+
+
+class LocalCatalog:
+    """
+    Stand-in catalog over a directory of CSV files, one table per file.
+
+    Column types are inferred from the values unless a ``<table>.schema.json``
+    sidecar gives them, together with table and column descriptions. The
+    version of a table is the size and modification time of its files.
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = Path(data_dir)
+
+    def list_tables(self) -> dict[str, str]:
+        versions = {}
+        for csv_path in sorted(self.data_dir.glob("*.csv")):
+            parts = []
+            for path in (csv_path, csv_path.with_suffix(".schema.json")):
+                if path.exists():
+                    stat = path.stat()
+                    parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+            versions[csv_path.stem] = "/".join(parts)
+        return versions
+
+    def describe_tables(
+        self, names: list[str], versions: dict[str, str], sample_rows: int
+    ) -> dict[str, TableSchema]:
+        return {name: self._describe(name, versions[name], sample_rows) for name in names}
+
+    def _describe(self, name: str, version: str, sample_rows: int) -> TableSchema:
+        sidecar = self._sidecar(name)
+        column_meta = sidecar.get("columns", {})
+
+        with (self.data_dir / f"{name}.csv").open(encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            rows = list(reader)
+            header = reader.fieldnames or []
+
+        columns = []
+        for column in header:
+            meta = column_meta.get(column, {})
+            data_type = meta.get("type") or _infer_type(row[column] for row in rows)
+            columns.append(ColumnSchema(column, data_type, meta.get("description", "")))
+
+        samples = [
+            {column.name: _convert(row[column.name], column.data_type) for column in columns}
+            for row in rows[:sample_rows]
+        ]
+
+        return TableSchema(
+            name=name,
+            version=version,
+            description=sidecar.get("description", ""),
+            columns=columns,
+            sample_rows=samples,
+        )
+
+    def _sidecar(self, name: str) -> dict:
+        path = self.data_dir / f"{name}.schema.json"
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text(encoding="utf-8"))
+
+
+def render_schema(dataset_id: str, tables: list[TableSchema]) -> str:
+    """Renders tables in the schema text format used by the NL2SQL prompt."""
+    blocks = []
+    for table in sorted(tables, key=lambda table: table.name):
+        lines = [f"table: `{dataset_id}.{table.name}`"]
+        if table.description:
+            lines.append(f"description: {table.description}")
+        lines.append("columns:")
+        for column in table.columns:
+            suffix = f": {column.description}" if column.description else ""
+            lines.append(f"- {column.name} ({column.data_type}){suffix}")
+        if table.sample_rows:
+            names = [column.name for column in table.columns]
+            lines.append("")
+            lines.append("example_values:")
+            lines.append(" | ".join(names))
+            lines.append(" | ".join("-" * len(name) for name in names))
+            for row in table.sample_rows:
+                lines.append(" | ".join(_format_value(row.get(name)) for name in names))
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float, bool)):
+        return str(value)
+    return f"'{value}'"
+
+
+def _infer_type(values) -> str:
+    data_type: Optional[str] = None
+    for value in values:
+        if value == "":
+            continue
+        if _is_int(value):
+            candidate = "INT64"
+        elif _is_float(value):
+            candidate = "FLOAT64"
+        elif value.lower() in ("true", "false"):
+            candidate = "BOOL"
+        else:
+            return "STRING"
+        if data_type is None or data_type == candidate:
+            data_type = candidate
+        elif {data_type, candidate} == {"INT64", "FLOAT64"}:
+            data_type = "FLOAT64"
+        else:
+            return "STRING"
+    return data_type or "STRING"
+
+
+def _convert(value: str, data_type: str) -> Any:
+    if value == "":
+        return None
+    try:
+        if data_type == "INT64":
+            return int(value)
+        if data_type == "FLOAT64":
+            number = float(value)
+            return int(number) if number.is_integer() else number
+        if data_type == "BOOL":
+            return value.lower() == "true"
+    except ValueError:
+        pass
+    return value
+
+
+def _is_int(value: str) -> bool:
+    try:
+        int(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_float(value: str) -> bool:
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _unquote_option(value: str) -> str:
+    # TABLE_OPTIONSの値はSQLの文字列リテラル（"..."）で返る
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return value or ""
@@ -0,0 +1,244 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+_ASCII_WORD = re.compile(r"[a-z0-9]+")
+# 英数字・記号・空白以外の連続（日本語など）は文字bigramで扱う
+_NON_ASCII_RUN = re.compile(r"[^\x00-\x7f\s、。・，．！？「」『』（）]+")
+# 型は NUMERIC(10, 2) のように括弧を含むので、列名と開き括弧までを正規表現で取り、残りは括弧の対応で読む
+_COLUMN_NAME = re.compile(r"^-\s*([\w.]+)\s*\(")
+
+# BM25のパラメータとフィールドごとの重み
+_K1 = 1.2
+_B = 0.75
+_TABLE_NAME_WEIGHT = 3
+_COLUMN_NAME_WEIGHT = 2
+_TEXT_WEIGHT = 1
+
+
+def tokenize(text: str) -> list[str]:
+    """Splits identifiers on underscores and non-ASCII text into character bigrams."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens = _ASCII_WORD.findall(text)
+    for run in _NON_ASCII_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+@dataclass
+class _Column:
+    line: str
+    name: str
+    tokens: Counter
+
+
+@dataclass
+class _Table:
+    name: str
+    header: list[str]
+    columns: list[_Column] = field(default_factory=list)
+    example_header: list[str] = field(default_factory=list)
+    example_rows: list[list[str]] = field(default_factory=list)
+    # 読めない列の行があった場合はFalse（列の一覧が不完全）
+    columns_complete: bool = True
+    raw: list[str] = field(default_factory=list)
+    tokens: Counter = field(default_factory=Counter)
+    length: int = 0
+
+
+class SchemaIndex:
+    """
+    Lexical index over one version of the schema text.
+
+    The text is split into per-table blocks in the format written by
+    ``render_schema`` (and the hand-written static schema). Table names,
+    column names, descriptions and example values are indexed with BM25,
+    names weighted above free text. ``prune`` keeps the top-k tables for a
+    question and, for wide tables, only the best matching columns.
+    """
+
+    def __init__(self, schema: str):
+        self.preamble: list[str] = []
+        self.tables: list[_Table] = _parse(schema, self.preamble)
+        self._document_frequency: Counter = Counter()
+        for table in self.tables:
+            self._document_frequency.update(table.tokens.keys())
+        self._average_length = (
+            sum(table.length for table in self.tables) / len(self.tables) if self.tables else 0
+        )
+
+    def score_tables(self, question: str) -> list[tuple[float, _Table]]:
+        query = set(tokenize(question))
+        scored = []
+        for table in self.tables:
+            score = 0.0
+            for token in query:
+                frequency = table.tokens.get(token)
+                if not frequency:
+                    continue
+                score += self._idf(token) * (
+                    frequency
+                    * (_K1 + 1)
+                    / (frequency + _K1 * (1 - _B + _B * table.length / self._average_length))
+                )
+            scored.append((score, table))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored
+
+    def prune(self, question: str, top_k_tables: int, max_columns: int) -> str | None:
+        """Returns schema text limited to the tables relevant to the question.
+
+        Returns:
+            str | None: The pruned schema, or None when nothing in the
+            question matches any table (the caller should keep the full
+            schema then).
+        """
+        scored = [item for item in self.score_tables(question) if item[0] > 0]
+        if not scored:
+            return None
+        query = set(tokenize(question))
+        blocks = [self._render(table, query, max_columns) for _, table in scored[:top_k_tables]]
+        if self.preamble:
+            blocks.insert(0, "\n".join(self.preamble))
+        return "\n\n".join(blocks)
+
+    def _idf(self, token: str) -> float:
+        frequency = self._document_frequency[token]
+        return math.log(1 + (len(self.tables) - frequency + 0.5) / (frequency + 0.5))
+
+    def _render(self, table: _Table, query: set[str], max_columns: int) -> str:
+        if not table.columns or len(table.columns) <= max_columns:
+            return "\n".join(table.raw)
+
+        # 質問に一致する列を優先し、残りは元の順序（キー列が先頭に来やすい）で埋める
+        ranked = sorted(
+            range(len(table.columns)),
+            key=lambda i: (
+                -sum(self._idf(token) for token in query if token in table.columns[i].tokens),
+                i,
+            ),
+        )
+        keep = sorted(ranked[:max_columns])
+        lines = list(table.header)
+        lines.append("columns:")
+        lines.extend(table.columns[i].line for i in keep)
+
+        if len(table.example_header) == len(table.columns) and all(
+            len(row) == len(table.example_header) for row in table.example_rows
+        ):
+            lines.append("")
+            lines.append("example_values:")
+            names = [table.example_header[i] for i in keep]
+            lines.append(" | ".join(names))
+            lines.append(" | ".join("-" * len(name) for name in names))
+            for row in table.example_rows:
+                lines.append(" | ".join(row[i] for i in keep))
+        return "\n".join(lines)
+
+
+def _parse(schema: str, preamble: list[str]) -> list[_Table]:
+    tables: list[_Table] = []
+    current: _Table | None = None
+    section = "header"
+    for raw_line in schema.strip().splitlines():
+        line = raw_line.strip()
+        if line.startswith("table:"):
+            current = _Table(name=line[len("table:") :].strip().strip("`"), header=[line])
+            current.raw.append(line)
+            _add_tokens(current, current.name, _TABLE_NAME_WEIGHT)
+            tables.append(current)
+            section = "header"
+            continue
+        if current is None:
+            if line:
+                preamble.append(line)
+            continue
+
+        current.raw.append(line)
+        if line == "columns:":
+            section = "columns"
+        elif line == "example_values:":
+            section = "examples"
+        elif section == "columns" and line.startswith("-"):
+            parsed = _parse_column(line)
+            if parsed is None:
+                # 列名が分からない行も、検索と表示のために列として残す
+                current.columns_complete = False
+                current.columns.append(_Column(line=line, name="", tokens=Counter(tokenize(line))))
+                _add_tokens(current, line, _TEXT_WEIGHT)
+                continue
+            name, _, description = parsed
+            tokens = Counter(tokenize(f"{name} {description}"))
+            current.columns.append(_Column(line=line, name=name, tokens=tokens))
+            _add_tokens(current, name, _COLUMN_NAME_WEIGHT)
+            _add_tokens(current, description, _TEXT_WEIGHT)
+        elif section == "examples" and line:
+            cells = [cell.strip() for cell in line.split("|")]
+            if not current.example_header:
+                current.example_header = cells
+            elif not all(set(cell) <= {"-"} for cell in cells):
+                current.example_rows.append(cells)
+                _add_tokens(current, " ".join(cells), _TEXT_WEIGHT)
+                for column, cell in zip(current.columns, cells):
+                    column.tokens.update(tokenize(cell))
+        elif section == "header" and line:
+            current.header.append(line)
+            _add_tokens(current, line, _TEXT_WEIGHT)
+
+    for table in tables:
+        while table.raw and not table.raw[-1]:
+            table.raw.pop()
+    return tables
+
+
+def _parse_column(line: str) -> tuple[str, str, str] | None:
+    """Splits ``- name (TYPE): description`` into name, type and description."""
+    match = _COLUMN_NAME.match(line)
+    if not match:
+        return None
+    depth = 0
+    for end in range(match.end() - 1, len(line)):
+        if line[end] == "(":
+            depth += 1
+        elif line[end] == ")":
+            depth -= 1
+            if depth == 0:
+                break
+    else:
+        return None
+    rest = line[end + 1 :].strip()
+    if rest and not rest.startswith(":"):
+        return None
+    return match.group(1), line[match.end() : end].strip(), rest[1:].strip()
+
+
+def _add_tokens(table: _Table, text: str, weight: int):
+    tokens = tokenize(text)
+    for token in tokens:
+        table.tokens[token] += weight
+    table.length += len(tokens) * weight
+
+
+@lru_cache(maxsize=8)
+def schema_index(schema: str) -> SchemaIndex:
+    """Builds the index once per schema text (i.e. per schema version)."""
+    return SchemaIndex(schema)
+
+
+def prune_schema(
+    question: str, schema: str, min_tables: int, top_k_tables: int, max_columns: int
+) -> str:
+    """Schema text to put in the NL2SQL prompt for a question.
+
+    Small schemas (at most ``min_tables`` tables) are returned unchanged.
+    """
+    index = schema_index(schema)
+    if len(index.tables) <= min_tables:
+        return schema
+    return index.prune(question, top_k_tables, max_columns) or schema
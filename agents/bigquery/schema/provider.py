@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from .catalog import SchemaCatalog, TableSchema, render_schema
+
+logger = logging.getLogger(__name__)
+
+# キャッシュファイルの形式を変えたら上げる（古い形式のファイルは読み捨てる）
+SCHEMA_CACHE_FORMAT = 1
+
+
+class SchemaProvider:
+    """
+    Schema text for the NL2SQL prompt, discovered from a catalog.
+
+    The discovered tables are kept in a versioned JSON file so a restart
+    serves the previous schema immediately from disk. Refreshes only
+    describe tables whose version changed since the cached copy and drop
+    tables that disappeared. Nothing is fetched until the schema is first
+    needed (or ``warm_up`` is called); after that, stale schemas are
+    refreshed in the background while the cached text keeps being served.
+    """
+
+    def __init__(
+        self,
+        catalog: SchemaCatalog,
+        dataset_id: str,
+        cache_path: Path,
+        refresh_interval: float,
+        sample_rows: int,
+    ):
+        self.catalog = catalog
+        self.dataset_id = dataset_id
+        self.cache_path = cache_path
+        self.refresh_interval = refresh_interval
+        self.sample_rows = sample_rows
+        self.tables: dict[str, TableSchema] = {}
+        self.etag: Optional[str] = None
+        self.refreshed_at = 0.0
+        self._text: Optional[str] = None
+        self._loaded = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._warm_up_task: Optional[asyncio.Task] = None
+
+    async def get(self) -> str:
+        """Returns the current schema text, discovering it on first use."""
+        if not self._loaded:
+            await asyncio.to_thread(self._load)
+        if self._text is None:
+            await self._start_refresh()
+        elif self._stale():
+            self._start_refresh()
+        return self._text or ""
+
+    def warm_up(self):
+        """Starts loading the schema in the background without waiting for it."""
+        if self._warm_up_task is None and self._text is None:
+            self._warm_up_task = asyncio.create_task(self.get())
+
+    async def refresh(self) -> bool:
+        """Re-reads changed tables from the catalog.
+
+        Returns:
+            bool: True if any table was added, changed or removed.
+        """
+        versions = await asyncio.to_thread(self.catalog.list_tables)
+        changed = [
+            name
+            for name, version in versions.items()
+            if name not in self.tables or self.tables[name].version != version
+        ]
+        removed = [name for name in self.tables if name not in versions]
+
+        if changed:
+            described = await asyncio.to_thread(
+                self.catalog.describe_tables, changed, versions, self.sample_rows
+            )
+            self.tables.update(described)
+        for name in removed:
+            del self.tables[name]
+
+        self.refreshed_at = time.time()
+        if changed or removed or self._text is None:
+            self._render()
+            logger.info(
+                "Schema of %s refreshed: %d changed, %d removed, etag %s",
+                self.dataset_id,
+                len(changed),
+                len(removed),
+                self.etag,
+            )
+        await asyncio.to_thread(self._save)
+        return bool(changed or removed)
+
+    def snapshot(self) -> dict:
+        return {
+            "tables": len(self.tables),
+            "etag": self.etag,
+            "refreshed_at": self.refreshed_at,
+            "refreshing": self._refresh_task is not None and not self._refresh_task.done(),
+        }
+
+    def _stale(self) -> bool:
+        return self.refresh_interval > 0 and time.time() - self.refreshed_at > self.refresh_interval
+
+    def _start_refresh(self) -> asyncio.Task:
+        # 同時に複数のリフレッシュを走らせない
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_logged())
+        return self._refresh_task
+
+    async def _refresh_logged(self):
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("Failed to refresh schema of %s", self.dataset_id)
+
+    def _render(self):
+        self._text = render_schema(self.dataset_id, list(self.tables.values()))
+        versions = "\n".join(
+            f"{name}={table.version}" for name, table in sorted(self.tables.items())
+        )
+        self.etag = hashlib.sha256(versions.encode("utf-8")).hexdigest()[:16]
+
+    def _load(self):
+        self._loaded = True
+        if not self.cache_path.exists():
+            return
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable schema cache %s", self.cache_path)
+            return
+        if data.get("format") != SCHEMA_CACHE_FORMAT or data.get("dataset_id") != self.dataset_id:
+            return
+        self.tables = {table["name"]: TableSchema.from_dict(table) for table in data["tables"]}
+        self.refreshed_at = data.get("refreshed_at", 0.0)
+        self._render()
+
+    def _save(self):
+        data = {
+            "format": SCHEMA_CACHE_FORMAT,
+            "dataset_id": self.dataset_id,
+            "etag": self.etag,
+            "refreshed_at": self.refreshed_at,
+            "tables": [table.to_dict() for table in self.tables.values()],
+        }
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # 書き込み途中のファイルを読まないように一時ファイルから置き換える
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, default=str), encoding="utf-8")
+        os.replace(tmp_path, self.cache_path)
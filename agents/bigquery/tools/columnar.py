@@ -0,0 +1,188 @@
+import json
+from array import array
+from typing import Any, Iterable, Iterator, Optional
+
+# 値1件あたりの管理コストの概算（辞書のエントリやPythonオブジェクトのヘッダ分）
+_VALUE_OVERHEAD = 16
+
+_INT = "int"
+_FLOAT = "float"
+_STRING = "string"
+_OBJECT = "object"
+
+
+def _kind_of(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return _OBJECT
+    if isinstance(value, int):
+        return _INT if -(2**63) <= value < 2**63 else _OBJECT
+    if isinstance(value, float):
+        return _FLOAT
+    if isinstance(value, str):
+        return _STRING
+    return _OBJECT
+
+
+class Column:
+    """
+    One column of a result in an Arrow-like layout.
+
+    Integers and floats live in typed arrays next to a validity byte per
+    row. Strings are dictionary-encoded (distinct values plus an int32 code
+    per row, -1 for NULL), which keeps repeated category values small.
+    Anything else (booleans, nested values, mixed types) falls back to a
+    plain list.
+    """
+
+    __slots__ = ("name", "kind", "values", "validity", "dictionary", "codes", "_lookup", "nbytes")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.kind: Optional[str] = None
+        self.values: Any = None
+        self.validity = bytearray()
+        self.dictionary: list[str] = []
+        self.codes = array("i")
+        self._lookup: dict[str, int] = {}
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        if self.kind == _STRING:
+            return len(self.codes)
+        if self.kind in (_INT, _FLOAT):
+            return len(self.validity)
+        return len(self.values) if self.values is not None else len(self.validity)
+
+    def append(self, value: Any):
+        kind = _kind_of(value)
+        if self.kind is None and kind is not None:
+            self._start(kind)
+        elif kind is not None and kind != self.kind and self.kind != _OBJECT:
+            if {kind, self.kind} == {_INT, _FLOAT}:
+                self._widen_to_float()
+            else:
+                self._fall_back_to_object()
+        if self.kind is None:
+            # 型が決まるまではNULLの数だけ数えておく
+            self.validity.append(0)
+            self.nbytes += 1
+            return
+        self._append_typed(value)
+
+    def get(self, index: int) -> Any:
+        if self.kind is None:
+            return None
+        if self.kind == _STRING:
+            code = self.codes[index]
+            return None if code < 0 else self.dictionary[code]
+        if self.kind == _OBJECT:
+            return self.values[index]
+        return self.values[index] if self.validity[index] else None
+
+    def __iter__(self) -> Iterator[Any]:
+        if self.kind is None:
+            return iter([None] * len(self))
+        if self.kind == _STRING:
+            dictionary = self.dictionary
+            return (None if code < 0 else dictionary[code] for code in self.codes)
+        if self.kind == _OBJECT:
+            return iter(self.values)
+        return (value if valid else None for value, valid in zip(self.values, self.validity))
+
+    def numbers(self) -> Optional[list[float]]:
+        """Non-NULL values if the column is numeric, else None."""
+        if self.kind not in (_INT, _FLOAT):
+            return None
+        return [value for value, valid in zip(self.values, self.validity) if valid]
+
+    def distinct_count(self) -> int:
+        if self.kind == _STRING:
+            return len(self.dictionary)
+        return len({json.dumps(value, default=str) for value in self if value is not None})
+
+    def _start(self, kind: str):
+        nulls = len(self.validity)
+        self.kind = kind
+        if kind == _INT:
+            self.values = array("q", [0] * nulls)
+        elif kind == _FLOAT:
+            self.values = array("d", [0.0] * nulls)
+        elif kind == _STRING:
+            self.codes.extend([-1] * nulls)
+            self.nbytes += 3 * nulls
+            self.validity = bytearray()
+        else:
+            self.values = [None] * nulls
+            self.nbytes += (_VALUE_OVERHEAD - 1) * nulls
+            self.validity = bytearray()
+        if kind in (_INT, _FLOAT):
+            self.nbytes += 8 * nulls
+
+    def _append_typed(self, value: Any):
+        if self.kind == _STRING:
+            if value is None:
+                self.codes.append(-1)
+            else:
+                code = self._lookup.get(value)
+                if code is None:
+                    code = len(self.dictionary)
+                    self._lookup[value] = code
+                    self.dictionary.append(value)
+                    self.nbytes += len(value.encode("utf-8")) + _VALUE_OVERHEAD
+                self.codes.append(code)
+            self.nbytes += 4
+        elif self.kind == _OBJECT:
+            self.values.append(value)
+            self.nbytes += len(json.dumps(value, default=str)) + _VALUE_OVERHEAD
+        else:
+            self.values.append(0 if value is None else value)
+            self.validity.append(0 if value is None else 1)
+            self.nbytes += 9
+
+    def _widen_to_float(self):
+        if self.kind == _INT:
+            self.values = array("d", self.values)
+            self.kind = _FLOAT
+
+    def _fall_back_to_object(self):
+        values = list(self)
+        self.kind = _OBJECT
+        self.values = []
+        self.validity = bytearray()
+        self.dictionary = []
+        self.codes = array("i")
+        self._lookup = {}
+        self.nbytes = 0
+        for value in values:
+            self._append_typed(value)
+
+
+class ColumnarTable:
+    """Rows appended page by page and stored column by column."""
+
+    def __init__(self, columns: list[str]):
+        self.columns = {name: Column(name) for name in columns}
+        self.num_rows = 0
+
+    @property
+    def column_names(self) -> list[str]:
+        return list(self.columns)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def append_rows(self, rows: Iterable[dict[str, Any]]):
+        for row in rows:
+            for name, column in self.columns.items():
+                column.append(row.get(name))
+            self.num_rows += 1
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> list[dict[str, Any]]:
+        stop = self.num_rows if stop is None else min(stop, self.num_rows)
+        return [
+            {name: column.get(index) for name, column in self.columns.items()}
+            for index in range(start, stop)
+        ]
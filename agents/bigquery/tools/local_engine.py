@@ -0,0 +1,282 @@
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from .sql_validator import sqlglot
+
+logger = logging.getLogger(__name__)
+
+# sqlglotがない場合はバッククォートの識別子だけをDuckDBの形式に直す
+_BACKTICK_IDENTIFIER = re.compile(r"`([^`]+)`")
+
+# スキーマのサイドカーに書かれたBigQueryの型とDuckDBの型の対応
+_DUCKDB_TYPES = {
+    "STRING": "VARCHAR",
+    "INT64": "BIGINT",
+    "INTEGER": "BIGINT",
+    "FLOAT64": "DOUBLE",
+    "FLOAT": "DOUBLE",
+    "NUMERIC": "DECIMAL(38, 9)",
+    "BOOL": "BOOLEAN",
+    "BOOLEAN": "BOOLEAN",
+    "DATE": "DATE",
+    "DATETIME": "TIMESTAMP",
+    "TIMESTAMP": "TIMESTAMPTZ",
+    "TIME": "TIME",
+    "BYTES": "BLOB",
+    "JSON": "JSON",
+}
+
+_VERSIONS_TABLE = "__local_engine_versions"
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def to_duckdb_sql(query: str) -> str:
+    """Translates BigQuery SQL to the DuckDB dialect.
+
+    ``project.dataset.table`` names are kept as three-part names; the
+    engine attaches a catalog named after the project so they resolve.
+    """
+    if sqlglot is None:
+        return _BACKTICK_IDENTIFIER.sub(
+            lambda match: ".".join(_quote(part) for part in match.group(1).split(".")), query
+        )
+    return ";\n".join(sqlglot.transpile(query, read="bigquery", write="duckdb"))
+
+
+class LocalSqlEngine:
+    """
+    Stand-in for BigQuery that runs queries on the dataset's local files.
+
+    Every ``<table>.csv`` and ``<table>.parquet`` in the data directory
+    becomes ``project.dataset.table`` in an embedded DuckDB database. CSV
+    files are bulk-loaded into columnar tables by DuckDB's parallel reader,
+    typed from the ``<table>.schema.json`` sidecar when there is one;
+    Parquet files are queried in place through views. With a database file
+    the loaded tables survive restarts and only files whose size or
+    modification time changed are loaded again.
+
+    Queries are translated from the BigQuery dialect and only a single
+    SELECT is allowed, like ``WriteMode.BLOCKED``.
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        project_id: str,
+        dataset_id: str,
+        max_rows: Optional[int],
+        database: str = ":memory:",
+        threads: int = 0,
+        memory_limit: str = "",
+    ):
+        self.data_dir = Path(data_dir)
+        self.project_id = project_id
+        self.dataset_id = dataset_id
+        self.max_rows = max_rows
+        self.database = database
+        self.threads = threads
+        self.memory_limit = memory_limit
+        self.tables: dict[str, int] = {}
+        self.load_seconds = 0.0
+        self.queries = 0
+        self.errors = 0
+        self._connection = None
+        self._load_lock = threading.Lock()
+        self._warm_up_task: Optional[asyncio.Task] = None
+
+    def load(self):
+        """Opens the database and loads new or changed files (blocking)."""
+        with self._load_lock:
+            if self._connection is not None:
+                return
+            import duckdb
+
+            started = time.perf_counter()
+            config = {}
+            if self.threads > 0:
+                config["threads"] = self.threads
+            if self.memory_limit:
+                config["memory_limit"] = self.memory_limit
+            connection = duckdb.connect(config=config)
+            # プロジェクト名のカタログにデータセット名のスキーマを作り、完全修飾名で参照できるようにする
+            connection.execute(f"ATTACH {_literal(self.database)} AS {_quote(self.project_id)}")
+            connection.execute(f"CREATE SCHEMA IF NOT EXISTS {self._schema}")
+            connection.execute(f"USE {self._schema}")
+            # 読み込んだファイルのバージョンはデータセットとは別のスキーマに置く
+            versions = f"{_quote(self.project_id)}.main.{_VERSIONS_TABLE}"
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {versions} (name VARCHAR PRIMARY KEY, version VARCHAR)"
+            )
+            loaded = dict(connection.execute(f"SELECT name, version FROM {versions}").fetchall())
+
+            paths = {
+                path.stem: path
+                for path in sorted(self.data_dir.iterdir())
+                if path.suffix in (".csv", ".parquet")
+            }
+            for name in loaded.keys() - paths.keys():
+                self._drop(connection, name)
+                connection.execute(f"DELETE FROM {versions} WHERE name = ?", [name])
+            for name, path in paths.items():
+                version = self._version(path)
+                if loaded.get(name) != version:
+                    self._load_file(connection, path)
+                    connection.execute(
+                        f"INSERT OR REPLACE INTO {versions} VALUES (?, ?)", [name, version]
+                    )
+                table = f"{self._schema}.{_quote(name)}"
+                self.tables[name] = connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+            self.load_seconds = time.perf_counter() - started
+            self._connection = connection
+            logger.info(
+                "Loaded %d local tables into %s.%s in %.2fs",
+                len(self.tables),
+                self.project_id,
+                self.dataset_id,
+                self.load_seconds,
+            )
+
+    def warm_up(self):
+        """Starts loading the files in the background without waiting for it."""
+        if self._warm_up_task is None and self._connection is None:
+            self._warm_up_task = asyncio.create_task(asyncio.to_thread(self.load))
+
+    async def execute_sql(self, query: str) -> dict:
+        """Runs a query and returns the result in the ``execute_sql`` format."""
+        return await asyncio.to_thread(self._execute, query)
+
+    def snapshot(self) -> dict:
+        return {
+            "tables": dict(self.tables),
+            "load_seconds": round(self.load_seconds, 3),
+            "queries": self.queries,
+            "errors": self.errors,
+        }
+
+    @property
+    def _schema(self) -> str:
+        return f"{_quote(self.project_id)}.{_quote(self.dataset_id)}"
+
+    def _execute(self, query: str) -> dict:
+        self.load()
+        self.queries += 1
+        # カーソルはスレッドごとに独立しているので、既定のスキーマを毎回指定する
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(f"USE {self._schema}")
+            sql = to_duckdb_sql(query)
+            statements = cursor.extract_statements(sql)
+            if len(statements) != 1 or statements[0].type.name != "SELECT":
+                self.errors += 1
+                return {
+                    "status": "ERROR",
+                    "error_details": "Read-only mode only supports SELECT statements.",
+                }
+            cursor.execute(sql)
+            columns = [column[0] for column in cursor.description]
+            fetched = cursor.fetchmany(self.max_rows) if self.max_rows else cursor.fetchall()
+        except Exception as ex:  # BigQueryToolsetと同じく、エラーは結果として返す
+            self.errors += 1
+            return {"status": "ERROR", "error_details": str(ex)}
+        finally:
+            cursor.close()
+
+        rows = [{column: _json_value(value) for column, value in zip(columns, row)} for row in fetched]
+        result = {"status": "SUCCESS", "rows": rows}
+        if self.max_rows is not None and len(rows) == self.max_rows:
+            result["result_is_likely_truncated"] = True
+        return result
+
+    def _drop(self, connection, name: str):
+        table = f"{self._schema}.{_quote(name)}"
+        connection.execute(f"DROP VIEW IF EXISTS {table}")
+        connection.execute(f"DROP TABLE IF EXISTS {table}")
+
+    def _load_file(self, connection, path: Path):
+        table = f"{self._schema}.{_quote(path.stem)}"
+        self._drop(connection, path.stem)
+        if path.suffix == ".parquet":
+            # Parquetはコピーせずにファイルをそのまま読む
+            connection.execute(
+                f"CREATE VIEW {table} AS SELECT * FROM read_parquet({_literal(str(path.resolve()))})"
+            )
+            return
+
+        options = "header = true"
+        columns = self._column_types(path)
+        if columns:
+            options += ", columns = {" + ", ".join(
+                f"{_literal(name)}: {_literal(data_type)}" for name, data_type in columns.items()
+            ) + "}"
+        connection.execute(
+            f"CREATE TABLE {table} AS SELECT * FROM read_csv({_literal(str(path))}, {options})"
+        )
+
+    def _column_types(self, path: Path) -> dict[str, str]:
+        sidecar = path.with_suffix(".schema.json")
+        if not sidecar.exists():
+            return {}
+        columns = json.loads(sidecar.read_text(encoding="utf-8")).get("columns", {})
+        # 型の指定がない列が1つでもあれば自動判定に任せる（read_csvのcolumnsは全列の指定が必要）
+        types = {name: _DUCKDB_TYPES.get(meta.get("type", "").upper()) for name, meta in columns.items()}
+        if not types or not all(types.values()):
+            return {}
+        with path.open(encoding="utf-8") as f:
+            header = next(iter(f), "").strip().split(",")
+        if set(header) != set(types):
+            return {}
+        return {name: types[name] for name in header}
+
+    @staticmethod
+    def _version(path: Path) -> str:
+        parts = []
+        for candidate in (path, path.with_suffix(".schema.json")):
+            if candidate.exists():
+                stat = candidate.stat()
+                parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+        return "/".join(parts)
+
+
+def _json_value(value: Any) -> Any:
+    # BigQueryToolsetと同じく、JSONにできない値（日時・Decimalなど）は文字列にする
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return str(value)
+    return value
+
+
+def create_execute_sql_tool(engine: LocalSqlEngine):
+    """Returns an ``execute_sql`` tool function that runs on the local engine."""
+
+    async def execute_sql(project_id: str, query: str) -> dict:
+        """Run a BigQuery SQL query in the project and return the result.
+
+        Args:
+            project_id (str): The GCP project id in which the query should be
+                executed.
+            query (str): The BigQuery SQL query to be executed.
+
+        Returns:
+            dict: Dictionary representing the result of the query. If the
+            result contains the key "result_is_likely_truncated" with value
+            True, it means that there may be additional rows matching the
+            query not returned in the result.
+        """
+        return await engine.execute_sql(query)
+
+    return execute_sql
@@ -1,11 +1,24 @@
+import asyncio
+import functools
 import logging
+import time
 
 from google.adk.tools import ToolContext
 
 from google.genai import Client
 from google.genai.types import HttpOptions, HttpRetryOptions
 
-from ..config import Nl2SqlModelConfig
+from ..config import (
+    Nl2SqlCacheConfig,
+    Nl2SqlCandidateConfig,
+    Nl2SqlModelConfig,
+    SchemaConfig,
+    SqlValidationConfig,
+)
+from ..schema import prune_schema
+from .nl2sql_cache import Nl2SqlCache
+from .nl2sql_candidates import CandidateGenerator, CandidateResult
+from .sql_validator import SqlValidationResult, validate_sql
 
 logger = logging.getLogger(__name__)
 
@@ -20,33 +33,22 @@ http_options = HttpOptions(
         exp_base=2,
     ),
 )
-llm_client = Client(
-    vertexai=True,
-    project=nl2sqlModelConfig.google_cloud_project,
-    location=nl2sqlModelConfig.google_cloud_location,
-    http_options=http_options,
-)
 
-MAX_NUM_ROWS = 10000
 
+@functools.cache
+def get_llm_client() -> Client:
+    # 認証情報の解決を含むクライアントの作成は、import時ではなく最初の生成時に行う
+    return Client(
+        vertexai=True,
+        project=nl2sqlModelConfig.google_cloud_project,
+        location=nl2sqlModelConfig.google_cloud_location,
+        http_options=http_options,
+    )
 
-def bigquery_nl2sql(
-    question: str,
-    tool_context: ToolContext,
-) -> str:
-    """Generates a SQL query from a natural language question.
 
-    Args:
-        question (str): Natural language question.
-        tool_context (ToolContext): The tool context to use for generating the
-            SQL query.
-
-    Returns:
-        str: An SQL statement to answer this question.
-    """
-    logger.debug("bigquery_nl2sql - question: %s", question)
+MAX_NUM_ROWS = 10000
 
-    prompt_template = """
+NL2SQL_PROMPT_TEMPLATE = """
         You are a BigQuery SQL expert tasked with generating SQL in the Google SQL
         dialect based on the user's natural language question.
         Your task is to write a Bigquery SQL query that answers the following question
@@ -97,26 +99,191 @@ def bigquery_nl2sql(
         best practices outlined above to generate the correct BigQuery SQL.
     """
 
+NL2SQL_REPAIR_TEMPLATE = """
+        **Previous attempt:**
+
+        The following SQL failed validation against the schema. Fix the errors
+        listed below and return only the corrected BigQuery SQL.
+
+        ```sql
+        {SQL}
+        ```
+
+        **Errors:**
+
+        {ERRORS}
+    """
+
+# プロセス内の全セッションで共有するNL2SQLのモデル呼び出しの同時実行数の上限
+nl2sql_semaphore = asyncio.Semaphore(nl2sqlModelConfig.max_concurrency)
+
+# 同じ質問に対するSQL生成を再利用するキャッシュ
+nl2sqlCacheConfig = Nl2SqlCacheConfig.from_env()
+nl2sql_cache = Nl2SqlCache(nl2sqlCacheConfig) if nl2sqlCacheConfig.enabled else None
+
+schemaConfig = SchemaConfig.from_env()
+
+# 生成したSQLはBigQueryに送る前にローカルで検証し、誤りはその場で再生成させる
+sqlValidationConfig = SqlValidationConfig.from_env()
+
+# 複数の候補を並行（またはヘッジして）生成し、最初に検証を通ったSQLを使う
+nl2sqlCandidateConfig = Nl2SqlCandidateConfig.from_env()
+candidate_generator = (
+    CandidateGenerator(nl2sqlCandidateConfig) if nl2sqlCandidateConfig.mode != "single" else None
+)
+
+
+async def bigquery_nl2sql(
+    question: str,
+    tool_context: ToolContext,
+) -> str | dict:
+    """Generates a SQL query from a natural language question.
+
+    Args:
+        question (str): Natural language question.
+        tool_context (ToolContext): The tool context to use for generating the
+            SQL query.
+
+    Returns:
+        str | dict: An SQL statement to answer this question, or an error
+        response in the ``execute_sql`` format (``{"status": "ERROR",
+        "error_details": ...}``) when generation timed out or the SQL still
+        fails local validation after the repair attempts.
+    """
+    logger.debug("bigquery_nl2sql - question: %s", question)
+
     schema = tool_context.state["database_settings"]["schema"]
 
-    prompt = prompt_template.format(
-        MAX_NUM_ROWS=MAX_NUM_ROWS, SCHEMA=schema, QUESTION=question
-    )
+    cached = None
+    if nl2sql_cache:
+        cached = await nl2sql_cache.lookup(question, schema, nl2sqlModelConfig.nl2sql_model)
+
+    if cached:
+        logger.debug("bigquery_nl2sql - %s cache hit", cached.tier)
+        sql = cached.sql
+    else:
+        started = time.perf_counter()
+        try:
+            sql, validation, candidates = await generate_valid_sql(question, schema)
+        except TimeoutError:
+            logger.warning(
+                "bigquery_nl2sql - timed out after %.1fs", nl2sqlModelConfig.timeout
+            )
+            # 文字列で返すとSQLとしてexecute_sqlに渡されるので、execute_sqlのエラーと同じ形で返す
+            return {
+                "status": "ERROR",
+                "error_details": "SQL generation timed out after "
+                f"{nl2sqlModelConfig.timeout:g} seconds. Try again with a simpler question.",
+            }
+        if candidates:
+            # どの候補が採用され、単独で生成した場合よりどれだけ早かったか
+            tool_context.state["nl2sql_candidates"] = candidates.report()
+        if validation and not validation.ok:
+            logger.info("bigquery_nl2sql - invalid SQL: %s", validation.feedback())
+            return validation.to_error_response()
+        if sql and nl2sql_cache:
+            await nl2sql_cache.store(
+                question,
+                schema,
+                nl2sqlModelConfig.nl2sql_model,
+                sql,
+                time.perf_counter() - started,
+            )
+
+    logger.debug("bigquery_nl2sql - sql:\n%s", sql)
+
+    tool_context.state["sql_query"] = sql
+
+    return sql
+
+
+async def generate_valid_sql(
+    question: str, schema: str
+) -> tuple[str | None, SqlValidationResult | None, CandidateResult | None]:
+    """Generates SQL and repairs it until it passes local validation.
+
+    Returns:
+        tuple: The SQL (with any LIMIT rewrite applied), the last validation
+        result, which is None when validation is disabled or the model
+        returned nothing, and the candidate race when candidates are enabled.
+    """
+
+    def validate(sql: str) -> SqlValidationResult | None:
+        if not sqlValidationConfig.enabled:
+            return None
+        return validate_sql(sql, schema, MAX_NUM_ROWS)
+
+    candidates = None
+    if candidate_generator:
+        candidates = await candidate_generator.generate(
+            lambda index, temperature: generate_sql(question, schema, temperature=temperature),
+            validate,
+        )
+        sql, validation = candidates.sql, candidates.validation
+    else:
+        sql = await generate_sql(question, schema)
+        validation = validate(sql) if sql else None
+    if validation is None:
+        return sql, None, candidates
+
+    for _ in range(sqlValidationConfig.repair_attempts):
+        if validation.ok:
+            break
+        logger.debug("bigquery_nl2sql - repairing: %s", validation.feedback())
+        sql = await generate_sql(question, schema, validation)
+        if not sql:
+            return sql, None, candidates
+        validation = validate_sql(sql, schema, MAX_NUM_ROWS)
+    return validation.sql, validation, candidates
+
+
+async def generate_sql(
+    question: str,
+    schema: str,
+    previous: SqlValidationResult | None = None,
+    temperature: float = 0.1,
+) -> str | None:
+    """Asks the NL2SQL model for SQL answering the question.
+
+    When ``previous`` is given, the failed SQL and its validation errors
+    are appended to the prompt so the model can correct them.
 
-    # リトライはHttpRetryOptionsで指定している
-    # TODO: クライアントの関心ごとを別クラスに分離する
-    response = llm_client.models.generate_content(
-        model=nl2sqlModelConfig.nl2sql_model,
-        contents=prompt,
-        config={"temperature": 0.1},
+    Raises:
+        TimeoutError: If the call, including queueing and retries, exceeds
+            the configured deadline.
+    """
+    # 大きなスキーマは質問に関係するテーブルと列だけに絞り込む
+    prompt_schema = prune_schema(
+        question,
+        schema,
+        schemaConfig.prune_min_tables,
+        schemaConfig.top_k_tables,
+        schemaConfig.max_columns_per_table,
     )
+    prompt = build_nl2sql_prompt(question, prompt_schema)
+    if previous is not None:
+        prompt += NL2SQL_REPAIR_TEMPLATE.format(SQL=previous.sql, ERRORS=previous.feedback())
+
+    # 待ち時間とリトライを含めた1回の呼び出し全体に期限を設ける。
+    # キャンセルされた場合は非同期クライアントのリクエストもそのまま中断される
+    async with asyncio.timeout(nl2sqlModelConfig.timeout):
+        async with nl2sql_semaphore:
+            # リトライはHttpRetryOptionsで指定している
+            # TODO: クライアントの関心ごとを別クラスに分離する
+            response = await get_llm_client().aio.models.generate_content(
+                model=nl2sqlModelConfig.nl2sql_model,
+                contents=prompt,
+                config={"temperature": temperature},
+            )
 
     sql = response.text
     if sql:
         sql = sql.replace("```sql", "").replace("```", "").strip()
+    return sql
 
-    logger.debug("bigquery_nl2sql - sql:\n%s", sql)
 
-    tool_context.state["sql_query"] = sql
-
-    return sql
+def build_nl2sql_prompt(question: str, schema: str) -> str:
+    """Builds the NL2SQL prompt for a question and a table schema."""
+    return NL2SQL_PROMPT_TEMPLATE.format(
+        MAX_NUM_ROWS=MAX_NUM_ROWS, SCHEMA=schema, QUESTION=question
+    )
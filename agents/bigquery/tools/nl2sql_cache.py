@@ -0,0 +1,366 @@
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from ..config import Nl2SqlCacheConfig
+
+logger = logging.getLogger(__name__)
+
+EXACT_TIER = "exact"
+TEMPLATE_TIER = "template"
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s。．.、,？?！!]+$")
+_QUOTED = re.compile(r"「([^」]+)」|『([^』]+)』|\"([^\"]+)\"|'([^']+)'")
+# 日本語の文字は\wに含まれるので、英数字に隣接しない数値だけを取り出す
+_NUMBER = re.compile(r"(?<![0-9A-Za-z_.])[0-9]+(?:\.[0-9]+)?(?![0-9A-Za-z_.])")
+_SCHEMA_VALUE = re.compile(r"'([^'\n]+)'")
+
+_STR = "str"
+_NUM = "num"
+
+
+def _placeholder(index: int) -> str:
+    return f"\x00{index}\x00"
+
+
+def normalize_question(question: str) -> str:
+    """Folds width variants, whitespace and trailing punctuation out of a question."""
+    question = unicodedata.normalize("NFKC", question)
+    question = _WHITESPACE.sub(" ", question).strip()
+    return _TRAILING_PUNCTUATION.sub("", question)
+
+
+def schema_fingerprint(schema: str) -> str:
+    """Hash of the schema text that ignores indentation differences."""
+    normalized = _WHITESPACE.sub(" ", schema).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def schema_vocabulary(schema: str) -> list[str]:
+    """Quoted example values in the schema (category names etc.), longest first."""
+    values = {value.strip() for value in _SCHEMA_VALUE.findall(schema) if value.strip()}
+    return sorted(values, key=len, reverse=True)
+
+
+def extract_literals(question: str, vocabulary: list[str]) -> tuple[str, list[tuple[str, str]]]:
+    """Replaces literals in a normalized question with typed placeholders.
+
+    Quoted values, values known from the schema and numbers are extracted in
+    that order of precedence.
+
+    Returns:
+        tuple: The question with ``{str}``/``{num}`` placeholders and the
+        extracted ``(kind, value)`` pairs in order of appearance.
+    """
+    spans: list[tuple[int, int, str, str]] = []
+
+    def free(start: int, end: int) -> bool:
+        return all(end <= s or start >= e for s, e, _, _ in spans)
+
+    for match in _QUOTED.finditer(question):
+        value = next(group for group in match.groups() if group)
+        spans.append((match.start(), match.end(), _STR, value))
+    for value in vocabulary:
+        start = question.find(value)
+        while start != -1:
+            end = start + len(value)
+            if free(start, end):
+                spans.append((start, end, _STR, value))
+            start = question.find(value, end)
+    for match in _NUMBER.finditer(question):
+        if free(match.start(), match.end()):
+            spans.append((match.start(), match.end(), _NUM, match.group()))
+
+    spans.sort()
+    parts = []
+    literals = []
+    position = 0
+    for start, end, kind, value in spans:
+        parts.append(question[position:start])
+        parts.append("{" + kind + "}")
+        literals.append((kind, value))
+        position = end
+    parts.append(question[position:])
+    return "".join(parts), literals
+
+
+def _sql_pattern(kind: str, value: str) -> re.Pattern:
+    if kind == _NUM:
+        return re.compile(r"(?<![0-9A-Za-z_.'\"])" + re.escape(value) + r"(?![0-9A-Za-z_.'\"])")
+    return re.compile("'" + re.escape(_quote_sql_string(value)[1:-1]) + "'")
+
+
+def _quote_sql_string(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def build_sql_template(sql: str, literals: list[tuple[str, str]]) -> Optional[str]:
+    """Turns generated SQL into a template with one placeholder per literal.
+
+    Returns None unless every literal occurs in the SQL exactly once, so a
+    substituted template never touches an unrelated part of the query.
+    """
+    if not literals or len({value for _, value in literals}) != len(literals):
+        return None
+    template = sql
+    for index, (kind, value) in enumerate(literals):
+        pattern = _sql_pattern(kind, value)
+        if len(pattern.findall(template)) != 1:
+            return None
+        template = pattern.sub(lambda _, index=index: _placeholder(index), template)
+    return template
+
+
+def render_sql_template(template: str, literals: list[tuple[str, str]]) -> str:
+    sql = template
+    for index, (kind, value) in enumerate(literals):
+        literal = value if kind == _NUM else _quote_sql_string(value)
+        sql = sql.replace(_placeholder(index), literal)
+    return sql
+
+
+@dataclass
+class _Entry:
+    sql: str
+    created_at: float
+    generation_seconds: float
+
+
+@dataclass
+class CacheHit:
+    sql: str
+    tier: str
+    generation_seconds: float
+
+
+@dataclass
+class Nl2SqlCacheStats:
+    lookups: int = 0
+    exact_hits: int = 0
+    template_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    time_saved_seconds: float = 0.0
+
+
+class Nl2SqlCache:
+    """
+    Cache of generated SQL in front of the NL2SQL model call.
+
+    Entries are keyed by the normalized question, a fingerprint of the schema
+    and the model name, so changing either invalidates them naturally. The
+    exact tier stores the SQL for a question as-is. The template tier stores
+    the SQL with the question's literals (numbers, quoted values and values
+    known from the schema) replaced by placeholders, so "上位5件" can be
+    answered from a cached "上位10件" with the number substituted.
+
+    Recently used entries live in an in-memory LRU; every entry is also
+    written through to SQLite so the cache survives restarts. Disk I/O runs
+    in a worker thread. The on-disk LRU order is refreshed only when an entry
+    is loaded from disk, which keeps memory hits free of writes.
+    """
+
+    def __init__(self, config: Nl2SqlCacheConfig):
+        self.config = config
+        self.stats = Nl2SqlCacheStats()
+        self._memory: OrderedDict[str, _Entry] = OrderedDict()
+        self._vocabulary: dict[str, list[str]] = {}
+        self._connection: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    async def lookup(self, question: str, schema: str, model: str) -> Optional[CacheHit]:
+        """Returns cached SQL for the question, trying the exact tier first."""
+        self.stats.lookups += 1
+        normalized = normalize_question(question)
+        fingerprint = schema_fingerprint(schema)
+
+        entry = await self._get(self._key(EXACT_TIER, normalized, fingerprint, model))
+        if entry:
+            self.stats.exact_hits += 1
+            self.stats.time_saved_seconds += entry.generation_seconds
+            return CacheHit(entry.sql, EXACT_TIER, entry.generation_seconds)
+
+        if self.config.templates:
+            vocabulary = self._schema_vocabulary(schema, fingerprint)
+            template_question, literals = extract_literals(normalized, vocabulary)
+            if literals:
+                template_key = self._key(TEMPLATE_TIER, template_question, fingerprint, model)
+                entry = await self._get(template_key)
+                if entry:
+                    self.stats.template_hits += 1
+                    self.stats.time_saved_seconds += entry.generation_seconds
+                    return CacheHit(
+                        render_sql_template(entry.sql, literals),
+                        TEMPLATE_TIER,
+                        entry.generation_seconds,
+                    )
+
+        self.stats.misses += 1
+        return None
+
+    async def store(
+        self, question: str, schema: str, model: str, sql: str, generation_seconds: float
+    ):
+        """Caches SQL generated for the question in both tiers."""
+        normalized = normalize_question(question)
+        fingerprint = schema_fingerprint(schema)
+        entry = _Entry(sql, time.time(), generation_seconds)
+        exact_key = self._key(EXACT_TIER, normalized, fingerprint, model)
+        rows = [(exact_key, EXACT_TIER, normalized, entry)]
+
+        if self.config.templates:
+            vocabulary = self._schema_vocabulary(schema, fingerprint)
+            template_question, literals = extract_literals(normalized, vocabulary)
+            template = build_sql_template(sql, literals)
+            if template:
+                template_key = self._key(TEMPLATE_TIER, template_question, fingerprint, model)
+                template_entry = _Entry(template, entry.created_at, generation_seconds)
+                rows.append((template_key, TEMPLATE_TIER, template_question, template_entry))
+
+        for key, _, _, row_entry in rows:
+            self._remember(key, row_entry)
+        self.stats.stores += 1
+        if self.config.path:
+            await asyncio.to_thread(self._write_rows, rows)
+
+    def snapshot(self) -> dict:
+        """Returns the current counters as a plain dict."""
+        hits = self.stats.exact_hits + self.stats.template_hits
+        return {
+            "size": len(self._memory),
+            "lookups": self.stats.lookups,
+            "exact_hits": self.stats.exact_hits,
+            "template_hits": self.stats.template_hits,
+            "misses": self.stats.misses,
+            "stores": self.stats.stores,
+            "hit_ratio": round(hits / self.stats.lookups, 4) if self.stats.lookups else 0.0,
+            "time_saved_seconds": round(self.stats.time_saved_seconds, 3),
+        }
+
+    def close(self):
+        with self._db_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    @staticmethod
+    def _key(tier: str, question: str, fingerprint: str, model: str) -> str:
+        raw = "\x1f".join((tier, model, fingerprint, question))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _schema_vocabulary(self, schema: str, fingerprint: str) -> list[str]:
+        vocabulary = self._vocabulary.get(fingerprint)
+        if vocabulary is None:
+            vocabulary = self._vocabulary[fingerprint] = schema_vocabulary(schema)
+        return vocabulary
+
+    def _expired(self, entry: _Entry) -> bool:
+        return self.config.ttl > 0 and time.time() - entry.created_at > self.config.ttl
+
+    def _remember(self, key: str, entry: _Entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.config.max_entries:
+            self._memory.popitem(last=False)
+
+    async def _get(self, key: str) -> Optional[_Entry]:
+        entry = self._memory.get(key)
+        if entry is None and self.config.path:
+            try:
+                entry = await asyncio.to_thread(self._read_row, key)
+            except sqlite3.Error:
+                logger.exception("Failed to read NL2SQL cache entry")
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            return None
+        if self._expired(entry):
+            self._memory.pop(key, None)
+            return None
+        self._memory.move_to_end(key)
+        return entry
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            Path(self.config.path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.config.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS nl2sql_cache (
+                    key TEXT PRIMARY KEY,
+                    tier TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    generation_seconds REAL NOT NULL
+                )
+                """
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS nl2sql_cache_lru ON nl2sql_cache (last_used_at)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def _read_row(self, key: str) -> Optional[_Entry]:
+        with self._db_lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT sql, created_at, generation_seconds FROM nl2sql_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            entry = _Entry(*row)
+            if self._expired(entry):
+                db.execute("DELETE FROM nl2sql_cache WHERE key = ?", (key,))
+            else:
+                db.execute(
+                    "UPDATE nl2sql_cache SET last_used_at = ? WHERE key = ?", (time.time(), key)
+                )
+            db.commit()
+            return entry
+
+    def _write_rows(self, rows: list[tuple[str, str, str, _Entry]]):
+        try:
+            with self._db_lock:
+                db = self._db()
+                db.executemany(
+                    "INSERT OR REPLACE INTO nl2sql_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            key,
+                            tier,
+                            question,
+                            entry.sql,
+                            entry.created_at,
+                            entry.created_at,
+                            entry.generation_seconds,
+                        )
+                        for key, tier, question, entry in rows
+                    ],
+                )
+                # 上限を1割超えたら古い順にまとめて削除する
+                (count,) = db.execute("SELECT COUNT(*) FROM nl2sql_cache").fetchone()
+                if count > self.config.max_entries * 1.1:
+                    db.execute(
+                        "DELETE FROM nl2sql_cache WHERE key IN "
+                        "(SELECT key FROM nl2sql_cache ORDER BY last_used_at LIMIT ?)",
+                        (count - self.config.max_entries,),
+                    )
+                db.commit()
+        except sqlite3.Error:
+            logger.exception("Failed to persist NL2SQL cache entries")
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from ..config import Nl2SqlCandidateConfig
+from .sql_validator import SqlValidationResult
+
+logger = logging.getLogger(__name__)
+
+# 候補番号と温度からSQLを生成する関数と、SQLを検証する関数（検証しない場合はNoneを返す）
+GenerateCandidate = Callable[[int, float], Awaitable[Optional[str]]]
+ValidateCandidate = Callable[[str], Optional[SqlValidationResult]]
+
+
+@dataclass
+class CandidateResult:
+    sql: Optional[str]
+    validation: Optional[SqlValidationResult]
+    winner: Optional[int]
+    temperature: Optional[float]
+    launched: int
+    elapsed_seconds: float
+    latency_saved_seconds: float
+
+    def report(self) -> dict:
+        return {
+            "winner": self.winner,
+            "temperature": self.temperature,
+            "launched": self.launched,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "latency_saved_seconds": round(self.latency_saved_seconds, 3),
+        }
+
+
+@dataclass
+class CandidateStats:
+    races: int = 0
+    launched: int = 0
+    hedges: int = 0
+    no_valid_candidate: int = 0
+    wins: Counter = field(default_factory=Counter)
+    latency_saved_seconds: float = 0.0
+
+
+@dataclass
+class _Candidate:
+    index: int
+    temperature: float
+    started: float
+    task: asyncio.Task
+
+
+class CandidateGenerator:
+    """
+    Races several NL2SQL generations and returns the first valid one.
+
+    In ``parallel`` mode all candidates start at once. In ``hedged`` mode the
+    next candidate only starts when no valid SQL has arrived within the
+    configured percentile of recent generation latencies, or as soon as a
+    candidate comes back invalid. The remaining candidates are cancelled
+    once a winner is found.
+
+    The hedge delay is a percentile of the latencies of first candidates
+    only, since later candidates are only observed when they beat the
+    first one. A first candidate that is cancelled counts with the time it
+    had been running, as a lower bound of its latency, so the delay does
+    not drift down whenever hedges win.
+
+    The latency saved is estimated against generating with the first
+    candidate alone: its observed latency (plus one more generation when it
+    was invalid), or, if it was cancelled, the mean of the recent latencies
+    longer than the time it had already been running.
+    """
+
+    def __init__(self, config: Nl2SqlCandidateConfig):
+        self.config = config
+        self.stats = CandidateStats()
+        # 最初の候補のレイテンシと、キャンセルして下限しか分からなかったか
+        self._latencies: deque[tuple[float, bool]] = deque(maxlen=config.latency_window)
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for a valid result before starting the next candidate."""
+        if self.config.mode == "parallel":
+            return 0.0
+        if len(self._latencies) < self.config.hedge_min_samples:
+            return self.config.hedge_initial_delay
+        return self._percentile(self.config.hedge_percentile)
+
+    async def generate(
+        self, generate: GenerateCandidate, validate: ValidateCandidate
+    ) -> CandidateResult:
+        """Runs the race.
+
+        Raises:
+            Exception: The first error raised by a candidate (e.g.
+                TimeoutError) when every candidate failed.
+        """
+        started = time.perf_counter()
+        delay = self.hedge_delay()
+        running: dict[asyncio.Task, _Candidate] = {}
+        candidates: list[_Candidate] = []
+        first_error: Optional[BaseException] = None
+        # 全候補が検証に失敗した場合は最初に返ってきた候補を修正に回す
+        fallback: Optional[tuple[_Candidate, str, SqlValidationResult]] = None
+        primary_latency: Optional[float] = None
+
+        def launch():
+            index = len(candidates)
+            temperature = self.config.temperatures[index % len(self.config.temperatures)]
+            task = asyncio.create_task(generate(index, temperature))
+            candidate = _Candidate(index, temperature, time.perf_counter(), task)
+            candidates.append(candidate)
+            running[task] = candidate
+
+        launch()
+        next_launch = started + delay
+        try:
+            while running or len(candidates) < self.config.candidates:
+                now = time.perf_counter()
+                if len(candidates) < self.config.candidates and (not running or now >= next_launch):
+                    if running and self.config.mode == "hedged":
+                        self.stats.hedges += 1
+                    launch()
+                    next_launch = now + delay
+                    continue
+
+                timeout = None
+                if len(candidates) < self.config.candidates:
+                    timeout = max(0.0, next_launch - now)
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    candidate = running.pop(task)
+                    latency = time.perf_counter() - candidate.started
+                    if task.exception() is not None:
+                        first_error = first_error or task.exception()
+                        continue
+                    if candidate.index == 0:
+                        primary_latency = latency
+                        self._latencies.append((latency, False))
+
+                    sql = task.result()
+                    if not sql:
+                        continue
+                    validation = validate(sql)
+                    if validation is None or validation.ok:
+                        return self._finish(
+                            candidate, sql, validation, started, len(candidates), primary_latency
+                        )
+                    if fallback is None:
+                        fallback = (candidate, sql, validation)
+        finally:
+            for task, candidate in running.items():
+                task.cancel()
+                if candidate.index == 0:
+                    self._latencies.append((time.perf_counter() - candidate.started, True))
+
+        self.stats.races += 1
+        self.stats.launched += len(candidates)
+        self.stats.no_valid_candidate += 1
+        if fallback is None:
+            if first_error is not None:
+                raise first_error
+            return CandidateResult(
+                None, None, None, None, len(candidates), time.perf_counter() - started, 0.0
+            )
+        candidate, sql, validation = fallback
+        return CandidateResult(
+            sql,
+            validation,
+            None,
+            candidate.temperature,
+            len(candidates),
+            time.perf_counter() - started,
+            0.0,
+        )
+
+    def snapshot(self) -> dict:
+        return {
+            "mode": self.config.mode,
+            "races": self.stats.races,
+            "launched": self.stats.launched,
+            "hedges": self.stats.hedges,
+            "no_valid_candidate": self.stats.no_valid_candidate,
+            "wins": {str(index): count for index, count in sorted(self.stats.wins.items())},
+            "hedge_delay_seconds": round(self.hedge_delay(), 3),
+            "latency_saved_seconds": round(self.stats.latency_saved_seconds, 3),
+        }
+
+    def _finish(
+        self,
+        candidate: _Candidate,
+        sql: str,
+        validation: Optional[SqlValidationResult],
+        started: float,
+        launched: int,
+        primary_latency: Optional[float],
+    ) -> CandidateResult:
+        elapsed = time.perf_counter() - started
+        if candidate.index == 0:
+            saved = 0.0
+        elif primary_latency is not None:
+            # 最初の候補は返ってきたが検証に失敗した。単独なら修正のためにもう1回生成が必要だった
+            winner_latency = elapsed - (candidate.started - started)
+            saved = primary_latency + winner_latency - elapsed
+        else:
+            # 最初の候補はキャンセルしたので、今までかかった時間より遅かった最近の生成の
+            # 平均レイテンシで見積もる
+            slower = [
+                latency for latency, censored in self._latencies if not censored and latency > elapsed
+            ]
+            saved = sum(slower) / len(slower) - elapsed if slower else 0.0
+        saved = max(0.0, saved)
+
+        self.stats.races += 1
+        self.stats.launched += launched
+        self.stats.wins[candidate.index] += 1
+        self.stats.latency_saved_seconds += saved
+        logger.debug(
+            "bigquery_nl2sql - candidate %d of %d won after %.2fs (saved %.2fs)",
+            candidate.index,
+            launched,
+            elapsed,
+            saved,
+        )
+        return CandidateResult(
+            sql, validation, candidate.index, candidate.temperature, launched, elapsed, saved
+        )
+
+    def _percentile(self, pct: float) -> float:
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(latency for latency, _ in self._latencies)
+        position = (len(ordered) - 1) * pct / 100
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
@@ -0,0 +1,301 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from ..config import QueryCacheConfig
+
+logger = logging.getLogger(__name__)
+
+# 文字列リテラル・識別子・コメントとそれ以外の部分に分解する
+_SQL_TOKEN = re.compile(
+    r"'(?:\\.|[^'\\])*'"
+    r"|\"(?:\\.|[^\"\\])*\""
+    r"|`[^`]*`"
+    r"|--[^\n]*"
+    r"|/\*.*?\*/"
+    r"|\s+"
+    r"|[^'\"`\s-]+|-",
+    re.DOTALL,
+)
+_TABLE_REFERENCE = re.compile(r"`([\w-]+)\.(\w+)\.[\w*]+`|`(\w+)\.[\w*]+`")
+
+
+def canonicalize_sql(sql: str) -> str:
+    """Normalizes SQL text so formatting-only differences share a cache entry.
+
+    Comments are dropped, whitespace runs outside string literals and
+    quoted identifiers collapse to a single space and trailing semicolons
+    are removed. Case is kept as-is because table names are case-sensitive.
+    """
+    parts = []
+    for token in _SQL_TOKEN.findall(sql):
+        if token.startswith(("--", "/*")) or token.isspace():
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+        else:
+            parts.append(token)
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def referenced_datasets(sql: str, project_id: str, dataset_id: str) -> set[tuple[str, str]]:
+    """Datasets a query reads from, used to index entries for invalidation."""
+    datasets = {(project_id, dataset_id)}
+    for project, dataset, short_dataset in _TABLE_REFERENCE.findall(sql):
+        if project:
+            datasets.add((project, dataset))
+        else:
+            datasets.add((project_id, short_dataset))
+    return datasets
+
+
+@dataclass
+class _Entry:
+    result: dict
+    size: int
+    created_at: float
+    datasets: set[tuple[str, str]]
+
+
+@dataclass
+class _SpilledEntry:
+    path: Path
+    size: int
+    created_at: float
+    datasets: set[tuple[str, str]]
+
+
+@dataclass
+class QueryCacheStats:
+    hits: int = 0
+    spill_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    skipped_large: int = 0
+    evictions: int = 0
+    spilled: int = 0
+    invalidations: int = 0
+
+
+class QueryResultCache:
+    """
+    Result cache for the read-only ``execute_sql`` tool.
+
+    Entries are keyed by the canonicalized SQL, the project the query runs
+    in and the agent's dataset. Only successful results are cached. Memory
+    is bounded by the serialized size of the results; least recently used
+    entries are evicted to ``spill_dir`` when configured (itself bounded by
+    ``spill_max_bytes``) or dropped otherwise. Each cache spills into its
+    own subdirectory of ``spill_dir``, removed when the cache is garbage
+    collected or the process exits, so several workers can share the
+    directory. Every entry is indexed by the
+    datasets its query references so ``invalidate_dataset`` can drop all
+    results that may have changed after a load into that dataset.
+    """
+
+    def __init__(self, config: QueryCacheConfig):
+        self.config = config
+        self.stats = QueryCacheStats()
+        self._memory: OrderedDict[str, _Entry] = OrderedDict()
+        self._memory_bytes = 0
+        self._spilled: OrderedDict[str, _SpilledEntry] = OrderedDict()
+        self._spilled_bytes = 0
+        self._spill_dir = None
+        if config.spill_dir:
+            # 同じディレクトリを使う他のワーカーのファイルには触れないように、自分専用のディレクトリに書く
+            self._spill_dir = Path(config.spill_dir) / f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            self._spill_dir.mkdir(parents=True)
+            weakref.finalize(self, shutil.rmtree, self._spill_dir, ignore_errors=True)
+
+    @staticmethod
+    def key(project_id: str, dataset_id: str, sql: str) -> str:
+        raw = "\x1f".join((project_id, dataset_id, canonicalize_sql(sql)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, project_id: str, dataset_id: str, sql: str) -> Optional[dict]:
+        """Returns a cached result for the query, or None.
+
+        The result dict and its ``rows`` list are copies, but the row dicts
+        are shared with the cache and must not be mutated.
+        """
+        key = self.key(project_id, dataset_id, sql)
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            if self._expired(entry.created_at):
+                self._drop_memory(key)
+            else:
+                self._memory.move_to_end(key)
+                self.stats.hits += 1
+                return _copy_result(entry.result)
+
+        spilled = self._spilled.get(key)
+        if spilled is not None:
+            if self._expired(spilled.created_at):
+                self._drop_spilled(key)
+            else:
+                try:
+                    result = await asyncio.to_thread(_read_json, spilled.path)
+                except (OSError, ValueError):
+                    logger.exception("Failed to read spilled query result")
+                    self._drop_spilled(key)
+                else:
+                    # 読み戻した結果はメモリ側に戻す
+                    self._drop_spilled(key, unlink=False)
+                    spilled.path.unlink(missing_ok=True)
+                    entry = _Entry(result, spilled.size, spilled.created_at, spilled.datasets)
+                    await self._store(key, entry)
+                    self.stats.spill_hits += 1
+                    return _copy_result(result)
+
+        self.stats.misses += 1
+        return None
+
+    async def put(self, project_id: str, dataset_id: str, sql: str, result: dict):
+        """Caches a successful ``execute_sql`` result."""
+        if not isinstance(result, dict) or result.get("status") != "SUCCESS":
+            return
+        key = self.key(project_id, dataset_id, sql)
+        # キャッシュから返した結果でもafter_tool_callbackは呼ばれるので、
+        # 大きな結果をシリアライズする前に確認し、有効期限も延ばさないようにする
+        if self._has_live_entry(key):
+            return
+        # 最大で数千行になるので、サイズの計算はワーカースレッドで行う
+        size = len(await asyncio.to_thread(json.dumps, result, ensure_ascii=False, default=str))
+        if size > self.config.max_entry_bytes:
+            self.stats.skipped_large += 1
+            return
+        if self._has_live_entry(key):
+            return
+        self._drop_spilled(key)
+        datasets = referenced_datasets(sql, project_id, dataset_id)
+        await self._store(key, _Entry(result, size, time.time(), datasets))
+        self.stats.stores += 1
+
+    def invalidate_dataset(self, project_id: str, dataset_id: str) -> int:
+        """Drops every cached result whose query references the dataset.
+
+        Call this after loading or modifying data in the dataset.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        dataset = (project_id, dataset_id)
+        keys = [key for key, entry in self._memory.items() if dataset in entry.datasets]
+        for key in keys:
+            self._drop_memory(key)
+        spilled_keys = [key for key, entry in self._spilled.items() if dataset in entry.datasets]
+        for key in spilled_keys:
+            self._drop_spilled(key)
+        self.stats.invalidations += 1
+        return len(keys) + len(spilled_keys)
+
+    def clear(self):
+        for key in list(self._memory):
+            self._drop_memory(key)
+        for key in list(self._spilled):
+            self._drop_spilled(key)
+
+    def snapshot(self) -> dict:
+        """Returns the current counters as a plain dict."""
+        return {
+            "entries": len(self._memory),
+            "bytes": self._memory_bytes,
+            "spilled_entries": len(self._spilled),
+            "spilled_bytes": self._spilled_bytes,
+            "hits": self.stats.hits,
+            "spill_hits": self.stats.spill_hits,
+            "misses": self.stats.misses,
+            "stores": self.stats.stores,
+            "skipped_large": self.stats.skipped_large,
+            "evictions": self.stats.evictions,
+            "invalidations": self.stats.invalidations,
+        }
+
+    def _has_live_entry(self, key: str) -> bool:
+        entry = self._memory.get(key)
+        return entry is not None and not self._expired(entry.created_at)
+
+    def _expired(self, created_at: float) -> bool:
+        return self.config.ttl > 0 and time.time() - created_at > self.config.ttl
+
+    async def _store(self, key: str, entry: _Entry):
+        evicted = self._put_memory(key, entry)
+        if not evicted or not self._spill_dir:
+            return
+        # ファイルの書き込みだけをワーカースレッドで行い、
+        # インデックスはイベントループ上で更新する
+        written = await asyncio.to_thread(self._write_spill_files, evicted)
+        for old_key, old_entry, path in written:
+            if old_key in self._memory:
+                path.unlink(missing_ok=True)
+                continue
+            self._drop_spilled(old_key, unlink=False)
+            self._spilled[old_key] = _SpilledEntry(
+                path, old_entry.size, old_entry.created_at, old_entry.datasets
+            )
+            self._spilled_bytes += old_entry.size
+            self.stats.spilled += 1
+        while self._spilled_bytes > self.config.spill_max_bytes and self._spilled:
+            self._drop_spilled(next(iter(self._spilled)))
+
+    def _put_memory(self, key: str, entry: _Entry) -> list[tuple[str, _Entry]]:
+        self._drop_memory(key)
+        self._memory[key] = entry
+        self._memory_bytes += entry.size
+        evicted = []
+        while self._memory_bytes > self.config.max_bytes and len(self._memory) > 1:
+            old_key, old_entry = self._memory.popitem(last=False)
+            self._memory_bytes -= old_entry.size
+            self.stats.evictions += 1
+            if not self._expired(old_entry.created_at):
+                evicted.append((old_key, old_entry))
+        return evicted
+
+    def _drop_memory(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry.size
+
+    def _drop_spilled(self, key: str, unlink: bool = True):
+        spilled = self._spilled.pop(key, None)
+        if spilled is not None:
+            self._spilled_bytes -= spilled.size
+            if unlink:
+                spilled.path.unlink(missing_ok=True)
+
+    def _write_spill_files(
+        self, evicted: list[tuple[str, _Entry]]
+    ) -> list[tuple[str, _Entry, Path]]:
+        written = []
+        for key, entry in evicted:
+            path = self._spill_dir / f"{key}.json"
+            try:
+                payload = json.dumps(entry.result, ensure_ascii=False, default=str)
+                path.write_text(payload, encoding="utf-8")
+            except OSError:
+                logger.exception("Failed to spill query result")
+                continue
+            written.append((key, entry, path))
+        return written
+
+
+def _copy_result(result: dict) -> dict:
+    copied = dict(result)
+    if isinstance(copied.get("rows"), list):
+        copied["rows"] = list(copied["rows"])
+    return copied
+
+
+def _read_json(path: Path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))
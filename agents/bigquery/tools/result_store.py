@@ -0,0 +1,313 @@
+import json
+import logging
+import math
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from ..config import ResultStoreConfig
+from .columnar import ColumnarTable
+
+logger = logging.getLogger(__name__)
+
+RESULT_MIME_TYPE = "application/vnd.query-result+json"
+
+AGGREGATE_METRICS = ("count", "count_distinct", "sum", "avg", "min", "max")
+
+
+@dataclass
+class StoredResult:
+    handle: str
+    user_id: str
+    session_id: str
+    sql: str
+    table: ColumnarTable
+    truncated: bool
+    size: int
+    created_at: float
+
+    @property
+    def columns(self) -> list[str]:
+        return self.table.column_names
+
+    @property
+    def row_count(self) -> int:
+        return self.table.num_rows
+
+
+@dataclass
+class ResultStoreStats:
+    stores: int = 0
+    rows_stored: int = 0
+    rows_dropped: int = 0
+    reads: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class ResultStore:
+    """
+    Server-side store for ``execute_sql`` results.
+
+    With passthrough enabled, the full rows of a query result stay here and
+    the model only receives ``summarize_result``'s compact view with a
+    handle, so it never has to repeat the rows in its answer. The server
+    streams the rows to the client directly from the store, and the model
+    reads further pages or aggregates through the result tools instead of
+    running the query again. Results belong to the session that ran the
+    query.
+
+    Rows are kept in a ``ColumnarTable`` and ingested page by page. Each
+    session holds at most ``session_max_bytes``: older results of the
+    session are evicted first, and a single result that is larger is cut
+    off and marked truncated. Across sessions the least recently used
+    results are evicted above ``max_bytes`` and results older than ``ttl``
+    expire.
+    """
+
+    def __init__(self, config: ResultStoreConfig):
+        self.config = config
+        self.stats = ResultStoreStats()
+        self._results: OrderedDict[str, StoredResult] = OrderedDict()
+        self._session_bytes: dict[tuple[str, str], int] = defaultdict(int)
+        self._bytes = 0
+
+    def put(self, user_id: str, session_id: str, sql: str, result: dict) -> StoredResult:
+        """Stores a successful ``execute_sql`` result and returns it with its handle."""
+        rows = result.get("rows") or []
+        table = ColumnarTable(list(rows[0].keys()) if rows else [])
+        truncated = bool(result.get("result_is_likely_truncated"))
+        page_rows = max(1, self.config.stream_chunk_rows)
+        for offset in range(0, len(rows), page_rows):
+            # 1つの結果がセッションの上限を超える場合は、そこまでのページだけを残す
+            if table.nbytes >= self.config.session_max_bytes:
+                self.stats.rows_dropped += len(rows) - offset
+                truncated = True
+                break
+            table.append_rows(rows[offset : offset + page_rows])
+
+        stored = StoredResult(
+            handle=f"result-{uuid.uuid4().hex[:12]}",
+            user_id=user_id,
+            session_id=session_id,
+            sql=sql,
+            table=table,
+            truncated=truncated,
+            size=table.nbytes,
+            created_at=time.monotonic(),
+        )
+        self._evict_session((user_id, session_id), stored.size)
+        self._results[stored.handle] = stored
+        self._session_bytes[(user_id, session_id)] += stored.size
+        self._bytes += stored.size
+        self.stats.stores += 1
+        self.stats.rows_stored += table.num_rows
+        self._evict()
+        return stored
+
+    def get(self, handle: str, user_id: str, session_id: str) -> Optional[StoredResult]:
+        """Returns a stored result if it exists and belongs to the session."""
+        stored = self._results.get(handle)
+        if stored is None or (stored.user_id, stored.session_id) != (user_id, session_id):
+            self.stats.misses += 1
+            return None
+        if time.monotonic() - stored.created_at > self.config.ttl:
+            self._drop(handle)
+            self.stats.misses += 1
+            return None
+        self._results.move_to_end(handle)
+        self.stats.reads += 1
+        return stored
+
+    def chunk_offsets(self, stored: StoredResult) -> range:
+        """Returns the row offsets of the client messages of a stored result."""
+        return range(0, max(stored.row_count, 1), max(1, self.config.stream_chunk_rows))
+
+    def chunk_message(self, stored: StoredResult, offset: int) -> dict:
+        """Returns the client message with ``stream_chunk_rows`` rows from ``offset``."""
+        chunk_rows = max(1, self.config.stream_chunk_rows)
+        total = stored.row_count
+        return {
+            "mime_type": RESULT_MIME_TYPE,
+            "result_handle": stored.handle,
+            "columns": stored.columns,
+            "offset": offset,
+            "rows": stored.table.rows(offset, offset + chunk_rows),
+            "row_count": total,
+            "truncated": stored.truncated,
+            "last": offset + chunk_rows >= total,
+        }
+
+    def snapshot(self) -> dict:
+        return {
+            "results": len(self._results),
+            "bytes": self._bytes,
+            "sessions": len(self._session_bytes),
+            "max_session_bytes": max(self._session_bytes.values(), default=0),
+            "stores": self.stats.stores,
+            "rows_stored": self.stats.rows_stored,
+            "rows_dropped": self.stats.rows_dropped,
+            "reads": self.stats.reads,
+            "misses": self.stats.misses,
+            "evictions": self.stats.evictions,
+        }
+
+    def _evict(self):
+        now = time.monotonic()
+        for handle in [h for h, s in self._results.items() if now - s.created_at > self.config.ttl]:
+            self._drop(handle)
+        # 直前に保存した結果は、単独で上限を超えていても残す
+        while self._bytes > self.config.max_bytes and len(self._results) > 1:
+            handle = next(iter(self._results))
+            self._drop(handle)
+            self.stats.evictions += 1
+
+    def _evict_session(self, session: tuple[str, str], incoming: int):
+        # 同じセッションの古い結果から捨てて、セッションごとの上限に収める
+        for handle in [h for h, s in self._results.items() if (s.user_id, s.session_id) == session]:
+            if self._session_bytes[session] + incoming <= self.config.session_max_bytes:
+                break
+            self._drop(handle)
+            self.stats.evictions += 1
+
+    def _drop(self, handle: str):
+        stored = self._results.pop(handle)
+        self._bytes -= stored.size
+        session = (stored.user_id, stored.session_id)
+        self._session_bytes[session] -= stored.size
+        if self._session_bytes[session] <= 0:
+            del self._session_bytes[session]
+
+
+def summarize_result(stored: StoredResult, top_k_rows: int) -> dict:
+    """The compact view of a stored result that is given to the model."""
+    summary = {
+        "status": "SUCCESS",
+        "result_handle": stored.handle,
+        "row_count": stored.row_count,
+        "columns": stored.columns,
+        "top_rows": stored.table.rows(0, top_k_rows),
+        "column_stats": _column_stats(stored),
+        "note": (
+            "The full result is delivered to the user directly. Refer to it by "
+            "result_handle and do not repeat the rows. Use fetch_result_page and "
+            "aggregate_result for follow-up questions about this result."
+        ),
+    }
+    if stored.truncated:
+        summary["result_is_likely_truncated"] = True
+    return summary
+
+
+def _column_stats(stored: StoredResult) -> dict:
+    stats = {}
+    for name, column in stored.table.columns.items():
+        numbers = column.numbers()
+        if numbers is not None:
+            column_stats: dict[str, Any] = {"nulls": stored.row_count - len(numbers)}
+            if numbers:
+                column_stats.update(
+                    min=min(numbers),
+                    max=max(numbers),
+                    avg=round(math.fsum(numbers) / len(numbers), 4),
+                )
+        else:
+            present = sum(1 for value in column if value is not None)
+            column_stats = {"nulls": stored.row_count - present, "distinct": column.distinct_count()}
+        stats[name] = column_stats
+    return stats
+
+
+def result_page(stored: StoredResult, page: int, page_rows: int) -> dict:
+    """One page (1-based) of a stored result."""
+    page_rows = max(1, page_rows)
+    page_count = max(1, math.ceil(stored.row_count / page_rows))
+    if page < 1 or page > page_count:
+        return {
+            "status": "ERROR",
+            "error_details": f"page must be between 1 and {page_count}.",
+        }
+    start = (page - 1) * page_rows
+    response = {
+        "status": "SUCCESS",
+        "result_handle": stored.handle,
+        "page": page,
+        "page_count": page_count,
+        "rows": stored.table.rows(start, start + page_rows),
+        "has_next_page": page < page_count,
+    }
+    if stored.truncated:
+        response["result_is_likely_truncated"] = True
+    return response
+
+
+def aggregate_stored_result(
+    stored: StoredResult, metric: str, column: str, group_by: str, max_groups: int
+) -> dict:
+    """Computes ``metric`` over a column of a stored result, optionally per group."""
+    metric = metric.lower()
+    if metric not in AGGREGATE_METRICS:
+        return {
+            "status": "ERROR",
+            "error_details": f"metric must be one of {', '.join(AGGREGATE_METRICS)}.",
+        }
+    columns = stored.table.columns
+    for name in (column, group_by):
+        if name and name not in columns:
+            return {
+                "status": "ERROR",
+                "error_details": f"Unknown column {name!r}. Columns: {', '.join(stored.columns)}.",
+            }
+    if not column and metric != "count":
+        return {"status": "ERROR", "error_details": f"{metric} requires a column."}
+    if column and metric in ("sum", "avg") and columns[column].numbers() is None:
+        return {"status": "ERROR", "error_details": f"{metric} requires a numeric column."}
+
+    values = list(columns[column]) if column else [True] * stored.row_count
+    if not group_by:
+        response = {"status": "SUCCESS", "value": _aggregate(metric, values)}
+    else:
+        groups: dict[Any, list] = defaultdict(list)
+        for key, value in zip(columns[group_by], values):
+            groups[key].append(value)
+        results = [
+            {group_by: key, metric: _aggregate(metric, group)} for key, group in groups.items()
+        ]
+        # 値の大きいグループから返す（件数が多い場合は上位だけ）
+        results.sort(key=lambda item: (item[metric] is not None, _sort_key(item[metric])), reverse=True)
+        response = {
+            "status": "SUCCESS",
+            "group_count": len(results),
+            "groups": results[:max_groups],
+        }
+    response.update(result_handle=stored.handle, metric=metric, row_count=stored.row_count)
+    if stored.truncated:
+        response["result_is_likely_truncated"] = True
+    return response
+
+
+def _aggregate(metric: str, values: list) -> Any:
+    present = [value for value in values if value is not None]
+    if metric == "count":
+        return len(present)
+    if metric == "count_distinct":
+        return len({json.dumps(value, default=str) for value in present})
+    if not present:
+        return None
+    if metric in ("sum", "avg"):
+        total = sum(present) if all(isinstance(value, int) for value in present) else math.fsum(present)
+        return total if metric == "sum" else round(total / len(present), 4)
+    try:
+        return min(present) if metric == "min" else max(present)
+    except TypeError:
+        keys = sorted(present, key=_sort_key)
+        return keys[0] if metric == "min" else keys[-1]
+
+
+def _sort_key(value: Any) -> tuple:
+    # 型の混在した値も比較できるように、数値とそれ以外で分けて並べる
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value, "")
+    return (0, 0, json.dumps(value, default=str))
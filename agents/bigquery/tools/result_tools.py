@@ -0,0 +1,62 @@
+from google.adk.tools import ToolContext
+
+from .result_store import ResultStore, aggregate_stored_result, result_page
+
+_UNKNOWN_HANDLE = {
+    "status": "ERROR",
+    "error_details": "Unknown or expired result_handle. Run the query again with execute_sql.",
+}
+
+
+def create_result_tools(store: ResultStore) -> list:
+    """Returns the tools that read results kept in the result store."""
+
+    def _lookup(result_handle: str, tool_context: ToolContext):
+        session = tool_context.session
+        return store.get(result_handle, session.user_id, session.id)
+
+    async def fetch_result_page(result_handle: str, page: int, tool_context: ToolContext) -> dict:
+        """Fetch a page of rows from a query result that was already executed.
+
+        Use this instead of running the query again when more rows of an
+        earlier execute_sql result are needed.
+
+        Args:
+            result_handle (str): The result_handle returned by execute_sql.
+            page (int): The page number, starting at 1.
+
+        Returns:
+            dict: The rows of the page, with "page_count" and "has_next_page".
+        """
+        stored = _lookup(result_handle, tool_context)
+        if stored is None:
+            return dict(_UNKNOWN_HANDLE)
+        return result_page(stored, page, store.config.page_rows)
+
+    async def aggregate_result(
+        result_handle: str,
+        metric: str,
+        tool_context: ToolContext,
+        column: str = "",
+        group_by: str = "",
+    ) -> dict:
+        """Aggregate a column of a query result that was already executed.
+
+        Use this instead of running a new query for follow-up questions such
+        as totals, averages or counts per group over an earlier result.
+
+        Args:
+            result_handle (str): The result_handle returned by execute_sql.
+            metric (str): One of count, count_distinct, sum, avg, min, max.
+            column (str): The column to aggregate. May be empty for count.
+            group_by (str): Optional column to group by.
+
+        Returns:
+            dict: The aggregated "value", or "groups" when group_by is given.
+        """
+        stored = _lookup(result_handle, tool_context)
+        if stored is None:
+            return dict(_UNKNOWN_HANDLE)
+        return aggregate_stored_result(stored, metric, column, group_by, store.config.max_groups)
+
+    return [fetch_result_page, aggregate_result]
@@ -0,0 +1,224 @@
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from ..schema.index import schema_index
+
+try:
+    import sqlglot
+    from sqlglot import exp
+except ImportError:
+    sqlglot = None
+
+# sqlglotがない環境での簡易チェック用
+_FIRST_KEYWORD = re.compile(r"^\s*\(*\s*(\w+)", re.IGNORECASE)
+_TABLE_REFERENCE = re.compile(r"`(?:([\w-]+)\.)?(\w+)\.(\w+)`")
+_LIMIT = re.compile(r"\bLIMIT\s+(\d+)(\s+OFFSET\s+\d+)?\s*$", re.IGNORECASE)
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+
+@dataclass
+class SqlIssue:
+    code: str
+    message: str
+    reference: Optional[str] = None
+
+
+@dataclass
+class SqlValidationResult:
+    sql: str
+    errors: list[SqlIssue] = field(default_factory=list)
+    rewrites: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def to_error_response(self) -> dict:
+        """Formats the errors like a failed ``execute_sql`` call."""
+        return {
+            "status": "ERROR",
+            "error_details": "; ".join(issue.message for issue in self.errors),
+            "validation_errors": [asdict(issue) for issue in self.errors],
+            "sql": self.sql,
+        }
+
+    def feedback(self) -> str:
+        """Describes the errors for a repair prompt."""
+        return "\n".join(f"- [{issue.code}] {issue.message}" for issue in self.errors)
+
+
+@dataclass
+class _KnownTable:
+    dataset: str
+    name: str
+    # Noneは列の一覧が分からない（スキーマのテキストを読めなかった）ことを表し、列は検証しない
+    columns: Optional[set[str]]
+
+
+def _known_tables(schema: str) -> dict[str, _KnownTable]:
+    tables = {}
+    for table in schema_index(schema).tables:
+        dataset, _, name = table.name.rpartition(".")
+        columns = {column.name.lower() for column in table.columns} if table.columns_complete else None
+        tables[name] = _KnownTable(dataset, name, columns)
+    return tables
+
+
+def validate_sql(sql: str, schema: str, max_rows: int) -> SqlValidationResult:
+    """Checks generated SQL locally before it is sent to BigQuery.
+
+    The SQL must be a single read-only query whose tables and columns exist
+    in the schema text. A missing LIMIT is added and a LIMIT above
+    ``max_rows`` is lowered; both are reported in ``rewrites`` rather than
+    as errors. Without sqlglot only the statement type, table references and
+    LIMIT are checked.
+    """
+    sql = sql.strip().rstrip(";").strip()
+    known = _known_tables(schema)
+    if sqlglot is None:
+        return _validate_lexically(sql, known, max_rows)
+
+    try:
+        statements = [statement for statement in sqlglot.parse(sql, read="bigquery") if statement]
+    except sqlglot.errors.ParseError as ex:
+        detail = ex.errors[0] if ex.errors else {}
+        message = detail.get("description", str(ex))
+        if "line" in detail:
+            message = f"{message} (line {detail['line']}, column {detail['col']})"
+        return SqlValidationResult(sql, [SqlIssue("syntax_error", message)])
+
+    if len(statements) != 1:
+        return SqlValidationResult(
+            sql, [SqlIssue("multiple_statements", "Only a single SQL statement is allowed.")]
+        )
+    tree = statements[0]
+    if not isinstance(tree, (exp.Select, exp.SetOperation)):
+        return SqlValidationResult(
+            sql,
+            [SqlIssue("not_read_only", f"Only SELECT queries are allowed, got {tree.key.upper()}.")],
+        )
+
+    result = SqlValidationResult(sql)
+    if known:
+        _check_references(tree, known, result)
+    if result.ok:
+        _enforce_limit(tree, max_rows, result)
+    return result
+
+
+def _check_references(tree, known: dict[str, _KnownTable], result: SqlValidationResult):
+    cte_names = {cte.alias_or_name for cte in tree.find_all(exp.CTE)}
+    aliases: dict[str, Optional[_KnownTable]] = {}
+    only_known_sources = not any(tree.find_all(exp.Unnest)) and not any(
+        subquery.alias for subquery in tree.find_all(exp.Subquery)
+    )
+
+    for table in tree.find_all(exp.Table):
+        if not table.db and table.name in cte_names:
+            aliases[table.alias_or_name] = None
+            only_known_sources = False
+            continue
+        known_table = known.get(table.name)
+        if known_table is None or (table.db and table.db != known_table.dataset):
+            reference = ".".join(part for part in (table.catalog, table.db, table.name) if part)
+            result.errors.append(
+                SqlIssue(
+                    "unknown_table",
+                    f"Table `{reference}` is not in the schema. "
+                    f"Known tables: {', '.join(sorted(known))}.",
+                    reference,
+                )
+            )
+            aliases[table.alias_or_name] = None
+            only_known_sources = False
+            continue
+        aliases[table.alias_or_name] = known_table
+        aliases[table.name] = known_table
+
+    select_aliases = {alias.alias.lower() for alias in tree.find_all(exp.Alias)}
+    referenced = [table for table in aliases.values() if table is not None]
+
+    for column in tree.find_all(exp.Column):
+        name = column.name.lower()
+        if not name or isinstance(column.this, exp.Star):
+            continue
+        if column.table:
+            if column.table not in aliases:
+                # 構造体のフィールド参照などはここでは判定しない
+                continue
+            table = aliases[column.table]
+            if table is not None and table.columns is not None and name not in table.columns:
+                result.errors.append(
+                    SqlIssue(
+                        "unknown_column",
+                        f"Column `{column.name}` does not exist in table `{table.name}`. "
+                        f"Columns: {', '.join(sorted(table.columns))}.",
+                        f"{table.name}.{column.name}",
+                    )
+                )
+        elif only_known_sources and name not in select_aliases:
+            if (
+                referenced
+                and all(table.columns is not None for table in referenced)
+                and not any(name in table.columns for table in referenced)
+            ):
+                result.errors.append(
+                    SqlIssue(
+                        "unknown_column",
+                        f"Column `{column.name}` does not exist in "
+                        f"{', '.join(sorted({f'`{table.name}`' for table in referenced}))}.",
+                        column.name,
+                    )
+                )
+
+
+def _enforce_limit(tree, max_rows: int, result: SqlValidationResult):
+    limit = tree.args.get("limit")
+    if limit is None:
+        result.sql = f"{result.sql}\nLIMIT {max_rows}"
+        result.rewrites.append(f"added LIMIT {max_rows}")
+        return
+    value = limit.expression
+    if isinstance(value, exp.Literal) and value.is_int and int(value.this) > max_rows:
+        tree.set("limit", exp.Limit(expression=exp.Literal.number(max_rows)))
+        result.sql = tree.sql(dialect="bigquery", pretty=True)
+        result.rewrites.append(f"lowered LIMIT {value.this} to {max_rows}")
+
+
+def _validate_lexically(
+    sql: str, known: dict[str, _KnownTable], max_rows: int
+) -> SqlValidationResult:
+    text = _COMMENT.sub(" ", sql)
+    match = _FIRST_KEYWORD.match(text)
+    if not match or match.group(1).upper() not in ("SELECT", "WITH"):
+        keyword = match.group(1).upper() if match else "empty statement"
+        return SqlValidationResult(
+            sql, [SqlIssue("not_read_only", f"Only SELECT queries are allowed, got {keyword}.")]
+        )
+
+    result = SqlValidationResult(sql)
+    if known:
+        for project, dataset, name in _TABLE_REFERENCE.findall(text):
+            table = known.get(name)
+            if table is None or dataset != table.dataset:
+                reference = ".".join(part for part in (project, dataset, name) if part)
+                result.errors.append(
+                    SqlIssue(
+                        "unknown_table",
+                        f"Table `{reference}` is not in the schema. "
+                        f"Known tables: {', '.join(sorted(known))}.",
+                        reference,
+                    )
+                )
+    if not result.ok:
+        return result
+
+    limit = _LIMIT.search(text.strip())
+    if limit is None:
+        result.sql = f"{sql}\nLIMIT {max_rows}"
+        result.rewrites.append(f"added LIMIT {max_rows}")
+    elif int(limit.group(1)) > max_rows:
+        result.sql = _LIMIT.sub(lambda m: f"LIMIT {max_rows}{m.group(2) or ''}", sql.strip())
+        result.rewrites.append(f"lowered LIMIT {limit.group(1)} to {max_rows}")
+    return result
@@ -0,0 +1,251 @@
+"""
+ストーリーのバッチ生成
+
+トピックのJSONL（1行に {"topic": "...", "id": "..."}、または文字列）を読み、
+1つのRunnerを共有してトピックごとのセッションで StoryFlowAgent を並行に実行する。
+ストーリーは終わった順に出力のJSONLへ書き出し、最後にスループット（ストーリー/分）と
+段階ごとのレイテンシを表示する。セッションIDはバッチIDとトピックのIDから決まるので、
+DATABASE_URL でセッションをDBに保存していれば、再実行で失敗したトピックだけを続きから生成できる。
+
+使い方:
+  uv run python -m agents.custom_story_generator.batch --input topics.jsonl --output stories.jsonl
+
+引数:
+  --input       : トピックのJSONL
+  --output      : ストーリーを書き出すJSONL
+  --batch-id    : セッションIDの接頭辞（省略時は入力ファイル名）
+  --concurrency : 同時に生成するストーリーの数（STORY_BATCH_CONCURRENCY）
+  --rpm         : モデル呼び出しの1分あたりの上限、0は無制限（STORY_BATCH_MODEL_RPM）
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.runners import Runner
+from google.genai import types
+
+from .config import BatchConfig
+from .rate_limit import ModelRateLimiter, ModelRateLimitPlugin
+from .run_custom_agent import (
+    APP_NAME,
+    get_or_create_session,
+    session_service,
+    story_flow_agent,
+    tracing_plugins,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_USER_ID = "batch"
+
+
+class StageLatencyPlugin(BasePlugin):
+    """
+    ADK plugin timing the stages of ``StoryFlowAgent`` per session.
+
+    ``stages`` maps an agent name to the stage labels of its first, second,
+    ... run within one invocation, since the story generator also runs the
+    ``regenerate`` stage. Stages skipped by a checkpoint are not timed (so
+    a regeneration resumed after a skipped ``generate`` counts as the first
+    run).
+    """
+
+    def __init__(self, stages: dict[str, list[str]]):
+        super().__init__(name="stage_latency")
+        self.stages = stages
+        self.latencies: dict[str, list[float]] = {}
+        self._started: dict[tuple[str, str], float] = {}
+        self._sessions: dict[str, dict[str, float]] = {}
+
+    async def before_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> Optional[types.Content]:
+        if agent.name in self.stages:
+            self._started[(callback_context.session.id, agent.name)] = time.perf_counter()
+        return None
+
+    async def after_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> Optional[types.Content]:
+        started = self._started.pop((callback_context.session.id, agent.name), None)
+        if started is None:
+            return None
+        timings = self._sessions.setdefault(callback_context.session.id, {})
+        labels = self.stages[agent.name]
+        runs = sum(1 for label in labels if label in timings)
+        label = labels[min(runs, len(labels) - 1)]
+        seconds = time.perf_counter() - started
+        timings[label] = timings.get(label, 0.0) + seconds
+        self.latencies.setdefault(label, []).append(seconds)
+        return None
+
+    def pop(self, session_id: str) -> dict[str, float]:
+        """Returns and forgets the stage timings of one session."""
+        for key in [key for key in self._started if key[0] == session_id]:
+            del self._started[key]
+        return self._sessions.pop(session_id, {})
+
+    def snapshot(self) -> dict:
+        return {label: _summarize(values) for label, values in self.latencies.items()}
+
+
+def _summarize(values: list[float]) -> dict:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean_s": round(statistics.fmean(ordered), 3),
+        "p50_s": round(ordered[len(ordered) // 2], 3),
+        "p90_s": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))], 3),
+        "max_s": round(ordered[-1], 3),
+    }
+
+
+def read_topics(path: Path) -> list[dict[str, str]]:
+    """Reads ``{"id", "topic"}`` items from a JSONL file; ids default to the line number."""
+    topics = []
+    with path.open(encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"topic": item}
+            if not item.get("topic"):
+                raise ValueError(f"{path}:{number}: missing topic")
+            topics.append({"id": str(item.get("id", number)), "topic": item["topic"]})
+    return topics
+
+
+async def generate_story(
+    runner: Runner, stage_latency: StageLatencyPlugin, item: dict[str, str], session_id: str
+) -> dict[str, Any]:
+    """Runs ``StoryFlowAgent`` for one topic in its own session and returns the output record."""
+    started = time.perf_counter()
+    record: dict[str, Any] = {"id": item["id"], "topic": item["topic"], "session_id": session_id}
+    try:
+        await get_or_create_session(item["topic"], session_id=session_id, user_id=BATCH_USER_ID)
+        content = types.Content(
+            role="user", parts=[types.Part(text=f"Generate a story about: {item['topic']}")]
+        )
+        async for _ in runner.run_async(user_id=BATCH_USER_ID, session_id=session_id, new_message=content):
+            pass
+        session = await runner.session_service.get_session(
+            app_name=APP_NAME, user_id=BATCH_USER_ID, session_id=session_id
+        )
+        state = session.state if session else {}
+        record.update(
+            story=state.get("current_story"),
+            tone=state.get("tone_check_result"),
+            grammar=state.get("grammar_suggestions"),
+            critic_iterations=len(state.get("loop_decisions") or []) or None,
+        )
+        if not record["story"]:
+            record["error"] = "no story was generated"
+    except Exception as error:
+        logger.exception("Story %s failed", item["id"])
+        record["error"] = f"{type(error).__name__}: {error}"
+    record["stages"] = {label: round(seconds, 3) for label, seconds in stage_latency.pop(session_id).items()}
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+async def run_batch(
+    topics: Iterable[dict[str, str]],
+    output: Path,
+    batch_id: str,
+    config: Optional[BatchConfig] = None,
+) -> dict[str, Any]:
+    """Generates a story per topic with at most ``config.concurrency`` in flight.
+
+    Args:
+        topics: ``{"id", "topic"}`` items, e.g. from ``read_topics``.
+        output: JSONL file the records are appended to as they finish.
+        batch_id: Prefix of the session ids, one session per topic id.
+        config: Concurrency and model rate limit. Read from the environment
+            when omitted.
+
+    Returns:
+        dict: Throughput, per-stage latency and rate limiter statistics.
+    """
+    config = config or BatchConfig.from_env()
+    limiter = ModelRateLimiter(config.model_rpm, config.model_burst)
+    stage_latency = StageLatencyPlugin(
+        {
+            story_flow_agent.story_generator.name: ["generate", "regenerate"],
+            story_flow_agent.loop_agent.name: ["critic_loop"],
+            story_flow_agent.post_processing_agent.name: ["post_processing"],
+        }
+    )
+    runner = Runner(
+        agent=story_flow_agent,
+        app_name=APP_NAME,
+        session_service=session_service,
+        plugins=[ModelRateLimitPlugin(limiter), stage_latency, *tracing_plugins],
+    )
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in topics:
+        queue.put_nowait(item)
+    total = queue.qsize()
+    results = {"stories": 0, "failed": 0}
+
+    async def worker(file):
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            record = await generate_story(runner, stage_latency, item, f"{batch_id}-{item['id']}")
+            # 終わった順に書き出すので、途中で止めてもそれまでの結果は残る
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            file.flush()
+            results["failed" if "error" in record else "stories"] += 1
+            logger.info("Finished %d/%d stories", results["stories"] + results["failed"], total)
+
+    started = time.perf_counter()
+    with output.open("a", encoding="utf-8") as file:
+        await asyncio.gather(*(worker(file) for _ in range(min(config.concurrency, total) or 1)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "topics": total,
+        **results,
+        "concurrency": config.concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "stories_per_minute": round(results["stories"] / elapsed * 60, 2) if elapsed else 0.0,
+        "stages": stage_latency.snapshot(),
+        "model_rate_limit": limiter.snapshot(),
+    }
+
+
+async def main(args: argparse.Namespace):
+    config = BatchConfig.from_env()
+    if args.concurrency is not None:
+        config.concurrency = args.concurrency
+    if args.rpm is not None:
+        config.model_rpm = args.rpm
+    report = await run_batch(
+        read_topics(args.input), args.output, args.batch_id or args.input.stem, config
+    )
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", type=Path, required=True)
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--batch-id")
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--rpm", type=float)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+from typing import Any, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+from .config import CheckpointConfig
+
+logger = logging.getLogger(__name__)
+
+# 段階の入力のハッシュに含めるエージェントの設定（プロンプトやループの回数が変われば再実行する）
+_FINGERPRINT_FIELDS = (
+    "instruction",
+    "output_key",
+    "max_iterations",
+    "approval_token",
+    "min_change_ratio",
+    "max_tokens",
+    "max_seconds",
+)
+
+
+def agent_fingerprint(agent: BaseAgent) -> dict[str, Any]:
+    """Describes the settings of ``agent`` and its sub-agents that affect its output."""
+    fingerprint: dict[str, Any] = {"name": agent.name, "type": type(agent).__name__}
+    for field in _FINGERPRINT_FIELDS:
+        value = getattr(agent, field, None)
+        if isinstance(value, (str, int, float)):
+            fingerprint[field] = value
+    model = getattr(agent, "model", None)
+    if model:
+        fingerprint["model"] = model if isinstance(model, str) else getattr(model, "model", type(model).__name__)
+    if agent.sub_agents:
+        fingerprint["sub_agents"] = [agent_fingerprint(sub_agent) for sub_agent in agent.sub_agents]
+    return fingerprint
+
+
+def output_keys(agent: BaseAgent) -> list[str]:
+    """State keys written by ``agent`` and its sub-agents, in order."""
+    keys = []
+    for key in (getattr(agent, "output_key", None), getattr(agent, "decisions_key", None)):
+        if key and key not in keys:
+            keys.append(key)
+    for sub_agent in agent.sub_agents:
+        keys.extend(key for key in output_keys(sub_agent) if key not in keys)
+    return keys
+
+
+class StageCheckpoints:
+    """
+    Checkpoints of the stages of one ``StoryFlowAgent`` run.
+
+    A checkpoint is kept in session state (``state_key``) per stage, e.g.
+    ``{"generate": {"input": "<sha256>", "outputs": {"current_story": ...}}}``,
+    so it is saved by whichever session service the runner uses. The input
+    hash covers the state keys the stage reads and the settings of its
+    agents (see ``agent_fingerprint``).
+
+    ``skip`` tells whether a stage already completed with the same inputs.
+    Its recorded outputs are then put back on an overlay instead of state,
+    because a later stage may have overwritten them (e.g. the regenerated
+    story replaces the revised one), and the overlay is what the inputs of
+    the next stage are read from. The overlay is written to state by one
+    event from ``flush`` before the next stage that has to run, or at the
+    end of the run.
+    """
+
+    def __init__(self, ctx: InvocationContext, author: str, config: CheckpointConfig):
+        self._ctx = ctx
+        self._author = author
+        self._config = config
+        self._saved: dict[str, dict[str, Any]] = dict(ctx.session.state.get(config.state_key) or {})
+        self._pending: dict[str, Any] = {}
+        self._inputs: dict[str, str] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Reads ``key`` as the next stage will see it."""
+        if key in self._pending:
+            return self._pending[key]
+        return self._ctx.session.state.get(key, default)
+
+    def skip(self, stage: str, agent: BaseAgent, input_keys: list[str]) -> bool:
+        """Whether ``stage`` completed before with the same inputs.
+
+        Args:
+            stage: Name of the stage, e.g. ``generate``.
+            agent: Agent that runs the stage.
+            input_keys: State keys the stage reads.
+
+        Returns:
+            bool: True when the recorded outputs were restored instead.
+        """
+        digest = self._digest(agent, {key: self.get(key) for key in input_keys})
+        self._inputs[stage] = digest
+        checkpoint = self._saved.get(stage)
+        if not self._config.enabled or not checkpoint or checkpoint.get("input") != digest:
+            return False
+        logger.info("[%s] Stage %s is unchanged since its checkpoint, skipping it.", self._author, stage)
+        self._pending.update(checkpoint.get("outputs") or {})
+        return True
+
+    def flush(self) -> Optional[Event]:
+        """Returns the event that writes the restored outputs, if any differ from state."""
+        state = self._ctx.session.state
+        delta = {key: value for key, value in self._pending.items() if state.get(key) != value}
+        self._pending = {}
+        if not delta:
+            return None
+        return self._event(delta)
+
+    def record(self, stage: str, keys: list[str]) -> Optional[Event]:
+        """Returns the event that saves the checkpoint of ``stage`` after it ran."""
+        if not self._config.enabled:
+            return None
+        state = self._ctx.session.state
+        missing = [key for key in keys if key not in state]
+        if missing:
+            # 結果の一部がない段階は完了とみなさず、次回も実行する
+            logger.warning("[%s] Stage %s did not write %s, not saving a checkpoint.", self._author, stage, missing)
+            return None
+        self._saved[stage] = {
+            "input": self._inputs[stage],
+            "outputs": {key: state[key] for key in keys},
+        }
+        return self._event({self._config.state_key: dict(self._saved)})
+
+    @staticmethod
+    def _digest(agent: BaseAgent, inputs: dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"agent": agent_fingerprint(agent), "inputs": inputs}, sort_keys=True, default=str, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _event(self, state_delta: dict[str, Any]) -> Event:
+        return Event(
+            invocation_id=self._ctx.invocation_id,
+            author=self._author,
+            branch=self._ctx.branch,
+            actions=EventActions(state_delta=state_delta),
+        )
@@ -0,0 +1,11 @@
+from .batch_config import BatchConfig
+from .checkpoint_config import CheckpointConfig
+from .critic_loop_config import CriticLoopConfig
+from .post_processing_config import PostProcessingConfig
+
+__all__ = [
+    "BatchConfig",
+    "CheckpointConfig",
+    "CriticLoopConfig",
+    "PostProcessingConfig",
+]
@@ -0,0 +1,31 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class BatchConfig:
+    concurrency: int
+    model_rpm: float
+    model_burst: int
+
+    @classmethod
+    def from_env(cls) -> "BatchConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            BatchConfig: Configuration instance populated from environment variables.
+
+        Raises:
+            ValueError: If STORY_BATCH_CONCURRENCY is less than 1.
+        """
+        concurrency = int(os.getenv("STORY_BATCH_CONCURRENCY", "4"))
+        if concurrency < 1:
+            raise ValueError(f"STORY_BATCH_CONCURRENCY must be at least 1: {concurrency}")
+        return cls(
+            # 同時に生成するストーリーの数
+            concurrency=concurrency,
+            # バッチ全体でのモデル呼び出しの上限（1分あたり、0は無制限）
+            model_rpm=float(os.getenv("STORY_BATCH_MODEL_RPM", "0")),
+            # 上限の範囲内で続けて送ってよい呼び出しの数
+            model_burst=int(os.getenv("STORY_BATCH_MODEL_BURST", "5")),
+        )
@@ -0,0 +1,22 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class CheckpointConfig:
+    enabled: bool
+    state_key: str
+
+    @classmethod
+    def from_env(cls) -> "CheckpointConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            CheckpointConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            # 1: 入力が変わっていない段階は再実行せず、前回の結果を使う
+            enabled=os.getenv("STORY_CHECKPOINTS", "1") == "1",
+            # チェックポイントを保存するセッションの状態のキー
+            state_key=os.getenv("STORY_CHECKPOINT_STATE_KEY", "story_checkpoints"),
+        )
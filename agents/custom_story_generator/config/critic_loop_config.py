@@ -0,0 +1,32 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class CriticLoopConfig:
+    max_iterations: int
+    convergence: bool
+    approval_token: str
+    min_change_ratio: float
+    max_tokens: int
+    max_seconds: float
+
+    @classmethod
+    def from_env(cls) -> "CriticLoopConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            CriticLoopConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            max_iterations=int(os.getenv("STORY_LOOP_MAX_ITERATIONS", "2")),
+            # 0にすると常にmax_iterations回繰り返す（ADKのLoopAgentのまま）
+            convergence=os.getenv("STORY_LOOP_CONVERGENCE", "1") == "1",
+            # 批評がこの語で始まる場合は修正不要として終了する
+            approval_token=os.getenv("STORY_LOOP_APPROVAL_TOKEN", "APPROVED"),
+            # 修正前後のストーリーの変化の割合（0〜1）がこれ未満なら収束したとみなす
+            min_change_ratio=float(os.getenv("STORY_LOOP_MIN_CHANGE_RATIO", "0.05")),
+            # 1回の実行でループが使えるトークン数と秒数（0は無制限）
+            max_tokens=int(os.getenv("STORY_LOOP_MAX_TOKENS", "0")),
+            max_seconds=float(os.getenv("STORY_LOOP_MAX_SECONDS", "0")),
+        )
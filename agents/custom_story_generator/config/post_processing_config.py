@@ -0,0 +1,25 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class PostProcessingConfig:
+    mode: str
+
+    @classmethod
+    def from_env(cls) -> "PostProcessingConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            PostProcessingConfig: Configuration instance populated from environment variables.
+
+        Raises:
+            ValueError: If STORY_POST_PROCESSING_MODE is not one of parallel or sequential.
+        """
+        mode = os.getenv("STORY_POST_PROCESSING_MODE", "parallel")
+        if mode not in ("parallel", "sequential"):
+            raise ValueError(f"Unsupported STORY_POST_PROCESSING_MODE: {mode}")
+        return cls(
+            # parallel: 文法・トーンなどのチェックを同時に実行する, sequential: 1つずつ順に実行する
+            mode=mode,
+        )
@@ -0,0 +1,162 @@
+import difflib
+import logging
+import time
+from typing import Any, AsyncGenerator, Optional
+from typing_extensions import override
+
+from google.adk.agents import BaseAgent, LoopAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.utils.context_utils import Aclosing
+
+from .config import CriticLoopConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ConvergentLoopAgent(LoopAgent):
+    """
+    Critic/reviser loop that stops as soon as another round is not worth it.
+
+    Besides ``max_iterations`` and escalation by a sub-agent, the loop ends
+    when:
+
+    - the critic approves the story (``criticism_key`` starts with
+      ``approval_token``); the reviser is skipped for that round,
+    - the reviser changed less than ``min_change_ratio`` of the story, or
+    - the next round would not fit into ``max_tokens`` / ``max_seconds``,
+      estimated from the average cost of the rounds so far.
+
+    Every decision is appended to ``state[decisions_key]`` by an event from
+    this agent, e.g. ``{"iteration": 1, "decision": "converged",
+    "change_ratio": 0.02, "tokens": 812, "elapsed_seconds": 1.4}``.
+    Resumable invocations fall back to the plain ``LoopAgent``.
+    """
+
+    criticism_key: str = "criticism"
+    story_key: str = "current_story"
+    decisions_key: str = "loop_decisions"
+    approval_token: str = "APPROVED"
+    min_change_ratio: float = 0.0
+    max_tokens: int = 0
+    max_seconds: float = 0.0
+
+    @override
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        if ctx.is_resumable or not self.sub_agents:
+            async for event in super()._run_async_impl(ctx):
+                yield event
+            return
+
+        started = time.perf_counter()
+        tokens = 0
+        decisions: list[dict[str, Any]] = []
+        iteration = 0
+        while True:
+            iteration += 1
+            story_before = ctx.session.state.get(self.story_key)
+            decision = None
+            for sub_agent in self.sub_agents:
+                escalated = False
+                async with Aclosing(sub_agent.run_async(ctx)) as agen:
+                    async for event in agen:
+                        yield event
+                        if event.usage_metadata and event.usage_metadata.total_token_count:
+                            tokens += event.usage_metadata.total_token_count
+                        if event.actions.escalate:
+                            escalated = True
+                if escalated:
+                    decision = "escalated"
+                    break
+                if getattr(sub_agent, "output_key", None) == self.criticism_key and self._approved(
+                    ctx.session.state.get(self.criticism_key)
+                ):
+                    decision = "approved"
+                    break
+                if self.max_tokens and tokens >= self.max_tokens:
+                    decision = "token_budget"
+                    break
+                if self.max_seconds and time.perf_counter() - started >= self.max_seconds:
+                    decision = "time_budget"
+                    break
+
+            elapsed = time.perf_counter() - started
+            change_ratio = None
+            if decision is None:
+                change_ratio = self._change_ratio(story_before, ctx.session.state.get(self.story_key))
+                decision = self._next_step(iteration, change_ratio, tokens, elapsed)
+
+            decisions.append(
+                {
+                    "iteration": iteration,
+                    "decision": decision,
+                    "change_ratio": None if change_ratio is None else round(change_ratio, 4),
+                    "tokens": tokens,
+                    "elapsed_seconds": round(elapsed, 3),
+                }
+            )
+            logger.info("[%s] Iteration %d: %s", self.name, iteration, decisions[-1])
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                actions=EventActions(state_delta={self.decisions_key: list(decisions)}),
+            )
+            if decision != "continue":
+                return
+
+    def _approved(self, criticism: Any) -> bool:
+        if not self.approval_token or not isinstance(criticism, str):
+            return False
+        return criticism.strip().lstrip("*_#` ").upper().startswith(self.approval_token.upper())
+
+    @staticmethod
+    def _change_ratio(before: Any, after: Any) -> float:
+        if not isinstance(before, str) or not isinstance(after, str):
+            return 1.0
+        # 単語単位で比べる（文字単位より速く、言い換えの量に近い）
+        return 1.0 - difflib.SequenceMatcher(None, before.split(), after.split(), autojunk=False).ratio()
+
+    def _next_step(self, iteration: int, change_ratio: float, tokens: int, elapsed: float) -> str:
+        if change_ratio < self.min_change_ratio:
+            return "converged"
+        if self.max_iterations and iteration >= self.max_iterations:
+            return "max_iterations"
+        # 次の1回も平均と同じだけかかると見積もり、予算に収まらなければ始めない
+        if self.max_tokens and tokens + tokens / iteration > self.max_tokens:
+            return "token_budget"
+        if self.max_seconds and elapsed + elapsed / iteration > self.max_seconds:
+            return "time_budget"
+        return "continue"
+
+
+def create_critic_reviser_loop(
+    critic: BaseAgent, reviser: BaseAgent, config: Optional[CriticLoopConfig] = None
+) -> LoopAgent:
+    """Builds the ``CriticReviserLoop`` that refines ``current_story``.
+
+    Args:
+        critic: Agent that writes its review of the story to ``criticism``.
+        reviser: Agent that rewrites ``current_story`` from the review.
+        config: Iteration limit and the convergence and budget checks. Read
+            from the environment when omitted.
+
+    Returns:
+        LoopAgent: The critic/reviser loop.
+    """
+    config = config or CriticLoopConfig.from_env()
+    if not config.convergence:
+        return LoopAgent(
+            name="CriticReviserLoop", sub_agents=[critic, reviser], max_iterations=config.max_iterations
+        )
+    return ConvergentLoopAgent(
+        name="CriticReviserLoop",
+        sub_agents=[critic, reviser],
+        max_iterations=config.max_iterations,
+        approval_token=config.approval_token,
+        min_change_ratio=config.min_change_ratio,
+        max_tokens=config.max_tokens,
+        max_seconds=config.max_seconds,
+    )
@@ -0,0 +1,94 @@
+import logging
+from typing import Any, AsyncGenerator, Optional
+from typing_extensions import override
+
+from google.adk.agents import BaseAgent, ParallelAgent, SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+from .config import PostProcessingConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ParallelChecksAgent(ParallelAgent):
+    """
+    Runs independent checks of the story concurrently.
+
+    Each check runs in its own branch (``<name>.<check>``), so the stage
+    takes about as long as the slowest check instead of the sum of all of
+    them. Events are passed on as they arrive, and every event carries the
+    branch of the check that produced it.
+
+    The state writes of the checks (e.g. their ``output_key``) are held
+    back instead of being applied in arrival order. After all checks
+    finish they are merged in the order of ``sub_agents`` and applied by a
+    single event from this agent. When two checks write the same key, the
+    later check wins.
+    """
+
+    @override
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        deltas: dict[str, dict[str, Any]] = {}
+        async for event in super()._run_async_impl(ctx):
+            if event.author == self.name:
+                # 全チェックの完了を示すイベントより前に、まとめた状態の書き込みを反映する
+                if event.actions.end_of_agent and deltas:
+                    yield self._merge_event(ctx, deltas)
+                    deltas = {}
+                yield event
+                continue
+            if event.actions.state_delta:
+                check = self._check_name(event)
+                deltas.setdefault(check, {}).update(event.actions.state_delta)
+                event.actions.state_delta = {}
+            yield event
+        if deltas:
+            yield self._merge_event(ctx, deltas)
+
+    def _check_name(self, event: Event) -> str:
+        # ブランチは "<親>.<このエージェント>.<チェック>[.<チェック内のエージェント>]"
+        prefix = f"{self.name}."
+        branch = event.branch or ""
+        position = branch.find(prefix)
+        if position < 0:
+            return event.author
+        return branch[position + len(prefix) :].split(".", 1)[0]
+
+    def _merge_event(self, ctx: InvocationContext, deltas: dict[str, dict[str, Any]]) -> Event:
+        merged: dict[str, Any] = {}
+        writers: dict[str, str] = {}
+        for check in self.sub_agents:
+            for key, value in deltas.get(check.name, {}).items():
+                if key in writers:
+                    logger.warning(
+                        "[%s] %s overwrites %r written by %s", self.name, check.name, key, writers[key]
+                    )
+                merged[key] = value
+                writers[key] = check.name
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=merged),
+        )
+
+
+def create_post_processing_agent(
+    checks: list[BaseAgent], config: Optional[PostProcessingConfig] = None
+) -> BaseAgent:
+    """Builds the ``PostProcessing`` stage that runs ``checks`` over ``current_story``.
+
+    Args:
+        checks: Agents that only read the story and write their own state keys.
+        config: Selects whether the checks run concurrently or one by one.
+
+    Returns:
+        BaseAgent: The post-processing agent.
+    """
+    config = config or PostProcessingConfig.from_env()
+    if config.mode == "sequential":
+        return SequentialAgent(name="PostProcessing", sub_agents=checks)
+    return ParallelChecksAgent(name="PostProcessing", sub_agents=checks)
@@ -0,0 +1,76 @@
+import asyncio
+import time
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+
+
+class ModelRateLimiter:
+    """
+    Token bucket limiting model calls to ``rpm`` per minute.
+
+    Up to ``burst`` calls go out immediately, after that one call every
+    ``60 / rpm`` seconds. A caller reserves its slot under the lock and
+    sleeps outside of it, so waiting callers are served in arrival order
+    without holding each other up. ``rpm <= 0`` disables the limit.
+    """
+
+    def __init__(self, rpm: float, burst: int = 1):
+        self.rpm = rpm
+        self.burst = max(1, burst)
+        self._rate = rpm / 60
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.acquired = 0
+        self.delayed = 0
+        self.waited_seconds = 0.0
+
+    async def acquire(self) -> float:
+        """Waits for a slot and returns how long it waited in seconds."""
+        self.acquired += 1
+        if self.rpm <= 0:
+            return 0.0
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            # 足りない分は先の時刻を予約する（トークンが負になる）
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self._rate
+            self._tokens -= 1
+        if wait > 0:
+            self.delayed += 1
+            self.waited_seconds += wait
+            await asyncio.sleep(wait)
+        return wait
+
+    def snapshot(self) -> dict:
+        return {
+            "rpm": self.rpm,
+            "burst": self.burst,
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "waited_seconds": round(self.waited_seconds, 3),
+        }
+
+
+class ModelRateLimitPlugin(BasePlugin):
+    """
+    ADK plugin that holds every model call until ``limiter`` grants it.
+
+    Registered on the Runner it covers all agents of the tree, so one
+    limiter caps the calls of every session sharing that runner.
+    """
+
+    def __init__(self, limiter: ModelRateLimiter):
+        super().__init__(name="model_rate_limit")
+        self.limiter = limiter
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        await self.limiter.acquire()
+        return None
@@ -1,7 +1,9 @@
 import logging
+import os
 from dotenv import load_dotenv
 
 from google.genai import types
+from google.adk.events import Event, EventActions
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 
@@ -13,6 +15,9 @@ from agents.custom_story_generator.sub_agents import (
     grammar_check,
     tone_check,
 )
+from server.config import SessionStoreConfig
+from server.sessions import create_session_service
+from server.tracing_plugin import create_tracing_plugins
 
 load_dotenv()
 
@@ -40,38 +45,64 @@ INITIAL_STATE = {"topic": "a brave kitten exploring a haunted house"}
 
 
 # --- Setup Runner and Session ---
-async def setup_session_and_runner():
+# DATABASE_URL があればセッションをDBに保存し、別のプロセスから再実行しても続きから再開できる
+if os.getenv("DATABASE_URL"):
+    session_service = create_session_service(SessionStoreConfig.from_env())
+else:
     session_service = InMemorySessionService()
-    session = await session_service.create_session(
-        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID, state=INITIAL_STATE
-    )
-    logger.info(f"Initial session state: {session.state}")
-    runner = Runner(
-        agent=story_flow_agent,
-        app_name=APP_NAME,
-        session_service=session_service,
+
+# TRACE_ENABLED=1 のときは実行ごとのトレースを TRACE_DIR に書き出す
+tracing_plugins = create_tracing_plugins()
+
+runner = Runner(
+    agent=story_flow_agent,
+    app_name=APP_NAME,
+    session_service=session_service,
+    plugins=tracing_plugins,
+)
+
+
+async def get_or_create_session(topic: str, session_id: str = SESSION_ID, user_id: str = USER_ID):
+    """
+    Returns the story session, creating it on the first run.
+
+    The session is reused across runs so that ``StoryFlowAgent`` can skip
+    the stages it already completed. A new topic is written through an
+    event, so it is saved by persistent session stores as well.
+    """
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id=user_id, session_id=session_id
     )
-    return session_service, runner
+    if not session:
+        session = await session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=session_id,
+            state={**INITIAL_STATE, "topic": topic},
+        )
+        logger.info(f"Initial session state: {session.state}")
+        return session
+
+    if session.state.get("topic") != topic:
+        await session_service.append_event(
+            session,
+            Event(author="user", actions=EventActions(state_delta={"topic": topic})),
+        )
+        logger.info(f"Updated session state topic to: {topic}")
+    else:
+        logger.info("Resuming the story session from its checkpoints.")
+    return session
 
 
 # --- Function to Interact with the Agent ---
 async def call_agent_async(user_input_topic: str):
     """
     Sends a new topic to the agent (overwriting the initial one if needed)
-    and runs the workflow.
+    and runs the workflow. Rerunning after a failure resumes from the
+    first stage that did not complete.
     """
 
-    session_service, runner = await setup_session_and_runner()
-
-    current_session = await session_service.get_session(
-        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
-    )
-    if not current_session:
-        logger.error("Session not found!")
-        return
-
-    current_session.state["topic"] = user_input_topic
-    logger.info(f"Updated session state topic to: {user_input_topic}")
+    await get_or_create_session(user_input_topic)
 
     content = types.Content(
         role="user",
@@ -1,11 +1,16 @@
 import logging
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 from typing_extensions import override
 
-from google.adk.agents import LlmAgent, BaseAgent, LoopAgent, SequentialAgent
+from google.adk.agents import LlmAgent, BaseAgent, LoopAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event
 
+from .checkpoints import StageCheckpoints, output_keys
+from .config import CheckpointConfig, CriticLoopConfig, PostProcessingConfig
+from .critic_loop import create_critic_reviser_loop
+from .post_processing import create_post_processing_agent
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -15,7 +20,16 @@ class StoryFlowAgent(BaseAgent):
 
     This agent orchestrates a sequence of LLM agents to generate a story,
     critique it, revise it, check grammar and tone, and potentially
-    regenerate the story if the tone is negative.
+    regenerate the story if the tone is negative. The grammar and tone
+    checks, plus any ``extra_checks``, run concurrently by default (see
+    ``create_post_processing_agent``). The critic/reviser loop ends early
+    once the critic approves or the story stops changing (see
+    ``create_critic_reviser_loop``).
+
+    Each stage saves a checkpoint in session state when it completes (see
+    ``StageCheckpoints``), so running the agent again on the same session
+    resumes from the first stage whose inputs changed or that did not
+    finish.
     """
 
     story_generator: LlmAgent
@@ -25,7 +39,8 @@ class StoryFlowAgent(BaseAgent):
     tone_check: LlmAgent
 
     loop_agent: LoopAgent
-    sequential_agent: SequentialAgent
+    post_processing_agent: BaseAgent
+    checkpoint_config: CheckpointConfig
 
     # model_config allows setting Pydantic configurations if needed, e.g., arbitrary_types_allowed
     model_config = {"arbitrary_types_allowed": True}
@@ -38,6 +53,10 @@ class StoryFlowAgent(BaseAgent):
         reviser: LlmAgent,
         grammar_check: LlmAgent,
         tone_check: LlmAgent,
+        extra_checks: Optional[list[BaseAgent]] = None,
+        post_processing_config: Optional[PostProcessingConfig] = None,
+        critic_loop_config: Optional[CriticLoopConfig] = None,
+        checkpoint_config: Optional[CheckpointConfig] = None,
     ):
         """
         Initializes the StoryFlowAgent.
@@ -49,19 +68,26 @@ class StoryFlowAgent(BaseAgent):
             reviser: An LlmAgent to revise the story based on criticism.
             grammar_check: An LlmAgent to check the grammar.
             tone_check: An LlmAgent to analyze the tone.
+            extra_checks: Additional reviewers of the story. Like the grammar
+                and tone checks they only read ``current_story`` and write
+                their own ``output_key``.
+            post_processing_config: Whether the checks run concurrently or
+                one by one. Read from the environment when omitted.
+            critic_loop_config: Iteration limit, convergence and budget of the
+                critic/reviser loop. Read from the environment when omitted.
+            checkpoint_config: Whether completed stages are skipped on a
+                rerun. Read from the environment when omitted.
         """
         # Create internal agents *before* calling super().__init__
-        loop_agent = LoopAgent(
-            name="CriticReviserLoop", sub_agents=[critic, reviser], max_iterations=2
-        )
-        sequential_agent = SequentialAgent(
-            name="PostProcessing", sub_agents=[grammar_check, tone_check]
+        loop_agent = create_critic_reviser_loop(critic, reviser, critic_loop_config)
+        post_processing_agent = create_post_processing_agent(
+            [grammar_check, tone_check, *(extra_checks or [])], post_processing_config
         )
 
         sub_agents_list = [
             story_generator,
             loop_agent,
-            sequential_agent,
+            post_processing_agent,
         ]
 
         super().__init__(
@@ -72,7 +98,8 @@ class StoryFlowAgent(BaseAgent):
             grammar_check=grammar_check,
             tone_check=tone_check,
             loop_agent=loop_agent,
-            sequential_agent=sequential_agent,
+            post_processing_agent=post_processing_agent,
+            checkpoint_config=checkpoint_config or CheckpointConfig.from_env(),
             sub_agents=sub_agents_list, 
         )
     
@@ -83,50 +110,79 @@ class StoryFlowAgent(BaseAgent):
         """
         Implements the custom orchestration logic for the story workflow.
         Uses the instance attributes assigned by Pydantic (e.g., self.story_generator).
+        Stages whose inputs are unchanged since their checkpoint are skipped.
         """
         logger.info(f"[{self.name}] Starting story generation workflow.")
+        checkpoints = StageCheckpoints(ctx, self.name, self.checkpoint_config)
 
         # 1. Initial Story Generation
-        logger.info(f"[{self.name}] Running StoryGenerator...")
-        async for event in self.story_generator.run_async(ctx):
-            logger.info(f"[{self.name}] Event from StoryGenerator: {event.model_dump_json(indent=2, exclude_none=True)}")
+        async for event in self._run_stage(ctx, checkpoints, "generate", self.story_generator, ["topic"]):
             yield event
 
         # Check if story was generated before proceeding
-        if "current_story" not in ctx.session.state or not ctx.session.state["current_story"]:
+        if not checkpoints.get("current_story"):
             logger.error(f"[{self.name}] Failed to generate initial story. Aborting workflow.")
             return # Stop processing if initial story failed
 
-        logger.info(f"[{self.name}] Story state after generator: {ctx.session.state.get('current_story')}")
+        logger.info(f"[{self.name}] Story state after generator: {checkpoints.get('current_story')}")
 
 
         # 2. Critic-Reviser Loop
-        logger.info(f"[{self.name}] Running CriticReviserLoop...")
-        # Use the loop_agent instance attribute assigned during init
-        async for event in self.loop_agent.run_async(ctx):
-            logger.info(f"[{self.name}] Event from CriticReviserLoop: {event.model_dump_json(indent=2, exclude_none=True)}")
+        async for event in self._run_stage(ctx, checkpoints, "critic_loop", self.loop_agent, ["current_story"]):
             yield event
 
-        logger.info(f"[{self.name}] Story state after loop: {ctx.session.state.get('current_story')}")
+        logger.info(f"[{self.name}] Story state after loop: {checkpoints.get('current_story')}")
 
-        # 3. Sequential Post-Processing (Grammar and Tone Check)
-        logger.info(f"[{self.name}] Running PostProcessing...")
-        # Use the sequential_agent instance attribute assigned during init
-        async for event in self.sequential_agent.run_async(ctx):
-            logger.info(f"[{self.name}] Event from PostProcessing: {event.model_dump_json(indent=2, exclude_none=True)}")
+        # 3. Post-Processing (Grammar, Tone and any extra checks)
+        async for event in self._run_stage(
+            ctx, checkpoints, "post_processing", self.post_processing_agent, ["current_story"]
+        ):
             yield event
 
         # 4. Tone-Based Conditional Logic
-        tone_check_result = ctx.session.state.get("tone_check_result")
+        tone_check_result = checkpoints.get("tone_check_result")
         logger.info(f"[{self.name}] Tone check result: {tone_check_result}")
 
         if tone_check_result == "negative":
             logger.info(f"[{self.name}] Tone is negative. Regenerating story...")
-            async for event in self.story_generator.run_async(ctx):
-                logger.info(f"[{self.name}] Event from StoryGenerator (Regen): {event.model_dump_json(indent=2, exclude_none=True)}")
+            async for event in self._run_stage(
+                ctx, checkpoints, "regenerate", self.story_generator, ["topic", "tone_check_result"]
+            ):
                 yield event
         else:
             logger.info(f"[{self.name}] Tone is not negative. Keeping current story.")
             pass
 
+        # 最後の段階を飛ばした場合は、記録していた結果をここで状態に書き込む
+        restored = checkpoints.flush()
+        if restored:
+            yield restored
+
         logger.info(f"[{self.name}] Workflow finished.")
+
+    async def _run_stage(
+        self,
+        ctx: InvocationContext,
+        checkpoints: StageCheckpoints,
+        stage: str,
+        agent: BaseAgent,
+        input_keys: list[str],
+    ) -> AsyncGenerator[Event, None]:
+        """Runs ``agent`` as ``stage`` unless its checkpoint matches, then saves the checkpoint."""
+        if checkpoints.skip(stage, agent, input_keys):
+            return
+        # 飛ばした段階の結果を、この段階が読む前に状態に書き込む
+        restored = checkpoints.flush()
+        if restored:
+            yield restored
+
+        logger.info(f"[{self.name}] Running {agent.name}...")
+        async for event in agent.run_async(ctx):
+            # イベントの中身はDEBUGのときだけシリアライズする（時間の内訳は TRACE_ENABLED=1 のトレースで見る）
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"[{self.name}] Event from {agent.name}: {event.model_dump_json(indent=2, exclude_none=True)}")
+            yield event
+
+        checkpoint = checkpoints.record(stage, output_keys(agent))
+        if checkpoint:
+            yield checkpoint
@@ -14,7 +14,8 @@ critic = LlmAgent(
     name="Critic",
     model=GEMINI_2_FLASH,
     instruction="""You are a story critic. Review the story provided: {{current_story}}. Provide 1-2 sentences of constructive criticism
-on how to improve it. Focus on plot or character.""",
+on how to improve it. Focus on plot or character. If the story needs no substantive changes, output only the word
+APPROVED.""",
     input_schema=None,
     output_key="criticism",  # Key for storing criticism in session state
 )
@@ -1,4 +1,5 @@
 from google.adk.agents.llm_agent import Agent
+from google.adk.apps import App
 from google.adk.tools import agent_tool
 
 from guardrail import block_paris_tool_guardrail
@@ -6,6 +7,7 @@ from .tools import get_current_time, get_weather_stateful
 
 from agents.greeting_agent.agent import root_agent as greeting_agent
 from agents.farewell_agent.agent import root_agent as farewell_agent
+from server.tracing_plugin import create_tracing_plugins
 
 farewell_agent_tool = agent_tool.AgentTool(agent=farewell_agent)
 
@@ -26,3 +28,6 @@ root_agent = Agent(
     sub_agents=[greeting_agent],
     output_key="last_weather_report",
 )
+
+# adk web / adk eval はappを使う。TRACE_ENABLED=1 のときは実行ごとのトレースを書き出す
+app = App(name="my_agent", root_agent=root_agent, plugins=create_tracing_plugins())
@@ -0,0 +1,109 @@
+"""
+サーバーのコールドスタートのベンチマーク
+
+uvicorn で main.py のアプリを別プロセスとして起動し、プロセスの起動から
+ポートが接続を受け付けるまでの時間（待ち受け開始）と、/stats でエージェントの構築が
+終わったことを確認できるまでの時間を計測する。GeminiとBigQueryは呼ばず、
+セッションDBは一時ディレクトリのSQLiteを使う。
+最後の1回は STARTUP_PROFILE=1 で起動し、起動の各段階とimportの時間の内訳を出力する。
+
+使い方:
+  uv run python -m benchmarks.cold_start_benchmark [--runs 5]
+
+引数:
+  --runs     : 起動の回数
+  --timeout  : 1回の起動を待つ最大秒数
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from .stats import summarize
+
+# エージェントの読み込みに必要な値だけ埋めておく
+_DEFAULT_ENV = {
+    "GOOGLE_CLOUD_PROJECT": "local-project",
+    "GOOGLE_CLOUD_LOCATION": "us-central1",
+    "NL2SQL_MODEL": "gemini-2.0-flash",
+    "BQ_DATA_PROJECT_ID": "local-project",
+    "BQ_DATASET_ID": "bench_dataset",
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _listening(port: int) -> bool:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.05):
+            return True
+    except OSError:
+        return False
+
+
+def start_once(profile: bool, timeout: float) -> dict:
+    port = _free_port()
+    env = {**_DEFAULT_ENV, **os.environ}
+    env["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'cold_start.db'}"
+    env["SESSION_BACKEND"] = "database"
+    env["STARTUP_PROFILE"] = "1" if profile else "0"
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while not _listening(port):
+            if process.poll() is not None or time.perf_counter() - started > timeout:
+                raise RuntimeError("server did not start")
+            time.sleep(0.01)
+        listening = time.perf_counter() - started
+
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while True:
+                startup = client.get("/stats").json()["startup"]
+                if startup["agent_runtime"]["ready"]:
+                    break
+                if time.perf_counter() - started > timeout:
+                    raise RuntimeError("agent runtime was not built")
+                time.sleep(0.02)
+        ready = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait()
+    return {"listening": listening, "ready": ready, "startup": startup}
+
+
+def main(args: argparse.Namespace):
+    runs = [start_once(profile=False, timeout=args.timeout) for _ in range(args.runs)]
+    profiled = start_once(profile=True, timeout=args.timeout)
+    results = {
+        "time_to_listen": summarize([run["listening"] for run in runs]),
+        "time_to_agent_ready": summarize([run["ready"] for run in runs]),
+        "profile": profiled["startup"],
+    }
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    main(args)
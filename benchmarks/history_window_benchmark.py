@@ -0,0 +1,97 @@
+"""
+セッション履歴のウィンドウ読み込みのベンチマーク
+
+イベント数の異なるセッションを用意し、Runnerと同じ呼び出し（configなしのget_session）で
+全履歴を読み込む場合と、履歴ウィンドウ + 要約スナップショットを使う場合の
+読み込み時間とプロンプトサイズ（推定トークン数）を比較する。
+
+使い方:
+  uv run python -m benchmarks.history_window_benchmark [--sizes 100,1000,5000] [--max-events 40]
+
+引数:
+  --db-url     : 使用するデータベースURL（省略時は一時ディレクトリのSQLite）
+  --sizes      : セッションあたりのイベント数（カンマ区切り）
+  --max-events : 履歴ウィンドウのイベント数
+  --max-tokens : 履歴ウィンドウのトークン予算（0で無制限）
+  --repeat     : 計測の繰り返し回数
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from server.config import HistoryConfig
+from server.sessions import AsyncDatabaseSessionService, WriteBehindSessionService
+from server.sessions.history import estimate_tokens
+
+from .session_backend_benchmark import APP_NAME, build_turn_events
+from .stats import summarize
+
+
+async def seed_session(db_url: str, session_id: str, num_events: int):
+    # 大量のイベントを高速に投入するため、グループコミットでまとめて書き込む
+    service = WriteBehindSessionService(db_url, max_batch_events=1000)
+    session = await service.create_session(app_name=APP_NAME, user_id="bench", session_id=session_id)
+    written = 0
+    while written < num_events:
+        for event in build_turn_events(str(uuid.uuid4()), 6):
+            await service.append_event(session, event)
+        written += 6
+    await service.close()
+
+
+async def measure(service: AsyncDatabaseSessionService, session_id: str, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        session = await service.get_session(app_name=APP_NAME, user_id="bench", session_id=session_id)
+        latencies.append(time.perf_counter() - started)
+    return {
+        "events_loaded": len(session.events),
+        "prompt_tokens_estimate": sum(estimate_tokens(event) for event in session.events),
+        "load_latency": summarize(latencies),
+    }
+
+
+async def main(db_url: str, sizes: list[int], history: HistoryConfig, repeat: int):
+    full_service = AsyncDatabaseSessionService(db_url)
+    windowed_service = AsyncDatabaseSessionService(db_url, history=history)
+
+    results = {}
+    for size in sizes:
+        session_id = str(uuid.uuid4())
+        await seed_session(db_url, session_id, size)
+        await windowed_service.maybe_snapshot(app_name=APP_NAME, user_id="bench", session_id=session_id)
+
+        results[size] = {
+            "full": await measure(full_service, session_id, repeat),
+            "windowed": await measure(windowed_service, session_id, repeat),
+        }
+
+    await full_service.close()
+    await windowed_service.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url")
+    parser.add_argument("--sizes", default="100,1000,5000")
+    parser.add_argument("--max-events", type=int, default=40)
+    parser.add_argument("--max-tokens", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    history = HistoryConfig(
+        max_events=args.max_events,
+        max_tokens=args.max_tokens,
+        snapshot_every=50,
+        summary_max_chars=4000,
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_url = args.db_url or f"sqlite:///{Path(tmp_dir) / 'sessions.db'}"
+        asyncio.run(main(db_url, [int(size) for size in args.sizes.split(",")], history, args.repeat))
@@ -0,0 +1,175 @@
+"""
+ストリーミングサーバーのオフライン負荷試験
+
+フェイクLLM・ローカルのexecute_sql・SQLiteのセッションDBで main.py のアプリを起動し、
+N個のセッションから /send/{user_id}/{session_id} に並行してメッセージを送って、
+最初のバイトまでの時間（TTFB）、チャンク間隔、ターン全体の時間のパーセンタイルと
+スループットを出力する。サーバー側の性能改善はこの結果を基準に比較する。
+
+使い方:
+  uv run python -m benchmarks.loadtest [--sessions N] [--turns T] [--tokens-per-second R]
+
+引数:
+  --url                : 既に起動しているサーバーを対象にする（省略時はこのプロセス内で起動）
+  --sessions           : 並行セッション数
+  --turns              : セッションあたりのターン数
+  --tokens-per-second  : フェイクLLMの出力速度
+  --response-tokens    : フェイクLLMの回答トークン数
+  --first-token-ms     : フェイクLLMの1回の呼び出しで最初の応答までの時間
+  --tool-script        : 1ターンで呼び出すツールの順序（カンマ区切り）
+  --tool-latency-ms    : フェイクツールの実行時間
+  --output             : 結果JSONの出力先
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import httpx
+
+from ..stats import summarize
+from .config import LoadTestConfig
+
+_FRAME_END = b"\n\n"
+
+
+@dataclass
+class LoadTestResults:
+    ttfb: list[float] = field(default_factory=list)
+    inter_chunk_gaps: list[float] = field(default_factory=list)
+    turn_times: list[float] = field(default_factory=list)
+    frames: int = 0
+    completed_turns: int = 0
+    rejected_turns: int = 0
+    failed_turns: int = 0
+
+
+async def run_turn(client: httpx.AsyncClient, url: str, message: str, results: LoadTestResults):
+    started = time.perf_counter()
+    first_frame_at = None
+    last_frame_at = None
+    buffer = b""
+    completed = False
+
+    async with client.stream("POST", url, json={"mime_type": "text/plain", "data": message}) as response:
+        if response.status_code == 429:
+            results.rejected_turns += 1
+            return
+        if response.status_code != 200:
+            results.failed_turns += 1
+            return
+
+        async for chunk in response.aiter_bytes():
+            buffer += chunk
+            while _FRAME_END in buffer:
+                frame, buffer = buffer.split(_FRAME_END, 1)
+                now = time.perf_counter()
+                if first_frame_at is None:
+                    first_frame_at = now
+                    results.ttfb.append(now - started)
+                else:
+                    results.inter_chunk_gaps.append(now - last_frame_at)
+                last_frame_at = now
+                results.frames += 1
+                if b'"turn_complete"' in frame:
+                    completed = True
+
+    if completed:
+        results.completed_turns += 1
+        results.turn_times.append(time.perf_counter() - started)
+    else:
+        results.failed_turns += 1
+
+
+async def run_session(client: httpx.AsyncClient, base_url: str, turns: int, results: LoadTestResults):
+    url = f"{base_url}/send/loadtest/{uuid.uuid4()}"
+    for i in range(turns):
+        await run_turn(client, url, f"プロダクトを価格が高い順に教えて ({i})", results)
+
+
+async def drive(base_url: str, sessions: int, turns: int) -> dict:
+    results = LoadTestResults()
+    limits = httpx.Limits(max_connections=sessions, max_keepalive_connections=sessions)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(300), limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(run_session(client, base_url, turns, results) for _ in range(sessions)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "sessions": sessions,
+        "turns_per_session": turns,
+        "elapsed_sec": round(elapsed, 3),
+        "throughput_turns_per_sec": round(results.completed_turns / elapsed, 2),
+        "completed_turns": results.completed_turns,
+        "rejected_turns": results.rejected_turns,
+        "failed_turns": results.failed_turns,
+        "frames": results.frames,
+        "ttfb": summarize(results.ttfb),
+        "inter_chunk_gap": summarize(results.inter_chunk_gaps),
+        "turn_time": summarize(results.turn_times),
+    }
+
+
+def start_server_in_thread() -> str:
+    """Boots the fake-backed app with uvicorn on a free local port."""
+    import uvicorn
+
+    from .server import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--response-tokens", type=int, default=60)
+    parser.add_argument("--first-token-ms", type=float, default=200)
+    parser.add_argument("--tool-script", default="bigquery_nl2sql,execute_sql")
+    parser.add_argument("--tool-latency-ms", type=float, default=50)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    # リクエストごとのhttpxのログは計測のノイズになるので抑える
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    base_url = args.url
+    if not base_url:
+        fake_config = LoadTestConfig(
+            tokens_per_second=args.tokens_per_second,
+            response_tokens=args.response_tokens,
+            first_token_ms=args.first_token_ms,
+            tool_script=[name for name in args.tool_script.split(",") if name],
+            tool_latency_ms=args.tool_latency_ms,
+        )
+        os.environ.update(fake_config.to_env())
+        base_url = start_server_in_thread()
+
+    report = asyncio.run(drive(base_url, args.sessions, args.turns))
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class LoadTestConfig:
+    tokens_per_second: float
+    response_tokens: int
+    first_token_ms: float
+    tool_script: list[str]
+    tool_latency_ms: float
+
+    @classmethod
+    def from_env(cls) -> "LoadTestConfig":
+        """Create configuration from environment variables.
+
+        The load-test server reads its fakes from the environment so it can run
+        in the driver process or be started separately with uvicorn.
+
+        Returns:
+            LoadTestConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            tokens_per_second=float(os.getenv("LOADTEST_TOKENS_PER_SECOND", "50")),
+            response_tokens=int(os.getenv("LOADTEST_RESPONSE_TOKENS", "60")),
+            first_token_ms=float(os.getenv("LOADTEST_FIRST_TOKEN_MS", "200")),
+            tool_script=[
+                name
+                for name in os.getenv("LOADTEST_TOOL_SCRIPT", "bigquery_nl2sql,execute_sql").split(",")
+                if name
+            ],
+            tool_latency_ms=float(os.getenv("LOADTEST_TOOL_LATENCY_MS", "50")),
+        )
+
+    def to_env(self) -> dict[str, str]:
+        return {
+            "LOADTEST_TOKENS_PER_SECOND": str(self.tokens_per_second),
+            "LOADTEST_RESPONSE_TOKENS": str(self.response_tokens),
+            "LOADTEST_FIRST_TOKEN_MS": str(self.first_token_ms),
+            "LOADTEST_TOOL_SCRIPT": ",".join(self.tool_script),
+            "LOADTEST_TOOL_LATENCY_MS": str(self.tool_latency_ms),
+        }
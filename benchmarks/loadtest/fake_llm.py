@@ -0,0 +1,89 @@
+import asyncio
+from typing import AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai.types import Content, FunctionCall, Part
+from typing_extensions import override
+
+FAKE_MODEL_NAME = "fake-llm"
+
+_ANSWER_TOKEN = "結果 "
+
+
+class FakeLlm(BaseLlm):
+    """
+    Deterministic stand-in for the Gemini model used by the load test.
+
+    Each turn first replays ``tool_script`` (one function call per model
+    call, in order) and then streams a text answer of ``response_tokens``
+    tokens at ``tokens_per_second``. Every model call waits
+    ``first_token_ms`` before its first response, like a real model's
+    time-to-first-token.
+    """
+
+    model: str = FAKE_MODEL_NAME
+    tokens_per_second: float = 50
+    response_tokens: int = 60
+    first_token_ms: float = 200
+    tool_script: list[str] = ["bigquery_nl2sql", "execute_sql"]
+    project_id: str = "local-project"
+
+    @classmethod
+    @override
+    def supported_models(cls) -> list[str]:
+        return [r"fake-.*"]
+
+    @override
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.first_token_ms / 1000)
+
+        question, responses = _current_turn(llm_request)
+        step = len(responses)
+        if step < len(self.tool_script):
+            yield LlmResponse(
+                content=Content(
+                    role="model",
+                    parts=[Part(function_call=self._function_call(self.tool_script[step], question, responses))],
+                )
+            )
+            return
+
+        delay = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        if stream:
+            for _ in range(self.response_tokens):
+                yield LlmResponse(
+                    content=Content(role="model", parts=[Part(text=_ANSWER_TOKEN)]),
+                    partial=True,
+                )
+                await asyncio.sleep(delay)
+        else:
+            await asyncio.sleep(delay * self.response_tokens)
+
+        yield LlmResponse(
+            content=Content(role="model", parts=[Part(text=_ANSWER_TOKEN * self.response_tokens)]),
+        )
+
+    def _function_call(self, name: str, question: str, responses: dict[str, dict]) -> FunctionCall:
+        if name == "execute_sql":
+            sql = responses.get("bigquery_nl2sql", {}).get("result", "SELECT 1")
+            return FunctionCall(name=name, args={"project_id": self.project_id, "query": sql})
+        return FunctionCall(name=name, args={"question": question})
+
+
+def _current_turn(llm_request: LlmRequest) -> tuple[str, dict[str, dict]]:
+    """Returns the user's question and the function responses received in this turn."""
+    question = ""
+    responses: dict[str, dict] = {}
+    for content in reversed(llm_request.contents):
+        for part in content.parts or []:
+            if part.function_response:
+                responses.setdefault(part.function_response.name, part.function_response.response or {})
+            elif content.role == "user" and part.text:
+                question = part.text
+        if question:
+            break
+    return question, responses
@@ -0,0 +1,70 @@
+import asyncio
+import csv
+import re
+import sqlite3
+from pathlib import Path
+
+from google.adk.tools import ToolContext
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "agents" / "bigquery" / "data"
+
+# `project.dataset.table` や `dataset.table` をテーブル名だけに読み替える
+_QUALIFIED_TABLE = re.compile(r"`?(?:[\w-]+\.){1,2}(\w+)`?")
+
+FAKE_SQL = "SELECT product_id, product_name, price, category FROM `local-project.local_dataset.products` ORDER BY price DESC"
+
+tool_latency_ms: float = 50
+
+
+def _load_catalog() -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    for csv_path in DATA_DIR.glob("*.csv"):
+        with csv_path.open(encoding="utf-8") as f:
+            reader = csv.reader(f)
+            columns = next(reader)
+            connection.execute(
+                f"CREATE TABLE {csv_path.stem} ({', '.join(columns)})"
+            )
+            connection.executemany(
+                f"INSERT INTO {csv_path.stem} VALUES ({', '.join('?' for _ in columns)})",
+                reader,
+            )
+    return connection
+
+
+_catalog = _load_catalog()
+
+
+async def bigquery_nl2sql(question: str, tool_context: ToolContext) -> str:
+    """Generates a SQL query from a natural language question.
+
+    Args:
+        question (str): Natural language question.
+        tool_context (ToolContext): The tool context.
+
+    Returns:
+        str: An SQL statement to answer this question.
+    """
+    await asyncio.sleep(tool_latency_ms / 1000)
+    tool_context.state["sql_query"] = FAKE_SQL
+    return FAKE_SQL
+
+
+async def execute_sql(project_id: str, query: str) -> dict:
+    """Run a BigQuery SQL query against the local stand-in catalog.
+
+    Args:
+        project_id (str): The GCP project id in which the query should be executed.
+        query (str): The BigQuery SQL query to be executed.
+
+    Returns:
+        dict: Query result in the same shape as the BigQuery toolset's execute_sql.
+    """
+    await asyncio.sleep(tool_latency_ms / 1000)
+    try:
+        cursor = _catalog.execute(_QUALIFIED_TABLE.sub(r"\1", query))
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    except sqlite3.Error as ex:
+        return {"status": "ERROR", "error_details": str(ex)}
+    return {"status": "SUCCESS", "rows": rows}
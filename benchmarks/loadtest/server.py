@@ -0,0 +1,51 @@
+"""
+負荷試験用にフェイクを差し込んだ main.py のアプリ
+
+GeminiとBigQueryを呼ばないよう、bigquery_agent のモデルを FakeLlm に、
+ツールをローカルの代替実装に差し替え、セッションDBはSQLiteを使う。
+リポジトリのルートで単体起動もできる:
+
+  LOADTEST_TOKENS_PER_SECOND=100 uv run uvicorn benchmarks.loadtest.server:app
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from .config import LoadTestConfig
+
+_DEFAULT_ENV = {
+    "GOOGLE_CLOUD_PROJECT": "local-project",
+    "GOOGLE_CLOUD_LOCATION": "us-central1",
+    "NL2SQL_MODEL": "fake-llm",
+    "BQ_DATA_PROJECT_ID": "local-project",
+    "BQ_DATASET_ID": "local_dataset",
+}
+
+# main.py が読み込む前に、実環境の.envより先にダミーの設定を入れておく
+for key, value in _DEFAULT_ENV.items():
+    os.environ.setdefault(key, value)
+if "LOADTEST_DATABASE_URL" in os.environ:
+    os.environ["DATABASE_URL"] = os.environ["LOADTEST_DATABASE_URL"]
+else:
+    os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'loadtest_sessions.db'}"
+
+import main  # noqa: E402
+from agents.bigquery.agent import root_agent  # noqa: E402
+
+from . import fake_tools  # noqa: E402
+from .fake_llm import FakeLlm  # noqa: E402
+
+config = LoadTestConfig.from_env()
+fake_tools.tool_latency_ms = config.tool_latency_ms
+
+root_agent.model = FakeLlm(
+    tokens_per_second=config.tokens_per_second,
+    response_tokens=config.response_tokens,
+    first_token_ms=config.first_token_ms,
+    tool_script=config.tool_script,
+    project_id=os.environ["BQ_DATA_PROJECT_ID"],
+)
+root_agent.tools = [fake_tools.bigquery_nl2sql, fake_tools.execute_sql]
+
+app = main.app
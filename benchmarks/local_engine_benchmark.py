@@ -0,0 +1,154 @@
+"""
+ローカル実行エンジン（DuckDB）のベンチマーク
+
+products テーブルと同じ列を持つ大きな合成データ（CSVとParquet）を一時ディレクトリに作り、
+LocalSqlEngine の読み込み時間（CSVの一括読み込み・Parquetのビュー）と、
+評価セットと同じ形の完全修飾名のクエリのレイテンシを計測する。
+比較として、負荷試験のフェイクツールと同じSQLiteへの行ごとのINSERTでの読み込み時間も出力する。
+
+使い方:
+  uv run --extra local-engine python -m benchmarks.local_engine_benchmark [--rows 1000000]
+
+引数:
+  --rows   : 合成データの行数
+  --repeat : クエリあたりの実行回数
+  --no-sqlite : SQLiteへの読み込みとの比較を省略する
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+# エージェントの読み込みに必要な値だけ埋めておく
+for key, value in {
+    "GOOGLE_CLOUD_PROJECT": "local-project",
+    "GOOGLE_CLOUD_LOCATION": "us-central1",
+    "NL2SQL_MODEL": "gemini-2.0-flash",
+    "BQ_DATA_PROJECT_ID": "local-project",
+    "BQ_DATASET_ID": "bench_dataset",
+}.items():
+    os.environ.setdefault(key, value)
+
+from agents.bigquery.tools.local_engine import LocalSqlEngine  # noqa: E402
+
+from .stats import summarize  # noqa: E402
+
+PROJECT_ID = "local-project"
+DATASET_ID = "bench_dataset"
+TABLE = f"`{PROJECT_ID}.{DATASET_ID}.products`"
+
+CATEGORIES = ["電子機器", "周辺機器", "家具", "文房具", "食品", "衣料品", "書籍", "玩具"]
+
+QUERIES = {
+    "order_by_limit": f"SELECT {TABLE}.product_name, {TABLE}.price FROM {TABLE} ORDER BY {TABLE}.price DESC LIMIT 10000",
+    "group_by": f"SELECT category, COUNT(*) AS products, AVG(price) AS avg_price FROM {TABLE} GROUP BY category ORDER BY avg_price DESC",
+    "filter": f"SELECT product_id, product_name FROM {TABLE} WHERE category = '家具' AND price BETWEEN 1000 AND 2000 LIMIT 50",
+    "point_lookup": f"SELECT * FROM {TABLE} WHERE product_id = 'P0500000'",
+}
+
+
+def write_csv(path: Path, rows: int, seed: int = 1):
+    rng = random.Random(seed)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["product_id", "product_name", "price", "category"])
+        for i in range(rows):
+            writer.writerow(
+                [f"P{i:07d}", f"商品{i}", round(rng.uniform(100, 200000), 2), rng.choice(CATEGORIES)]
+            )
+    schema = {
+        "columns": {
+            "product_id": {"type": "STRING"},
+            "product_name": {"type": "STRING"},
+            "price": {"type": "FLOAT64"},
+            "category": {"type": "STRING"},
+        }
+    }
+    path.with_suffix(".schema.json").write_text(json.dumps(schema), encoding="utf-8")
+
+
+def load_sqlite(path: Path) -> float:
+    # 負荷試験のフェイクツールと同じ、行ごとのINSERTによる読み込み
+    started = time.perf_counter()
+    connection = sqlite3.connect(":memory:")
+    with path.open(encoding="utf-8") as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        connection.execute(f"CREATE TABLE products ({', '.join(columns)})")
+        connection.executemany(
+            f"INSERT INTO products VALUES ({', '.join('?' for _ in columns)})", reader
+        )
+    connection.close()
+    return time.perf_counter() - started
+
+
+async def measure_queries(engine: LocalSqlEngine, repeat: int) -> dict:
+    results = {}
+    for name, query in QUERIES.items():
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = await engine.execute_sql(query)
+            latencies.append(time.perf_counter() - started)
+            if result["status"] != "SUCCESS":
+                raise RuntimeError(f"{name}: {result['error_details']}")
+        results[name] = summarize(latencies)
+    return results
+
+
+async def main(rows: int, repeat: int, compare_sqlite: bool):
+    work_dir = Path(tempfile.mkdtemp(prefix="local_engine_bench_"))
+    try:
+        csv_dir = work_dir / "csv"
+        parquet_dir = work_dir / "parquet"
+        csv_dir.mkdir()
+        parquet_dir.mkdir()
+
+        started = time.perf_counter()
+        write_csv(csv_dir / "products.csv", rows)
+        generate_seconds = time.perf_counter() - started
+
+        csv_engine = LocalSqlEngine(str(csv_dir), PROJECT_ID, DATASET_ID, max_rows=50)
+        await asyncio.to_thread(csv_engine.load)
+        # 同じデータをParquetに書き出し、コピーせずに読むビューとして使う
+        csv_engine._connection.execute(
+            f"COPY (SELECT * FROM \"{PROJECT_ID}\".\"{DATASET_ID}\".products) "
+            f"TO '{parquet_dir / 'products.parquet'}' (FORMAT parquet)"
+        )
+        parquet_engine = LocalSqlEngine(str(parquet_dir), PROJECT_ID, DATASET_ID, max_rows=50)
+        await asyncio.to_thread(parquet_engine.load)
+
+        results = {
+            "rows": rows,
+            "csv_bytes": (csv_dir / "products.csv").stat().st_size,
+            "generate_csv_seconds": round(generate_seconds, 2),
+            "csv_load_seconds": round(csv_engine.load_seconds, 3),
+            "parquet_load_seconds": round(parquet_engine.load_seconds, 3),
+            "csv_queries": await measure_queries(csv_engine, repeat),
+            "parquet_queries": await measure_queries(parquet_engine, repeat),
+        }
+        if compare_sqlite:
+            results["sqlite_row_insert_load_seconds"] = round(
+                load_sqlite(csv_dir / "products.csv"), 3
+            )
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--no-sqlite", action="store_true")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.repeat, not args.no_sqlite))
@@ -0,0 +1,132 @@
+"""
+NL2SQLの候補生成（並行・ヘッジ）のベンチマーク
+
+NL2SQLモデルを呼ばずに、裾の重いレイテンシ分布（対数正規分布＋一定割合の遅延）と
+一定割合で検証に失敗するSQLを返すフェイクの生成関数を使い、
+single / parallel / hedged の各モードで1問あたりのレイテンシ（失敗時の再生成を含む）、
+モデル呼び出し回数、採用された候補、見積もった短縮時間を比較する。
+
+使い方:
+  uv run python -m benchmarks.nl2sql_candidates_benchmark [--questions 300] [--candidates 3]
+
+引数:
+  --questions     : 質問数
+  --candidates    : parallel / hedged の候補数
+  --median        : 生成レイテンシの中央値（秒）
+  --slow-rate     : 遅延が発生する割合
+  --slow-factor   : 遅延時のレイテンシの倍率
+  --invalid-rate  : 検証に失敗するSQLを返す割合
+  --percentile    : hedged で次の候補を出すまでのレイテンシのパーセンタイル
+  --concurrency   : 同時に処理する質問数
+  --seed          : 乱数のシード
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+# エージェントの読み込みに必要な値だけ埋めておく
+for key, value in {
+    "GOOGLE_CLOUD_PROJECT": "local-project",
+    "GOOGLE_CLOUD_LOCATION": "us-central1",
+    "NL2SQL_MODEL": "gemini-2.0-flash",
+    "BQ_DATA_PROJECT_ID": "local-project",
+    "BQ_DATASET_ID": "bench_dataset",
+}.items():
+    os.environ.setdefault(key, value)
+
+from agents.bigquery.config import Nl2SqlCandidateConfig  # noqa: E402
+from agents.bigquery.tools.nl2sql_candidates import CandidateGenerator  # noqa: E402
+from agents.bigquery.tools.sql_validator import SqlIssue, SqlValidationResult  # noqa: E402
+
+from .stats import summarize  # noqa: E402
+
+VALID_SQL = "SELECT 1"
+INVALID_SQL = "SELECT invalid"
+
+
+class FakeModel:
+    """Generation latencies and invalid SQL drawn from fixed distributions."""
+
+    def __init__(self, args: argparse.Namespace, seed: int):
+        self.args = args
+        self.random = random.Random(seed)
+        self.calls = 0
+
+    async def generate(self, index: int, temperature: float) -> str:
+        self.calls += 1
+        latency = self.random.lognormvariate(0, 0.3) * self.args.median
+        if self.random.random() < self.args.slow_rate:
+            latency *= self.args.slow_factor
+        invalid = self.random.random() < self.args.invalid_rate
+        await asyncio.sleep(latency)
+        return INVALID_SQL if invalid else VALID_SQL
+
+
+def validate(sql: str) -> SqlValidationResult:
+    if sql == VALID_SQL:
+        return SqlValidationResult(sql)
+    return SqlValidationResult(sql, [SqlIssue("unknown_column", "invalid")])
+
+
+async def run_mode(mode: str, args: argparse.Namespace) -> dict:
+    model = FakeModel(args, args.seed)
+    generator = CandidateGenerator(
+        Nl2SqlCandidateConfig(
+            mode=mode,
+            candidates=1 if mode == "single" else args.candidates,
+            temperatures=[0.1, 0.5, 0.9],
+            hedge_percentile=args.percentile,
+            hedge_initial_delay=args.median * 2,
+            hedge_min_samples=20,
+            latency_window=200,
+        )
+    )
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def answer():
+        async with semaphore:
+            started = time.perf_counter()
+            result = await generator.generate(model.generate, validate)
+            # 有効な候補がなければ、単独の生成と同じく検証エラーを添えて再生成する
+            while not result.validation.ok:
+                sql = await model.generate(0, 0.1)
+                result.validation = validate(sql)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(answer() for _ in range(args.questions)))
+    snapshot = generator.snapshot()
+    return {
+        "latency": summarize(latencies),
+        "model_calls_per_question": round(model.calls / args.questions, 2),
+        "wins": snapshot["wins"],
+        "hedges": snapshot["hedges"],
+        "estimated_latency_saved_seconds": snapshot["latency_saved_seconds"],
+    }
+
+
+async def main(args: argparse.Namespace):
+    results = {}
+    for mode in ("single", "parallel", "hedged"):
+        results[mode] = await run_mode(mode, args)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--candidates", type=int, default=3)
+    parser.add_argument("--median", type=float, default=0.2)
+    parser.add_argument("--slow-rate", type=float, default=0.1)
+    parser.add_argument("--slow-factor", type=float, default=5.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.15)
+    parser.add_argument("--percentile", type=float, default=90)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,124 @@
+"""
+結果ストア（列指向・セッションごとの上限）のベンチマーク
+
+products テーブルと同じ列を持つ合成の execute_sql の結果を ResultStore に保存し、
+行のJSONのサイズと列指向で保持したサイズ、保存・ページ取得・集計のレイテンシを計測する。
+続けて1つのセッションで大きな結果を繰り返し保存し、セッションが保持するバイト数が
+RESULT_STORE_SESSION_MAX_BYTES を超えないことを確認する。
+
+使い方:
+  uv run python -m benchmarks.result_store_benchmark [--rows 100000]
+
+引数:
+  --rows        : 1つの結果の行数
+  --results     : 同じセッションで保存する結果の数
+  --session-mb  : セッションごとの上限（MB）
+  --repeat      : ページ取得・集計の実行回数
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+# エージェントの読み込みに必要な値だけ埋めておく
+for key, value in {
+    "GOOGLE_CLOUD_PROJECT": "local-project",
+    "GOOGLE_CLOUD_LOCATION": "us-central1",
+    "NL2SQL_MODEL": "gemini-2.0-flash",
+    "BQ_DATA_PROJECT_ID": "local-project",
+    "BQ_DATASET_ID": "bench_dataset",
+}.items():
+    os.environ.setdefault(key, value)
+
+from agents.bigquery.config import ResultStoreConfig  # noqa: E402
+from agents.bigquery.tools.result_store import (  # noqa: E402
+    ResultStore,
+    aggregate_stored_result,
+    result_page,
+    summarize_result,
+)
+
+from .stats import summarize  # noqa: E402
+
+CATEGORIES = ["電子機器", "周辺機器", "家具", "文房具", "食品", "衣料品", "書籍", "玩具"]
+
+
+def make_result(rows: int, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    return {
+        "status": "SUCCESS",
+        "rows": [
+            {
+                "product_id": f"P{i:07d}",
+                "product_name": f"商品{i}",
+                "price": round(rng.uniform(100, 200000), 2),
+                "category": rng.choice(CATEGORIES),
+            }
+            for i in range(rows)
+        ],
+    }
+
+
+def measure(fn, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def main(args: argparse.Namespace):
+    config = ResultStoreConfig.from_env()
+    config.session_max_bytes = int(args.session_mb * 1024 * 1024)
+    config.max_bytes = config.session_max_bytes * 64
+    store = ResultStore(config)
+    result = make_result(args.rows)
+
+    started = time.perf_counter()
+    stored = store.put("bench-user", "bench-session", "SELECT ...", result)
+    put_seconds = time.perf_counter() - started
+    page_count = result_page(stored, 1, config.page_rows)["page_count"]
+
+    results = {
+        "rows": args.rows,
+        "rows_stored": stored.row_count,
+        "truncated": stored.truncated,
+        "row_json_bytes": len(json.dumps(result["rows"], ensure_ascii=False)),
+        "columnar_bytes": stored.size,
+        "summary_bytes": len(
+            json.dumps(summarize_result(stored, config.top_k_rows), ensure_ascii=False)
+        ),
+        "put_seconds": round(put_seconds, 3),
+        "fetch_page": measure(
+            lambda: result_page(stored, random.randint(1, page_count), config.page_rows),
+            args.repeat,
+        ),
+        "aggregate_avg_by_category": measure(
+            lambda: aggregate_stored_result(stored, "avg", "price", "category", config.max_groups),
+            args.repeat,
+        ),
+    }
+
+    # 同じセッションで結果を保存し続けても、保持するバイト数は上限で頭打ちになる
+    session_bytes = []
+    for _ in range(args.results):
+        store.put("bench-user", "bench-session", "SELECT ...", result)
+        session_bytes.append(store.snapshot()["max_session_bytes"])
+    results["session_max_bytes"] = config.session_max_bytes
+    results["session_bytes_after_each_put"] = session_bytes
+    results["store"] = store.snapshot()
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--results", type=int, default=5)
+    parser.add_argument("--session-mb", type=float, default=16)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,206 @@
+"""
+スキーマの絞り込みのベンチマーク
+
+テーブル数の異なる合成スキーマ（render_schema の形式）を用意し、
+質問ごとに全スキーマを入れたプロンプトと、関連するテーブル・列だけに絞り込んだ
+プロンプトのサイズ（文字数と推定トークン数）、インデックスの構築時間と絞り込み時間、
+正解テーブルが絞り込み結果に含まれる割合を比較する。
+--generate を指定すると実際にNL2SQLモデルを呼び出して生成レイテンシも比較する
+（GOOGLE_CLOUD_PROJECT などの設定が必要）。
+
+使い方:
+  uv run python -m benchmarks.schema_pruning_benchmark [--sizes 10,100,500] [--top-k 5]
+
+引数:
+  --sizes       : スキーマのテーブル数（カンマ区切り）
+  --top-k       : プロンプトに入れるテーブル数
+  --max-columns : テーブルあたりの最大列数
+  --generate    : NL2SQLモデルを呼び出して生成レイテンシを計測する
+  --repeat      : --generate 時の質問あたりの呼び出し回数
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+
+# --generate では実際の設定を使う。それ以外はエージェントの読み込みに必要な値だけ埋めておく
+load_dotenv("agents/bigquery/.env")
+load_dotenv(".env")
+for key, value in {
+    "GOOGLE_CLOUD_PROJECT": "local-project",
+    "GOOGLE_CLOUD_LOCATION": "us-central1",
+    "NL2SQL_MODEL": "gemini-2.0-flash",
+    "BQ_DATA_PROJECT_ID": "local-project",
+    "BQ_DATASET_ID": "bench_dataset",
+}.items():
+    os.environ.setdefault(key, value)
+
+from agents.bigquery.schema import SchemaIndex, TableSchema, render_schema  # noqa: E402
+from agents.bigquery.schema.catalog import ColumnSchema  # noqa: E402
+from agents.bigquery.tools.nl2sql import build_nl2sql_prompt  # noqa: E402
+
+from .stats import summarize  # noqa: E402
+
+DATASET_ID = "bench_dataset"
+
+# 合成スキーマの元になるテーブル（名前, 説明, [(列名, 型, 説明, 例)]）
+DOMAINS = [
+    ("products", "商品マスタ", [
+        ("product_id", "STRING", "商品ID", "P001"),
+        ("product_name", "STRING", "商品名", "ノートPC"),
+        ("price", "FLOAT64", "価格", 99800),
+        ("category", "STRING", "カテゴリ", "電子機器"),
+    ]),
+    ("customers", "顧客マスタ", [
+        ("customer_id", "STRING", "顧客ID", "C001"),
+        ("customer_name", "STRING", "顧客名", "山田太郎"),
+        ("prefecture", "STRING", "都道府県", "東京都"),
+        ("registered_at", "TIMESTAMP", "登録日時", "2024-01-01 00:00:00"),
+    ]),
+    ("orders", "注文履歴", [
+        ("order_id", "STRING", "注文ID", "O001"),
+        ("customer_id", "STRING", "顧客ID", "C001"),
+        ("product_id", "STRING", "商品ID", "P001"),
+        ("quantity", "INT64", "数量", 2),
+        ("ordered_at", "TIMESTAMP", "注文日時", "2024-02-01 10:00:00"),
+    ]),
+    ("inventory", "在庫", [
+        ("warehouse_id", "STRING", "倉庫ID", "W01"),
+        ("product_id", "STRING", "商品ID", "P001"),
+        ("stock", "INT64", "在庫数", 120),
+    ]),
+    ("shipments", "出荷実績", [
+        ("shipment_id", "STRING", "出荷ID", "S001"),
+        ("order_id", "STRING", "注文ID", "O001"),
+        ("carrier", "STRING", "配送業者", "ヤマト運輸"),
+        ("shipped_at", "TIMESTAMP", "出荷日時", "2024-02-02 09:00:00"),
+    ]),
+    ("employees", "従業員", [
+        ("employee_id", "STRING", "従業員ID", "E001"),
+        ("department", "STRING", "部署", "営業部"),
+        ("salary", "INT64", "給与", 400000),
+    ]),
+    ("campaigns", "販促キャンペーン", [
+        ("campaign_id", "STRING", "キャンペーンID", "K001"),
+        ("campaign_name", "STRING", "キャンペーン名", "春のセール"),
+        ("discount_rate", "FLOAT64", "割引率", 0.1),
+    ]),
+    ("web_sessions", "Webアクセスログ", [
+        ("session_id", "STRING", "セッションID", "WS001"),
+        ("page_path", "STRING", "ページのパス", "/products/P001"),
+        ("duration_sec", "INT64", "滞在時間（秒）", 35),
+    ]),
+]
+
+# (質問, 正解テーブル)
+QUESTIONS = [
+    ("プロダクトを価格が高い順に教えて", "products"),
+    ("東京都の顧客は何人いますか", "customers"),
+    ("先月の注文の数量の合計は", "orders"),
+    ("在庫数が10未満の商品を教えて", "inventory"),
+    ("配送業者ごとの出荷件数", "shipments"),
+    ("部署ごとの平均給与", "employees"),
+    ("割引率が最も高いキャンペーン名", "campaigns"),
+    ("滞在時間が長いページのパス", "web_sessions"),
+]
+
+
+def build_schema(num_tables: int) -> str:
+    """Builds a schema of ``num_tables`` tables by repeating the domains with suffixes."""
+    tables = []
+    for i in range(num_tables):
+        name, description, columns = DOMAINS[i % len(DOMAINS)]
+        suffix = "" if i < len(DOMAINS) else f"_{i // len(DOMAINS):03d}"
+        tables.append(
+            TableSchema(
+                name=f"{name}{suffix}",
+                version="1",
+                description=description + (f"（アーカイブ{suffix}）" if suffix else ""),
+                columns=[
+                    ColumnSchema(column, data_type, text) for column, data_type, text, _ in columns
+                ],
+                sample_rows=[{column: example for column, _, _, example in columns}],
+            )
+        )
+    return render_schema(DATASET_ID, tables)
+
+
+def estimate_tokens(text: str) -> int:
+    # 日本語混じりのテキストのおおよそのトークン数
+    return len(text) // 2 + 1
+
+
+async def measure_generation(prompts: list[str], repeat: int) -> dict:
+    from agents.bigquery.tools.nl2sql import get_llm_client, nl2sqlModelConfig
+
+    latencies = []
+    for prompt in prompts:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await get_llm_client().aio.models.generate_content(
+                model=nl2sqlModelConfig.nl2sql_model,
+                contents=prompt,
+                config={"temperature": 0.1},
+            )
+            latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+async def main(sizes: list[int], top_k: int, max_columns: int, generate: bool, repeat: int):
+    results = {}
+    for size in sizes:
+        schema = build_schema(size)
+
+        started = time.perf_counter()
+        index = SchemaIndex(schema)
+        build_seconds = time.perf_counter() - started
+
+        full_prompts, pruned_prompts, prune_latencies = [], [], []
+        recalled = 0
+        for question, expected_table in QUESTIONS:
+            started = time.perf_counter()
+            pruned = index.prune(question, top_k, max_columns) or schema
+            prune_latencies.append(time.perf_counter() - started)
+            recalled += f"`{DATASET_ID}.{expected_table}`" in pruned
+            full_prompts.append(build_nl2sql_prompt(question, schema))
+            pruned_prompts.append(build_nl2sql_prompt(question, pruned))
+
+        result = {
+            "index_build_ms": round(build_seconds * 1000, 2),
+            "prune_latency": summarize(prune_latencies),
+            "recall": round(recalled / len(QUESTIONS), 3),
+            "full_prompt_tokens_estimate": sum(map(estimate_tokens, full_prompts))
+            // len(QUESTIONS),
+            "pruned_prompt_tokens_estimate": sum(map(estimate_tokens, pruned_prompts))
+            // len(QUESTIONS),
+        }
+        if generate:
+            result["full_generation_latency"] = await measure_generation(full_prompts, repeat)
+            result["pruned_generation_latency"] = await measure_generation(pruned_prompts, repeat)
+        results[size] = result
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,500")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--max-columns", type=int, default=30)
+    parser.add_argument("--generate", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    asyncio.run(
+        main(
+            [int(size) for size in args.sizes.split(",")],
+            args.top_k,
+            args.max_columns,
+            args.generate,
+            args.repeat,
+        )
+    )
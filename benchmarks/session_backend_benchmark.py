@@ -0,0 +1,147 @@
+"""
+セッションバックエンドのスループットを比較するベンチマーク
+
+ADKのDatabaseSessionService（同期ドライバ）、AsyncDatabaseSessionService
+（非同期ドライバ + コネクションプール）、WriteBehindSessionService
+（イベント追記のグループコミット）で、1ターン分のセッション操作
+（セッション読み込み + イベント追記）を並行実行し、ターン/秒とレイテンシを比較する。
+
+使い方:
+  uv run python -m benchmarks.session_backend_benchmark [--db-url URL] [--turns N] [--concurrency C]
+
+引数:
+  --db-url      : 比較に使うデータベースURL（省略時は一時ディレクトリのSQLite）
+  --turns       : 実行するターン数
+  --concurrency : 同時に実行するターン数
+  --events      : 1ターンあたりに追記するイベント数
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import BaseSessionService
+from google.adk.sessions.database_session_service import DatabaseSessionService
+from google.genai.types import Content, FunctionCall, FunctionResponse, Part
+
+from server.sessions import AsyncDatabaseSessionService, WriteBehindSessionService
+
+from .stats import summarize
+
+APP_NAME = "session_backend_benchmark"
+
+
+def build_turn_events(invocation_id: str, num_events: int) -> list[Event]:
+    """Builds events shaped like one BigQuery agent turn (user, tool calls, answer)."""
+    events = [
+        Event(
+            invocation_id=invocation_id,
+            author="user",
+            content=Content(role="user", parts=[Part(text="プロダクトを価格が高い順に教えて")]),
+        )
+    ]
+    for i in range(max(num_events - 2, 0) // 2):
+        events.append(
+            Event(
+                invocation_id=invocation_id,
+                author="bigquery_agent",
+                content=Content(
+                    role="model",
+                    parts=[Part(function_call=FunctionCall(name="execute_sql", args={"query": f"SELECT {i}"}))],
+                ),
+            )
+        )
+        events.append(
+            Event(
+                invocation_id=invocation_id,
+                author="bigquery_agent",
+                content=Content(
+                    role="user",
+                    parts=[Part(function_response=FunctionResponse(name="execute_sql", response={"rows": [i]}))],
+                ),
+                actions=EventActions(state_delta={"sql_query": f"SELECT {i}"}),
+            )
+        )
+    events.append(
+        Event(
+            invocation_id=invocation_id,
+            author="bigquery_agent",
+            content=Content(role="model", parts=[Part(text='{"nl_results": "..."}')]),
+        )
+    )
+    return events
+
+
+async def run_turn(service: BaseSessionService, user_id: str, session_id: str, num_events: int) -> float:
+    started = time.perf_counter()
+    session = await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    for event in build_turn_events(str(uuid.uuid4()), num_events):
+        await service.append_event(session, event)
+    if isinstance(service, WriteBehindSessionService):
+        # main.pyと同様にターン完了時にこのセッションのイベントだけをフラッシュする
+        await service.flush_session(APP_NAME, user_id, session_id)
+    return time.perf_counter() - started
+
+
+async def benchmark(service: BaseSessionService, turns: int, concurrency: int, num_events: int) -> dict:
+    # ターン同士がセッションを取り合わないよう、同時実行数と同じ数のセッションを使う
+    session_ids = [str(uuid.uuid4()) for _ in range(concurrency)]
+    for session_id in session_ids:
+        await service.create_session(app_name=APP_NAME, user_id="bench", session_id=session_id)
+
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(turns):
+        queue.put_nowait(i)
+    latencies: list[float] = []
+
+    async def worker(session_id: str):
+        while not queue.empty():
+            queue.get_nowait()
+            latencies.append(await run_turn(service, "bench", session_id, num_events))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(session_id) for session_id in session_ids))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "turns_per_sec": round(turns / elapsed, 2),
+        "elapsed_sec": round(elapsed, 3),
+        "turn_latency": summarize(latencies),
+    }
+
+
+async def main(db_url: str, turns: int, concurrency: int, num_events: int):
+    results = {}
+
+    sync_service = DatabaseSessionService(db_url=db_url)
+    results["database"] = await benchmark(sync_service, turns, concurrency, num_events)
+    sync_service.db_engine.dispose()
+
+    async_service = AsyncDatabaseSessionService(db_url, pool_size=concurrency)
+    results["async_database"] = await benchmark(async_service, turns, concurrency, num_events)
+    await async_service.close()
+
+    write_behind_service = WriteBehindSessionService(db_url, pool_size=concurrency)
+    results["write_behind"] = await benchmark(write_behind_service, turns, concurrency, num_events)
+    results["write_behind"]["commits"] = write_behind_service.stats.commits
+    await write_behind_service.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--events", type=int, default=6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_url = args.db_url or f"sqlite:///{Path(tmp_dir) / 'sessions.db'}"
+        asyncio.run(main(db_url, args.turns, args.concurrency, args.events))
@@ -0,0 +1,131 @@
+"""
+SQLのローカル検証のベンチマーク
+
+評価セット（bigquery_agent_eval_set.evalset.json）で execute_sql に渡されたSQLと、
+それを壊した典型的な誤り（存在しない列・テーブル、構文エラー、DML、LIMITなし・過大なLIMIT）を
+ローカルで検証し、BigQueryに送る前に検出できた件数、省略できた往復
+（execute_sql の呼び出しと、エラーを読んで修正するためのモデル呼び出し）、検証のレイテンシを出力する。
+sqlglot がない環境の簡易チェックとも比較する。
+
+使い方:
+  uv run python -m benchmarks.sql_validation_benchmark [--repeat 200]
+
+引数:
+  --repeat : SQLあたりの検証回数（レイテンシの計測用）
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+# エージェントの読み込みに必要な値だけ埋めておく（評価セットのデータセットに合わせる）
+for key, value in {
+    "GOOGLE_CLOUD_PROJECT": "local-project",
+    "GOOGLE_CLOUD_LOCATION": "us-central1",
+    "NL2SQL_MODEL": "gemini-2.0-flash",
+    "BQ_DATA_PROJECT_ID": "vertex-ai-477703",
+    "BQ_DATASET_ID": "sample_dataset",
+}.items():
+    os.environ.setdefault(key, value)
+
+from agents.bigquery.config import BigqueryDataConfig  # noqa: E402
+from agents.bigquery.tools import sql_validator  # noqa: E402
+from agents.bigquery.tools.nl2sql import MAX_NUM_ROWS  # noqa: E402
+
+from .stats import summarize  # noqa: E402
+
+EVAL_SET = Path("agents/bigquery/bigquery_agent_eval_set.evalset.json")
+TABLE = "`vertex-ai-477703.sample_dataset.products`"
+
+
+def eval_set_queries() -> list[str]:
+    """Returns the SQL passed to execute_sql in the eval set."""
+    data = json.loads(EVAL_SET.read_text(encoding="utf-8"))
+    queries = []
+    for case in data["eval_cases"]:
+        for invocation in case["conversation"]:
+            events = (invocation.get("intermediate_data") or {}).get("invocation_events", [])
+            for event in events:
+                for part in event["content"]["parts"]:
+                    call = part.get("function_call")
+                    if call and call["name"] == "execute_sql":
+                        queries.append(call["args"]["query"])
+    return queries
+
+
+def build_cases(queries: list[str]) -> list[tuple[str, str, bool]]:
+    """(ケース名, SQL, BigQueryでエラーになるか) の一覧"""
+    cases = []
+    for i, query in enumerate(queries):
+        cases += [
+            (f"eval_{i}", query, False),
+            (f"eval_{i}_no_limit", query.rsplit("LIMIT", 1)[0], False),
+            (f"eval_{i}_large_limit", query.rsplit("LIMIT", 1)[0] + "LIMIT 1000000", False),
+            (f"eval_{i}_unknown_column", query.replace(".price", ".cost"), True),
+            (f"eval_{i}_unknown_table", query.replace("products`", "product`"), True),
+            (f"eval_{i}_syntax_error", query.replace("FROM", "FORM", 1), True),
+        ]
+    cases += [
+        ("aggregate", f"SELECT category, AVG(price) AS avg_price FROM {TABLE} GROUP BY category", False),
+        ("alias_column", f"SELECT p.product_nme FROM {TABLE} AS p LIMIT 10", True),
+        ("dml", f"DELETE FROM {TABLE} WHERE price < 1000", True),
+        ("multiple_statements", f"SELECT 1 FROM {TABLE}; SELECT 2 FROM {TABLE}", True),
+    ]
+    return cases
+
+
+def run(cases: list[tuple[str, str, bool]], schema: str, repeat: int) -> dict:
+    caught, rewritten, false_positives, latencies = [], [], [], []
+    for name, sql, fails_remotely in cases:
+        result = sql_validator.validate_sql(sql, schema, MAX_NUM_ROWS)
+        if not result.ok and fails_remotely:
+            caught.append(name)
+        elif not result.ok:
+            false_positives.append(name)
+        if result.rewrites:
+            rewritten.append(name)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            sql_validator.validate_sql(sql, schema, MAX_NUM_ROWS)
+            latencies.append(time.perf_counter() - started)
+
+    failing = sum(fails_remotely for _, _, fails_remotely in cases)
+    return {
+        "cases": len(cases),
+        "failing_cases": failing,
+        "caught_locally": len(caught),
+        "missed": sorted(name for name, _, fails in cases if fails and name not in caught),
+        "false_positives": false_positives,
+        "limit_rewrites": len(rewritten),
+        # 検出した誤りごとに execute_sql の呼び出しと、エラーを読むモデル呼び出しが1回ずつ減る
+        "execute_sql_calls_avoided": len(caught),
+        "llm_round_trips_avoided": len(caught),
+        "validation_latency": summarize(latencies),
+    }
+
+
+def main(repeat: int):
+    schema = BigqueryDataConfig.from_env().schema
+    cases = build_cases(eval_set_queries())
+
+    results = {}
+    if sql_validator.sqlglot is not None:
+        results["sqlglot"] = run(cases, schema, repeat)
+    parser_module = sql_validator.sqlglot
+    sql_validator.sqlglot = None
+    try:
+        results["lexical"] = run(cases, schema, repeat)
+    finally:
+        sql_validator.sqlglot = parser_module
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    main(args.repeat)
@@ -0,0 +1,146 @@
+"""
+StoryFlowAgent の批評・修正ループ（CriticReviserLoop）のベンチマーク
+
+Geminiを呼ばずに、決まった批評と修正版を返すフェイクのモデルを使い、
+常に max_iterations 回繰り返すループ（STORY_LOOP_CONVERGENCE=0）と、
+承認・収束・予算で早めに終わるループを同じシナリオで実行して、
+LLMの呼び出し回数・トークン数・レイテンシと、最後のストーリーを比較する。
+
+シナリオ:
+  approved    : 2回目の批評で承認（APPROVED）される
+  small_edits : 2回目以降の修正がほとんど変わらない
+  budget      : 批評が毎回修正を求め続け、トークンの予算で止まる
+
+使い方:
+  uv run python -m benchmarks.story_critic_loop_benchmark [--max-iterations 4] [--runs 5]
+
+引数:
+  --max-iterations : ループの最大回数
+  --max-tokens     : budget シナリオのトークン予算
+  --latency        : 1回のモデル呼び出しのレイテンシ（ミリ秒）
+  --runs           : シナリオ・モードごとの実行回数
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from google.adk.agents import LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from agents.custom_story_generator.config import CriticLoopConfig
+from agents.custom_story_generator.critic_loop import create_critic_reviser_loop
+
+from .stats import summarize
+from .story_fake_llm import FakeStoryLlm
+
+APP_NAME = "story_critic_loop_benchmark"
+USER_ID = "bench-user"
+STORY = (
+    "A small kitten named Miso found an old lantern in the attic. When she touched it, "
+    "the lantern began to glow and whispered the name of a forgotten friend."
+)
+REVISIONS = [
+    STORY.replace("found an old lantern", "discovered a dusty brass lantern")
+    + " Miso followed the light down the stairs, heart pounding.",
+    STORY.replace("found an old lantern", "discovered a dusty brass lantern")
+    + " Miso followed the light down the creaking stairs, heart pounding.",
+    STORY.replace("found an old lantern", "discovered a dusty brass lantern")
+    + " Miso followed the soft light down the creaking stairs, heart pounding.",
+]
+
+SCENARIOS = {
+    "approved": {
+        "criticism": ["Give Miso a clearer goal.", "APPROVED"],
+        "revisions": [REVISIONS[0], "Miso and the lantern set off together at dawn."],
+    },
+    "small_edits": {
+        "criticism": ["Give Miso a clearer goal.", "Tighten the ending."],
+        "revisions": REVISIONS,
+    },
+    "budget": {
+        "criticism": ["Give Miso a clearer goal.", "Add more tension.", "Add a twist."],
+        "revisions": [
+            REVISIONS[0],
+            "Miso climbed onto the roof with the lantern and waited for the storm.",
+            "The forgotten friend turned out to be Miso's own grandmother, long lost at sea.",
+            "Together they lit every window in the village so the ships could come home.",
+        ],
+    },
+}
+
+
+async def run_scenario(scenario: dict, config: CriticLoopConfig, latency: float, runs: int) -> dict:
+    latencies = []
+    calls = []
+    for _ in range(runs):
+        critic = LlmAgent(
+            name="Critic",
+            model=FakeStoryLlm(latency_ms=latency, responses=scenario["criticism"]),
+            instruction="Review the story provided: {current_story}",
+            output_key="criticism",
+        )
+        reviser = LlmAgent(
+            name="Reviser",
+            model=FakeStoryLlm(latency_ms=latency, responses=scenario["revisions"]),
+            instruction="Revise the story provided: {current_story}, based on {criticism}.",
+            output_key="current_story",
+        )
+        loop = create_critic_reviser_loop(critic, reviser, config)
+        session_service = InMemorySessionService()
+        runner = Runner(agent=loop, app_name=APP_NAME, session_service=session_service)
+
+        session_id = uuid.uuid4().hex
+        await session_service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session_id, state={"current_story": STORY}
+        )
+        content = types.Content(role="user", parts=[types.Part(text="Refine the story.")])
+        tokens = 0
+        started = time.perf_counter()
+        async for event in runner.run_async(user_id=USER_ID, session_id=session_id, new_message=content):
+            if event.usage_metadata and event.usage_metadata.total_token_count:
+                tokens += event.usage_metadata.total_token_count
+        latencies.append(time.perf_counter() - started)
+        calls.append(critic.model.calls + reviser.model.calls)
+
+        session = await session_service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+        )
+    return {
+        "latency": summarize(latencies),
+        "llm_calls": max(calls),
+        "tokens": tokens,
+        "decisions": [entry["decision"] for entry in session.state.get("loop_decisions", [])],
+        "final_story": session.state["current_story"],
+    }
+
+
+async def main(args: argparse.Namespace):
+    results = {}
+    for name, scenario in SCENARIOS.items():
+        base = CriticLoopConfig.from_env()
+        base.max_iterations = args.max_iterations
+        base.max_tokens = args.max_tokens if name == "budget" else 0
+        base.max_seconds = 0
+        fixed = CriticLoopConfig(**{**vars(base), "convergence": False})
+        convergent = CriticLoopConfig(**{**vars(base), "convergence": True})
+        results[name] = {
+            "fixed": await run_scenario(scenario, fixed, args.latency, args.runs),
+            "convergent": await run_scenario(scenario, convergent, args.latency, args.runs),
+        }
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-iterations", type=int, default=4)
+    parser.add_argument("--max-tokens", type=int, default=600)
+    parser.add_argument("--latency", type=float, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,47 @@
+import asyncio
+from typing import AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai.types import Content, GenerateContentResponseUsageMetadata, Part
+from typing_extensions import override
+
+
+class FakeStoryLlm(BaseLlm):
+    """
+    Stand-in model for the story agents in benchmarks.
+
+    Every call waits ``latency_ms`` and answers with the next entry of
+    ``responses`` (the last one repeats). Token usage is reported from the
+    length of the prompt and the answer, so budgets can be exercised too.
+    """
+
+    model: str = "fake-story-llm"
+    latency_ms: float = 200
+    responses: list[str] = ["Once upon a time, a story was written."]
+    calls: int = 0
+
+    @classmethod
+    @override
+    def supported_models(cls) -> list[str]:
+        return [r"fake-story-.*"]
+
+    @override
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        text = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        await asyncio.sleep(self.latency_ms / 1000)
+        prompt = str(llm_request.config.system_instruction or "") + "".join(
+            part.text or "" for content in llm_request.contents for part in content.parts or []
+        )
+        yield LlmResponse(
+            content=Content(role="model", parts=[Part(text=text)]),
+            usage_metadata=GenerateContentResponseUsageMetadata(
+                prompt_token_count=len(prompt) // 4 + 1,
+                candidates_token_count=len(text) // 4 + 1,
+                total_token_count=(len(prompt) + len(text)) // 4 + 2,
+            ),
+        )
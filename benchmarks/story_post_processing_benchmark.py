@@ -0,0 +1,107 @@
+"""
+StoryFlowAgent の後処理（文法・トーンなどのチェック）のベンチマーク
+
+Geminiを呼ばずに、チェックごとに決まったレイテンシで応答するフェイクのモデルを使い、
+PostProcessing ステージを sequential / parallel の各モードで実行して、ステージ全体の
+レイテンシを比較する。parallel ではチェックのレイテンシの合計ではなく最大値に近くなる。
+あわせて、各チェックの出力がセッションの状態に書き込まれていることを確認する。
+
+使い方:
+  uv run python -m benchmarks.story_post_processing_benchmark [--latencies 300,500] [--runs 10]
+
+引数:
+  --latencies : チェックごとのレイテンシ（ミリ秒、カンマ区切り）。先頭2つが文法・トーン、3つ目以降は追加のチェック
+  --runs      : モードごとの実行回数
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from google.adk.agents import LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from agents.custom_story_generator.config import PostProcessingConfig
+from agents.custom_story_generator.post_processing import create_post_processing_agent
+
+from .stats import summarize
+from .story_fake_llm import FakeStoryLlm
+
+APP_NAME = "story_post_processing_benchmark"
+USER_ID = "bench-user"
+STORY = "A brave kitten tiptoed into the haunted house and made a friend."
+
+
+def create_checks(latencies: list[float]) -> list[LlmAgent]:
+    names = ["GrammarCheck", "ToneCheck"] + [f"Reviewer{i}" for i in range(len(latencies) - 2)]
+    keys = ["grammar_suggestions", "tone_check_result"] + [
+        f"review_{i}" for i in range(len(latencies) - 2)
+    ]
+    answers = ["Grammar is good!", "positive"] + ["Looks fine."] * (len(latencies) - 2)
+    return [
+        LlmAgent(
+            name=name,
+            model=FakeStoryLlm(latency_ms=latency, responses=[answer]),
+            instruction="Review the story provided: {current_story}",
+            output_key=key,
+        )
+        for name, key, answer, latency in zip(names, keys, answers, latencies)
+    ]
+
+
+async def run_mode(mode: str, latencies: list[float], runs: int) -> dict:
+    checks = create_checks(latencies)
+    agent = create_post_processing_agent(checks, PostProcessingConfig(mode=mode))
+    session_service = InMemorySessionService()
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+
+    stage_latencies = []
+    for _ in range(runs):
+        session_id = uuid.uuid4().hex
+        await session_service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session_id, state={"current_story": STORY}
+        )
+        content = types.Content(role="user", parts=[types.Part(text="Check the story.")])
+        started = time.perf_counter()
+        authors = []
+        async for event in runner.run_async(
+            user_id=USER_ID, session_id=session_id, new_message=content
+        ):
+            authors.append(event.author)
+        stage_latencies.append(time.perf_counter() - started)
+
+        session = await session_service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+        )
+        missing = [check.output_key for check in checks if check.output_key not in session.state]
+        if missing:
+            raise RuntimeError(f"{mode}: state keys not written: {missing}")
+
+    return {"stage_latency": summarize(stage_latencies), "event_authors": authors}
+
+
+async def main(args: argparse.Namespace):
+    latencies = [float(value) for value in args.latencies.split(",")]
+    if len(latencies) < 2:
+        raise SystemExit("--latencies needs at least the grammar and tone checks")
+    results = {
+        "checks": len(latencies),
+        "sum_of_check_latencies_ms": sum(latencies),
+        "max_check_latency_ms": max(latencies),
+    }
+    for mode in ("sequential", "parallel"):
+        results[mode] = await run_mode(mode, latencies, args.runs)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latencies", default="300,500")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,113 @@
+"""
+トレース（TRACE_ENABLED）のオーバーヘッドのベンチマーク
+
+Geminiを呼ばずに、すぐに応答するフェイクのモデルで StoryFlowAgent を実行し、
+TracingPlugin なし（TRACE_ENABLED=0 と同じ）・メモリ上でトレースを作るだけ・ファイルに書き出す、の
+3通りで1回の実行あたりの時間を比較する。最後に書き出したトレースのスパンの数と、
+chrome://tracing や https://ui.perfetto.dev で開けるファイルのパスを表示する。
+
+使い方:
+  uv run python -m benchmarks.tracing_overhead_benchmark [--runs 200]
+
+引数:
+  --runs : 方式ごとの実行回数
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from google.adk.agents import LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from agents.custom_story_generator.config import CheckpointConfig, CriticLoopConfig, PostProcessingConfig
+from agents.custom_story_generator.story_flow_agent import StoryFlowAgent
+from server import Tracer, TracingPlugin
+
+from .stats import summarize
+from .story_fake_llm import FakeStoryLlm
+
+APP_NAME = "tracing_overhead_benchmark"
+USER_ID = "bench-user"
+
+
+def create_agent() -> StoryFlowAgent:
+    def agent(name: str, output_key: str, responses: list[str]) -> LlmAgent:
+        return LlmAgent(
+            name=name,
+            model=FakeStoryLlm(latency_ms=0, responses=responses),
+            instruction="Work on the story about {topic}.",
+            output_key=output_key,
+        )
+
+    return StoryFlowAgent(
+        name="StoryFlowAgent",
+        story_generator=agent("StoryGenerator", "current_story", ["A kitten found a lantern."]),
+        critic=agent("Critic", "criticism", ["Give the kitten a goal."]),
+        reviser=agent("Reviser", "current_story", ["A kitten found a lantern and followed its light home."]),
+        grammar_check=agent("GrammarCheck", "grammar_suggestions", ["Grammar is good!"]),
+        tone_check=agent("ToneCheck", "tone_check_result", ["positive"]),
+        post_processing_config=PostProcessingConfig(mode="parallel"),
+        critic_loop_config=CriticLoopConfig(
+            max_iterations=2,
+            convergence=False,
+            approval_token="APPROVED",
+            min_change_ratio=0.0,
+            max_tokens=0,
+            max_seconds=0,
+        ),
+        checkpoint_config=CheckpointConfig(enabled=False, state_key="story_checkpoints"),
+    )
+
+
+async def run_mode(plugin: Optional[TracingPlugin], runs: int) -> dict:
+    session_service = InMemorySessionService()
+    runner = Runner(
+        agent=create_agent(),
+        app_name=APP_NAME,
+        session_service=session_service,
+        plugins=[plugin] if plugin else [],
+    )
+    content = types.Content(role="user", parts=[types.Part(text="Write the story.")])
+    latencies = []
+    for _ in range(runs):
+        session_id = uuid.uuid4().hex
+        await session_service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session_id, state={"topic": "a kitten"}
+        )
+        started = time.perf_counter()
+        async for _ in runner.run_async(user_id=USER_ID, session_id=session_id, new_message=content):
+            pass
+        latencies.append(time.perf_counter() - started)
+    return {"run_latency": summarize(latencies[runs // 10 :])}
+
+
+async def main(args: argparse.Namespace):
+    output_dir = Path(tempfile.mkdtemp(prefix="traces-"))
+    in_memory = TracingPlugin(Tracer())
+    to_file = TracingPlugin(Tracer(), output_dir)
+    results = {
+        "disabled": await run_mode(None, args.runs),
+        "in_memory": await run_mode(in_memory, args.runs),
+        "to_file": await run_mode(to_file, args.runs),
+    }
+    results["in_memory"]["tracer"] = in_memory.tracer.snapshot()
+    results["to_file"]["tracer"] = to_file.tracer.snapshot()
+    results["spans_per_run"] = in_memory.tracer.spans_recorded / args.runs
+    results["example_trace"] = str(next(output_dir.glob("*.json"), ""))
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
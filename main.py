@@ -1,104 +1,390 @@
+import time
+
+# 起動時間の計測の起点
+STARTED = time.perf_counter()
+
 import os
-import json
-from typing import AsyncGenerator
+import asyncio
+import functools
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Optional
 import warnings
 
 from pathlib import Path
 from dotenv import load_dotenv
 
-from google.genai.types import (
-    Part,
-    Content,
-)
+# Load environment variables before importing agents
+load_dotenv("agents/bigquery/.env")
+load_dotenv(".env")
 
-from google.adk.runners import Runner
-from google.adk.sessions.database_session_service import DatabaseSessionService
-from google.adk.events import Event
-from google.adk.agents.run_config import RunConfig, StreamingMode
+from server.config import StartupConfig
+from server.startup import StartupProfile
+
+# STARTUP_PROFILE=1 ではここから後のimportの時間を記録する
+startup_config = StartupConfig.from_env()
+startup_profile = StartupProfile(
+    startup_config.profile, startup_config.profile_top, started=STARTED
+)
 
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.middleware.cors import CORSMiddleware
 
-# Load environment variables before importing agents
-load_dotenv("agents/bigquery/.env")
-load_dotenv(".env")
+from server import (
+    AdmissionController,
+    AdmissionRejected,
+    LazyResource,
+    ReplayBuffer,
+    ReplayRegistry,
+    ServerMetrics,
+    TurnLease,
+)
+from server.config import (
+    AdmissionConfig,
+    HistoryConfig,
+    MetricsConfig,
+    ReplayConfig,
+    SessionCacheConfig,
+    SessionStoreConfig,
+    SseConfig,
+)
+from server.metrics import PROMETHEUS_CONTENT_TYPE
+from server.sse import TURN_COMPLETE_FRAME, TextCoalescer, encode_message, encode_text
 
-from agents.bigquery.agent import root_agent
+if TYPE_CHECKING:
+    from google.adk.events import Event
 
 warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 #
 # ADK Streaming
 #
 
 APP_NAME = "ADK Streaming example"
 
-database_url = os.getenv("DATABASE_URL")
-if not database_url:
-    raise ValueError("DATABASE_URL environment variable is not set")
+metrics_config = MetricsConfig.from_env()
+metrics = ServerMetrics(metrics_config)
 
-session_service = DatabaseSessionService(db_url=database_url)
+# 同一セッションのターンを直列化し、プロセス全体の同時実行ターン数を制限する
+admission = AdmissionController(AdmissionConfig.from_env())
 
 
-runner = Runner(
-    app_name=APP_NAME,
-    agent=root_agent,
-    session_service=session_service,
-)
+@dataclass
+class AgentRuntime:
+    """Everything that needs google.adk, built on first use by ``build_agent_runtime``."""
 
+    runner: Any
+    session_service: Any
+    session_cache: Any
+    bigquery_agent: ModuleType
+    nl2sql: ModuleType
+    tracer: Any = None
 
-async def get_or_create_session(user_id: str, session_id: str) -> str:
-    session = await runner.session_service.get_session(
-        app_name=APP_NAME,
-        user_id=user_id,
-        session_id=session_id,
-    )
 
-    if session:
-        return session.id
+def build_agent_runtime() -> AgentRuntime:
+    # google.adk・エージェント・セッションDBの読み込みは、待ち受けを始めてから（または最初のリクエストで）行う
+    try:
+        with startup_profile.phase("import_adk"):
+            from google.adk.runners import Runner
 
-    session = await runner.session_service.create_session(
-        app_name=APP_NAME,
-        user_id=user_id,
-        session_id=session_id,
+            from server import MetricsPlugin, SessionCache, create_tracing_plugins
+            from server.sessions import create_session_service
+        with startup_profile.phase("import_agent"):
+            import agents.bigquery.agent as bigquery_agent
+            import agents.bigquery.tools.nl2sql as nl2sql
+        with startup_profile.phase("build_runner"):
+            session_service = create_session_service(
+                SessionStoreConfig.from_env(), HistoryConfig.from_env()
+            )
+            # TRACE_ENABLED=1 のときだけ、ターンごとのトレースを書き出すプラグインが入る
+            tracing_plugins = create_tracing_plugins()
+            runner = Runner(
+                app_name=APP_NAME,
+                agent=bigquery_agent.root_agent,
+                session_service=session_service,
+                # モデル呼び出しとツール呼び出しのレイテンシはADKのコールバックで計測する
+                plugins=([MetricsPlugin(metrics)] if metrics_config.enabled else []) + tracing_plugins,
+            )
+            session_cache = SessionCache(session_service, APP_NAME, SessionCacheConfig.from_env())
+        register_runtime_gauges(session_cache, nl2sql)
+        startup_profile.mark("agent_ready")
+        return AgentRuntime(
+            runner,
+            session_service,
+            session_cache,
+            bigquery_agent,
+            nl2sql,
+            tracer=tracing_plugins[0].tracer if tracing_plugins else None,
+        )
+    finally:
+        # 構築に失敗してもimportの計測は止めて、それまでの内訳を出す
+        startup_profile.finish()
+
+
+def register_runtime_gauges(session_cache, nl2sql: ModuleType):
+    metrics.register_gauge(
+        "adk_session_cache_hits",
+        "Session lookups answered from the session cache.",
+        lambda: session_cache.stats.hits,
     )
-
-    return session.id
-
-
-async def agent_to_client_sse(events: AsyncGenerator[Event, None]):
+    metrics.register_gauge(
+        "adk_session_cache_misses",
+        "Session lookups that went to the session service.",
+        lambda: session_cache.stats.misses,
+    )
+    if nl2sql.nl2sql_cache:
+        metrics.register_gauge(
+            "adk_nl2sql_cache_hit_ratio",
+            "Share of NL2SQL generations answered from the cache.",
+            lambda: nl2sql.nl2sql_cache.snapshot()["hit_ratio"],
+        )
+        metrics.register_gauge(
+            "adk_nl2sql_cache_time_saved_seconds",
+            "NL2SQL model time saved by cache hits.",
+            lambda: nl2sql.nl2sql_cache.stats.time_saved_seconds,
+        )
+    if nl2sql.candidate_generator:
+        metrics.register_gauge(
+            "adk_nl2sql_candidate_latency_saved_seconds",
+            "Estimated NL2SQL latency saved by parallel or hedged candidates.",
+            lambda: nl2sql.candidate_generator.stats.latency_saved_seconds,
+        )
+
+
+agent_runtime = LazyResource("agent runtime", build_agent_runtime)
+
+sse_config = SseConfig.from_env()
+
+# 再接続時に送り直すため、セッションごとに直近のSSEフレームを保持する
+replay_registry = ReplayRegistry(ReplayConfig.from_env())
+
+# 実行中のターンのタスクがGCされないように参照を保持する
+turn_tasks: set[asyncio.Task] = set()
+
+
+async def get_or_create_session(runtime: AgentRuntime, user_id: str, session_id: str) -> str:
+    # 既知のセッションはDBに問い合わせずに返す
+    return await runtime.session_cache.ensure(user_id, session_id)
+
+
+def stream_stored_result(
+    runtime: AgentRuntime, user_id: str, session_id: str, response: Optional[dict]
+):
+    # execute_sqlの全行はモデルを経由せず、結果ストアからチャンクに分けてクライアントへ送る。
+    # 行はリプレイバッファに持たず、送るときに結果ストアから読み出す（バッファの上限で先頭の行が消えないように）
+    handle = (response or {}).get("result_handle")
+    result_store = runtime.bigquery_agent.result_store
+    if result_store is None or not handle:
+        return
+    stored = result_store.get(handle, user_id, session_id)
+    if stored is None:
+        return
+    for offset in result_store.chunk_offsets(stored):
+        yield functools.partial(
+            render_result_chunk, result_store, handle, user_id, session_id, offset
+        )
+
+
+def render_result_chunk(
+    result_store, handle: str, user_id: str, session_id: str, offset: int
+) -> Optional[bytes]:
+    stored = result_store.get(handle, user_id, session_id)
+    if stored is None:
+        return None
+    return encode_message(result_store.chunk_message(stored, offset))
+
+
+async def agent_to_client_sse(
+    runtime: AgentRuntime,
+    events: AsyncGenerator["Event", None],
+    turn_started: float,
+    user_id: str,
+    session_id: str,
+):
+    execute_sql_tool = runtime.bigquery_agent.ADK_BUILTIN_BQ_EXECUTE_SQL_TOOL
+    coalescer = TextCoalescer(sse_config)
+    first_token = True
     async for event in events:
         if not event.content or not event.content.parts:
             continue
 
         for part in event.content.parts:
             if part.text and event.partial:
-                message = {"mime_type": "text/plain", "data": part.text}
-                yield f"data: {json.dumps(message)}\n\n"
-                print(f"[AGENT TO CLIENT]: text/plain: {event}")
+                if first_token:
+                    first_token = False
+                    metrics.time_to_first_token.observe(time.perf_counter() - turn_started)
+                frame = coalescer.add(part.text)
+                if frame:
+                    yield frame
 
             if part.function_call:
+                frame = coalescer.flush()
+                if frame:
+                    yield frame
                 function_name = part.function_call.name
-                message = {"mime_type": "text/plain", "data": f"{function_name} called\n\n"}
-                yield f"data: {json.dumps(message)}\n\n"
-                print(f"[AGENT TO CLIENT]: function_call: {event}")
-
-    # run_asyncの場合はturn_complete: Trueが返却されないので後付け
-    final_message = {
-        "turn_complete": True,
-        "interrupted": False,
-    }
-    yield f"data: {json.dumps(final_message)}\n\n"
-    print(f"[AGENT TO CLIENT]: {final_message}")
+                yield encode_text(f"{function_name} called\n\n")
+                logger.info("[AGENT TO CLIENT]: function_call: %s", function_name)
+
+            if part.function_response:
+                frame = coalescer.flush()
+                if frame:
+                    yield frame
+                # fetch_result_pageなども同じハンドルを返すので、全行を送るのはexecute_sqlの結果だけ
+                if part.function_response.name == execute_sql_tool:
+                    for frame in stream_stored_result(
+                        runtime, user_id, session_id, part.function_response.response
+                    ):
+                        yield frame
+                        # 大きな結果でもチャンクの間に購読者へ順番を回す
+                        await asyncio.sleep(0)
+
+        # partialでないイベントの境界でバッファ済みのテキストを送り出す
+        if not event.partial:
+            frame = coalescer.flush()
+            if frame:
+                yield frame
+
+    frame = coalescer.flush()
+    if frame:
+        yield frame
+
+    yield TURN_COMPLETE_FRAME
+    logger.info(
+        "[AGENT TO CLIENT]: turn_complete (%d text chunks in %d frames)",
+        coalescer.chunks,
+        coalescer.frames,
+    )
+
+
+async def run_turn(
+    runtime: AgentRuntime,
+    user_id: str,
+    session_id: str,
+    text: str,
+    buffer: ReplayBuffer,
+    lease: TurnLease,
+    turn_started: float,
+):
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai.types import Content, Part
+
+    user_content = Content(role="user", parts=[Part.from_text(text=text)])
+    run_config = RunConfig(
+        response_modalities=["TEXT"],
+        streaming_mode=StreamingMode.SSE,
+    )
+
+    metrics.active_turns.inc()
+    try:
+        agent_events = runtime.runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=user_content,
+            run_config=run_config,
+        )
+        async for frame in agent_to_client_sse(
+            runtime, agent_events, turn_started, user_id, session_id
+        ):
+            if callable(frame):
+                buffer.publish_deferred(frame)
+            else:
+                buffer.publish(frame)
+    except Exception as e:
+        logger.exception("Error in agent stream")
+        runtime.session_cache.invalidate(user_id, session_id)
+        buffer.publish(encode_message({"error": str(e), "turn_complete": True}))
+    finally:
+        await flush_session_events(runtime, user_id, session_id)
+        buffer.finish_turn()
+        metrics.turn_duration.observe(time.perf_counter() - turn_started)
+        metrics.active_turns.dec()
+        await snapshot_session_history(runtime, user_id, session_id)
+        lease.release()
+
+
+async def flush_session_events(runtime: AgentRuntime, user_id: str, session_id: str):
+    from server.sessions import WriteBehindSessionService
+
+    # write-behind有効時はターン完了時点でイベントをコミットしておく
+    session_service = runtime.session_service
+    if not isinstance(session_service, WriteBehindSessionService):
+        return
+    try:
+        await session_service.flush_session(APP_NAME, user_id, session_id)
+    except Exception:
+        logger.exception("Failed to flush session events")
+
+
+async def snapshot_session_history(runtime: AgentRuntime, user_id: str, session_id: str):
+    from server.sessions import AsyncDatabaseSessionService
+
+    # 履歴ウィンドウから外れたイベントを要約スナップショットへ畳み込む
+    session_service = runtime.session_service
+    if not isinstance(session_service, AsyncDatabaseSessionService):
+        return
+    try:
+        await session_service.maybe_snapshot(
+            app_name=APP_NAME, user_id=user_id, session_id=session_id
+        )
+    except Exception:
+        logger.exception("Failed to snapshot session history")
 
 
 #
 # FastAPI web app
 #
 
-app = FastAPI()
+async def warm_up():
+    # 起動処理（待ち受けの開始）を待たせずにエージェントを構築し、続けてスキーマやローカルのデータを読み込んでおく
+    await asyncio.sleep(0)
+    try:
+        runtime = await agent_runtime.aget()
+    except Exception:
+        logger.exception("Failed to warm up the agent runtime")
+        return
+    if runtime.bigquery_agent.schema_provider:
+        runtime.bigquery_agent.schema_provider.warm_up()
+    if runtime.bigquery_agent.local_engine:
+        runtime.bigquery_agent.local_engine.warm_up()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_profile.mark("lifespan_started")
+    # エージェントの構築は後回しにしても、設定の誤り（DATABASE_URL未設定など）は起動時に失敗させる
+    SessionStoreConfig.from_env()
+    HistoryConfig.from_env()
+    SessionCacheConfig.from_env()
+    warm_up_task = asyncio.create_task(warm_up()) if startup_config.warm_up else None
+    yield
+    if warm_up_task:
+        warm_up_task.cancel()
+    runtime = agent_runtime.peek()
+    if runtime is None:
+        return
+    from server.sessions import AsyncDatabaseSessionService
+
+    # コネクションプールを持つバックエンドは終了時に接続を閉じる
+    if isinstance(runtime.session_service, AsyncDatabaseSessionService):
+        await runtime.session_service.close()
+    if runtime.nl2sql.nl2sql_cache:
+        runtime.nl2sql.nl2sql_cache.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -108,6 +394,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Cache-Control, Last-Event-ID",
+}
+
 TEST_PAGE_DIR = Path("test_page")
 app.mount("/test_page", StaticFiles(directory=TEST_PAGE_DIR), name="test_page")
 
@@ -117,10 +410,62 @@ async def root():
     return FileResponse(os.path.join(TEST_PAGE_DIR, "index.html"))
 
 
+@app.get("/stats")
+async def stats():
+    startup = {**startup_profile.snapshot(), "agent_runtime": agent_runtime.snapshot()}
+    runtime = agent_runtime.peek()
+    if runtime is None:
+        # /statsではエージェントを構築しない
+        return {
+            "startup": startup,
+            "admission": admission.snapshot(),
+            "replay": replay_registry.snapshot(),
+        }
+
+    from server.sessions import WriteBehindSessionService
+
+    bigquery_agent = runtime.bigquery_agent
+    nl2sql_cache = runtime.nl2sql.nl2sql_cache
+    candidate_generator = runtime.nl2sql.candidate_generator
+    return {
+        "startup": startup,
+        "admission": admission.snapshot(),
+        "session_cache": runtime.session_cache.snapshot(),
+        "replay": replay_registry.snapshot(),
+        "nl2sql_cache": nl2sql_cache.snapshot() if nl2sql_cache else None,
+        "nl2sql_candidates": candidate_generator.snapshot() if candidate_generator else None,
+        "query_cache": (
+            bigquery_agent.query_result_cache.snapshot()
+            if bigquery_agent.query_result_cache
+            else None
+        ),
+        "schema": (
+            bigquery_agent.schema_provider.snapshot() if bigquery_agent.schema_provider else None
+        ),
+        "local_engine": (
+            bigquery_agent.local_engine.snapshot() if bigquery_agent.local_engine else None
+        ),
+        "result_store": (
+            bigquery_agent.result_store.snapshot() if bigquery_agent.result_store else None
+        ),
+        "write_behind": (
+            runtime.session_service.snapshot()
+            if isinstance(runtime.session_service, WriteBehindSessionService)
+            else None
+        ),
+        "tracing": runtime.tracer.snapshot() if runtime.tracer else None,
+    }
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    if not metrics_config.enabled:
+        return Response(status_code=404)
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.post("/send/{user_id}/{session_id}")
 async def send_message_endpoint(user_id: str, session_id: str, request: Request):
-    session_id = await get_or_create_session(user_id, session_id)
-
     message = await request.json()
     mime_type = message["mime_type"]
     data = message["data"]
@@ -128,36 +473,59 @@ async def send_message_endpoint(user_id: str, session_id: str, request: Request)
     if mime_type != "text/plain":
         return {"error": f"Mime type not supported: {mime_type}"}
 
-    user_content = Content(role="user", parts=[Part.from_text(text=data)])
-    print(f"[CLIENT TO AGENT]: {data}")
+    turn_started = time.perf_counter()
+    startup_profile.mark("first_request")
+
+    try:
+        lease = await admission.acquire(user_id, session_id)
+    except AdmissionRejected as e:
+        return JSONResponse(
+            status_code=429,
+            content={"error": e.reason},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    try:
+        # 構築前ならここで待つ（STARTUP_WARM_UP=0では最初のリクエストで構築する）
+        runtime = await agent_runtime.aget()
+        session_id = await get_or_create_session(runtime, user_id, session_id)
+    except BaseException:
+        lease.release()
+        raise
+
+    logger.info("[CLIENT TO AGENT]: %s", data)
+
+    buffer = replay_registry.get_or_create(user_id, session_id)
+    cursor = buffer.start_turn()
+
+    # クライアントが切断してもターンは最後まで実行し、/resume から再接続できるようにする
+    task = asyncio.create_task(
+        run_turn(runtime, user_id, session_id, data, buffer, lease, turn_started)
+    )
+    turn_tasks.add(task)
+    task.add_done_callback(turn_tasks.discard)
 
-    run_config = RunConfig(
-        response_modalities=["TEXT"],
-        streaming_mode=StreamingMode.SSE,
+    return StreamingResponse(
+        metrics.track_stream(buffer.subscribe(cursor)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
     )
 
-    async def event_generator():
-        try:
-            agent_events = runner.run_async(
-                user_id=user_id,
-                session_id=session_id,
-                new_message=user_content,
-                run_config=run_config,
-            )
-            async for data in agent_to_client_sse(agent_events):
-                yield data
-        except Exception as e:
-            print(f"Error in agent stream: {e}")
-            error_message = {"error": str(e), "turn_complete": True}
-            yield f"data: {json.dumps(error_message)}\n\n"
 
+@app.get("/resume/{user_id}/{session_id}")
+async def resume_endpoint(user_id: str, session_id: str, request: Request):
+    buffer = replay_registry.get(user_id, session_id)
+    if buffer is None:
+        return Response(status_code=204)
+
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get(
+        "last_event_id"
+    )
     return StreamingResponse(
-        event_generator(),
+        metrics.track_stream(buffer.subscribe(buffer.cursor_for(last_event_id))),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Cache-Control",
-        },
+        headers=SSE_HEADERS,
     )
+
+
+startup_profile.mark("main_imported")
@@ -0,0 +1,41 @@
+from importlib import import_module
+
+from .admission import AdmissionController, AdmissionRejected, TurnLease
+from .lazy import LazyResource
+from .replay import ReplayBuffer, ReplayRegistry
+from .metrics import ServerMetrics
+from .startup import StartupProfile
+from .tracing import Tracer
+
+__all__ = [
+    "AdmissionController",
+    "AdmissionRejected",
+    "TurnLease",
+    "LazyResource",
+    "SessionCache",
+    "ReplayBuffer",
+    "ReplayRegistry",
+    "MetricsPlugin",
+    "ServerMetrics",
+    "StartupProfile",
+    "Tracer",
+    "TracingPlugin",
+    "create_tracing_plugins",
+]
+
+# google.adkに依存するクラスは初回参照時に読み込み、serverパッケージのimportを軽く保つ
+_ADK_EXPORTS = {
+    "SessionCache": ".session_cache",
+    "MetricsPlugin": ".metrics_plugin",
+    "TracingPlugin": ".tracing_plugin",
+    "create_tracing_plugins": ".tracing_plugin",
+}
+
+
+def __getattr__(name: str):
+    module = _ADK_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from .config import AdmissionConfig
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a turn cannot be admitted within the configured limits."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class AdmissionStats:
+    queued: int = 0
+    running: int = 0
+    admitted_total: int = 0
+    rejected_total: int = 0
+    timed_out_total: int = 0
+
+
+class _SessionLock:
+    """Per-session lock that remembers how many turns are holding or waiting on it."""
+
+    __slots__ = ("lock", "refs")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.refs = 0
+
+
+class TurnLease:
+    """A granted turn slot. ``release`` is idempotent and safe to call from several places."""
+
+    __slots__ = ("_controller", "_key", "_released")
+
+    def __init__(self, controller: "AdmissionController", key: tuple[str, str]):
+        self._controller = controller
+        self._key = key
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(self._key)
+
+
+class AdmissionController:
+    """
+    Serializes turns per session and bounds the number of turns running in the process.
+
+    A turn first waits for its session lock (so two turns never run against the
+    same session at once) and then for a process-wide slot. Waiting turns are
+    counted against ``max_queued_turns``; when the queue is full, or a turn waits
+    longer than ``queue_timeout``, it is rejected with ``AdmissionRejected`` so
+    the endpoint can answer 429 instead of piling work onto the event loop.
+    """
+
+    def __init__(self, config: AdmissionConfig):
+        self.config = config
+        self.stats = AdmissionStats()
+        self._slots = asyncio.Semaphore(config.max_concurrent_turns)
+        self._session_locks: dict[tuple[str, str], _SessionLock] = {}
+
+    async def acquire(self, user_id: str, session_id: str) -> TurnLease:
+        """Waits for the session lock and a global slot.
+
+        Args:
+            user_id: The user owning the session.
+            session_id: The session the turn runs against.
+
+        Returns:
+            TurnLease: A lease that must be released when the turn finishes.
+
+        Raises:
+            AdmissionRejected: If the wait queue is full or the wait timed out.
+        """
+        key = (user_id, session_id)
+        session_lock = self._session_locks.get(key)
+        must_wait = self._slots.locked() or (
+            session_lock is not None and session_lock.lock.locked()
+        )
+        if must_wait and self.stats.queued >= self.config.max_queued_turns:
+            self.stats.rejected_total += 1
+            logger.warning("Rejecting turn for %s: queue is full (%d queued)", key, self.stats.queued)
+            raise AdmissionRejected("turn queue is full", self.config.retry_after)
+
+        if session_lock is None:
+            session_lock = self._session_locks[key] = _SessionLock()
+        session_lock.refs += 1
+
+        self.stats.queued += 1
+        try:
+            await asyncio.wait_for(self._wait_for_turn(session_lock), self.config.queue_timeout)
+        except asyncio.TimeoutError:
+            self._drop_session_ref(key, session_lock)
+            self.stats.timed_out_total += 1
+            self.stats.rejected_total += 1
+            logger.warning("Rejecting turn for %s: timed out after %.1fs", key, self.config.queue_timeout)
+            raise AdmissionRejected("timed out waiting for a turn slot", self.config.retry_after)
+        except BaseException:
+            # クライアント切断などでキャンセルされた場合
+            self._drop_session_ref(key, session_lock)
+            raise
+        finally:
+            self.stats.queued -= 1
+
+        self.stats.running += 1
+        self.stats.admitted_total += 1
+        return TurnLease(self, key)
+
+    async def _wait_for_turn(self, session_lock: _SessionLock) -> None:
+        await session_lock.lock.acquire()
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            session_lock.lock.release()
+            raise
+
+    def _release(self, key: tuple[str, str]) -> None:
+        self.stats.running -= 1
+        self._slots.release()
+        session_lock = self._session_locks[key]
+        session_lock.lock.release()
+        self._drop_session_ref(key, session_lock)
+
+    def _drop_session_ref(self, key: tuple[str, str], session_lock: _SessionLock) -> None:
+        session_lock.refs -= 1
+        if session_lock.refs == 0:
+            del self._session_locks[key]
+
+    def snapshot(self) -> dict:
+        """Returns the current counters as a plain dict."""
+        return {
+            "queued": self.stats.queued,
+            "running": self.stats.running,
+            "admitted_total": self.stats.admitted_total,
+            "rejected_total": self.stats.rejected_total,
+            "timed_out_total": self.stats.timed_out_total,
+            "max_concurrent_turns": self.config.max_concurrent_turns,
+            "max_queued_turns": self.config.max_queued_turns,
+        }
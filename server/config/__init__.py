@@ -0,0 +1,21 @@
+from .admission_config import AdmissionConfig
+from .session_cache_config import SessionCacheConfig
+from .sse_config import SseConfig
+from .replay_config import ReplayConfig
+from .session_store_config import SessionStoreConfig
+from .history_config import HistoryConfig
+from .metrics_config import MetricsConfig
+from .startup_config import StartupConfig
+from .tracing_config import TracingConfig
+
+__all__ = [
+    "AdmissionConfig",
+    "SessionCacheConfig",
+    "SseConfig",
+    "ReplayConfig",
+    "SessionStoreConfig",
+    "HistoryConfig",
+    "MetricsConfig",
+    "StartupConfig",
+    "TracingConfig",
+]
@@ -0,0 +1,24 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class AdmissionConfig:
+    max_concurrent_turns: int
+    max_queued_turns: int
+    queue_timeout: float
+    retry_after: int
+
+    @classmethod
+    def from_env(cls) -> "AdmissionConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            AdmissionConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            max_concurrent_turns=int(os.getenv("MAX_CONCURRENT_TURNS", "32")),
+            max_queued_turns=int(os.getenv("MAX_QUEUED_TURNS", "64")),
+            queue_timeout=float(os.getenv("TURN_QUEUE_TIMEOUT", "30")),
+            retry_after=int(os.getenv("TURN_RETRY_AFTER", "1")),
+        )
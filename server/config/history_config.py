@@ -0,0 +1,31 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class HistoryConfig:
+    max_events: int
+    max_tokens: int
+    snapshot_every: int
+    summary_max_chars: int
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_events > 0 or self.max_tokens > 0
+
+    @classmethod
+    def from_env(cls) -> "HistoryConfig":
+        """Create configuration from environment variables.
+
+        With both ``HISTORY_MAX_EVENTS`` and ``HISTORY_MAX_TOKENS`` at 0 the whole
+        history is loaded on every turn.
+
+        Returns:
+            HistoryConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            max_events=int(os.getenv("HISTORY_MAX_EVENTS", "0")),
+            max_tokens=int(os.getenv("HISTORY_MAX_TOKENS", "0")),
+            snapshot_every=int(os.getenv("HISTORY_SNAPSHOT_EVERY", "50")),
+            summary_max_chars=int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "4000")),
+        )
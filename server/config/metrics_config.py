@@ -0,0 +1,23 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class MetricsConfig:
+    enabled: bool
+    latency_buckets: list[float]
+
+    @classmethod
+    def from_env(cls) -> "MetricsConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            MetricsConfig: Configuration instance populated from environment variables.
+        """
+        buckets = os.getenv(
+            "METRICS_LATENCY_BUCKETS", "0.05,0.1,0.25,0.5,1,2.5,5,10,30,60,120"
+        )
+        return cls(
+            enabled=os.getenv("METRICS_ENABLED", "1") == "1",
+            latency_buckets=sorted(float(bucket) for bucket in buckets.split(",") if bucket),
+        )
@@ -0,0 +1,26 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class ReplayConfig:
+    max_frames_per_session: int
+    max_bytes_per_session: int
+    max_sessions: int
+    max_total_bytes: int
+    idle_ttl: float
+
+    @classmethod
+    def from_env(cls) -> "ReplayConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            ReplayConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            max_frames_per_session=int(os.getenv("REPLAY_MAX_FRAMES_PER_SESSION", "1024")),
+            max_bytes_per_session=int(os.getenv("REPLAY_MAX_BYTES_PER_SESSION", str(512 * 1024))),
+            max_sessions=int(os.getenv("REPLAY_MAX_SESSIONS", "1000")),
+            max_total_bytes=int(os.getenv("REPLAY_MAX_TOTAL_BYTES", str(64 * 1024 * 1024))),
+            idle_ttl=float(os.getenv("REPLAY_IDLE_TTL", "300")),
+        )
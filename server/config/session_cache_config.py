@@ -0,0 +1,20 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class SessionCacheConfig:
+    max_entries: int
+    ttl: float
+
+    @classmethod
+    def from_env(cls) -> "SessionCacheConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            SessionCacheConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000")),
+            ttl=float(os.getenv("SESSION_CACHE_TTL", "600")),
+        )
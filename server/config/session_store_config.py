@@ -0,0 +1,48 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class SessionStoreConfig:
+    backend: str
+    database_url: str
+    pool_size: int
+    max_overflow: int
+    pool_recycle: int
+    pool_timeout: float
+    statement_cache_size: int
+    write_behind: bool
+    write_behind_flush_ms: float
+    write_behind_max_batch: int
+
+    @classmethod
+    def from_env(cls) -> "SessionStoreConfig":
+        """Create configuration from environment variables.
+
+        ``SESSION_BACKEND`` selects the session service: ``database`` for ADK's
+        synchronous DatabaseSessionService, ``async_database`` for the pooled
+        async driver backend. ``SESSION_WRITE_BEHIND=1`` additionally
+        group-commits event appends on the async backend.
+
+        Returns:
+            SessionStoreConfig: Configuration instance populated from environment variables.
+
+        Raises:
+            ValueError: If DATABASE_URL is not set.
+        """
+        database_url = os.getenv("DATABASE_URL")
+        if not database_url:
+            raise ValueError("DATABASE_URL environment variable is not set")
+
+        return cls(
+            backend=os.getenv("SESSION_BACKEND", "database"),
+            database_url=database_url,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            statement_cache_size=int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")),
+            write_behind=os.getenv("SESSION_WRITE_BEHIND", "0") == "1",
+            write_behind_flush_ms=float(os.getenv("SESSION_WRITE_BEHIND_FLUSH_MS", "50")),
+            write_behind_max_batch=int(os.getenv("SESSION_WRITE_BEHIND_MAX_BATCH", "500")),
+        )
@@ -0,0 +1,24 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class SseConfig:
+    coalesce_window_ms: float
+    coalesce_bytes: int
+
+    @classmethod
+    def from_env(cls) -> "SseConfig":
+        """Create configuration from environment variables.
+
+        Both limits default to 0, which sends every partial text chunk as its
+        own frame. Coalescing is opt-in: e.g. 20 ms / 1024 bytes trades a few
+        milliseconds of latency for fewer, larger frames.
+
+        Returns:
+            SseConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            coalesce_window_ms=float(os.getenv("SSE_COALESCE_WINDOW_MS", "0")),
+            coalesce_bytes=int(os.getenv("SSE_COALESCE_BYTES", "0")),
+        )
@@ -0,0 +1,25 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class StartupConfig:
+    warm_up: bool
+    profile: bool
+    profile_top: int
+
+    @classmethod
+    def from_env(cls) -> "StartupConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            StartupConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            # 待ち受け開始後にエージェント（google.adk・クライアント・セッションDB）をバックグラウンドで構築する。
+            # 0にすると最初のリクエストで構築する
+            warm_up=os.getenv("STARTUP_WARM_UP", "1") == "1",
+            # 起動の各段階とimportの所要時間の内訳を記録し、ログと /stats に出す
+            profile=os.getenv("STARTUP_PROFILE", "0") == "1",
+            profile_top=int(os.getenv("STARTUP_PROFILE_TOP", "15")),
+        )
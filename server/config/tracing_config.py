@@ -0,0 +1,25 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class TracingConfig:
+    enabled: bool
+    output_dir: str
+    max_spans: int
+
+    @classmethod
+    def from_env(cls) -> "TracingConfig":
+        """Create configuration from environment variables.
+
+        Returns:
+            TracingConfig: Configuration instance populated from environment variables.
+        """
+        return cls(
+            # 1: エージェント・モデル・ツールの呼び出しをスパンとして記録し、実行ごとにChrome trace形式で書き出す
+            enabled=os.getenv("TRACE_ENABLED", "0") == "1",
+            # 書き出し先（chrome://tracing や https://ui.perfetto.dev で開く）
+            output_dir=os.getenv("TRACE_DIR", "traces"),
+            # 1回の実行で記録するスパンの上限（超えた分は捨てて数だけ数える）
+            max_spans=int(os.getenv("TRACE_MAX_SPANS", "100000")),
+        )
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LazyResource(Generic[T]):
+    """
+    A value built once by ``factory`` on first use instead of at import time.
+
+    The factory typically imports heavy modules and creates clients, so it
+    runs in a worker thread when awaited and the event loop keeps serving
+    meanwhile. Concurrent callers of ``aget`` share one build. A failed
+    build is not cached; the next use tries again.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Future] = None
+        self.build_seconds = 0.0
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def peek(self) -> Optional[T]:
+        """Returns the value if it has been built, without building it."""
+        return self._value if self._ready else None
+
+    def get(self) -> T:
+        """Returns the value, building it in the calling thread if needed."""
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                started = time.perf_counter()
+                try:
+                    self._value = self._factory()
+                except Exception as ex:
+                    self.error = str(ex)
+                    raise
+                self.build_seconds = time.perf_counter() - started
+                self.error = None
+                self._ready = True
+                logger.info("Built %s in %.2fs", self.name, self.build_seconds)
+        return self._value
+
+    async def aget(self) -> T:
+        """Returns the value, building it in a worker thread if needed."""
+        if self._ready:
+            return self._value
+        # 同時に来たリクエストは同じ構築を待つ
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(asyncio.to_thread(self.get))
+        return await asyncio.shield(self._task)
+
+    def snapshot(self) -> dict:
+        return {
+            "ready": self._ready,
+            "build_seconds": round(self.build_seconds, 3),
+            "error": self.error,
+        }
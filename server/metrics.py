@@ -0,0 +1,204 @@
+from bisect import bisect_left
+from collections.abc import AsyncIterator, Callable, Iterable
+from typing import Any, Optional
+
+from .config import MetricsConfig
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 計測対象として事前にラベルを確保しておくツール
+KNOWN_TOOLS = ("bigquery_nl2sql", "execute_sql")
+
+ROUND_TRIP_BUCKETS = [1, 2, 3, 4, 5, 6, 8, 10, 15, 20]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: list[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram:
+    """
+    Prometheus histogram with fixed buckets.
+
+    Each label set owns preallocated per-bucket counters, so ``observe`` only
+    does a bisect and a few integer increments. Cumulative bucket counts are
+    computed at scrape time instead.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Iterable[float],
+        labelnames: tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.bounds = sorted(buckets)
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], _HistogramChild] = {}
+        if not labelnames:
+            self._children[()] = _HistogramChild(self.bounds)
+
+    def labels(self, *values: str) -> _HistogramChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _HistogramChild(self.bounds)
+        return child
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.bounds + [float("inf")], child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class Gauge:
+    """
+    Prometheus gauge. Either updated in place or, when ``callback`` is given,
+    read from the callback at scrape time.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Optional[Callable[[], float]] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0.0
+        self.callback = callback
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def render(self) -> Iterable[str]:
+        value = self.callback() if self.callback else self.value
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {_format_value(value)}"
+
+
+class ServerMetrics:
+    """
+    Metrics of the streaming server, rendered in the Prometheus text format.
+
+    Turn-level timings (time to first token, turn duration, active streams)
+    are recorded by the SSE path in main.py. Model and tool latencies and LLM
+    round trips per turn are recorded by ``MetricsPlugin`` through ADK
+    callbacks.
+    """
+
+    def __init__(self, config: MetricsConfig):
+        self.config = config
+        buckets = config.latency_buckets
+        self.time_to_first_token = Histogram(
+            "adk_turn_time_to_first_token_seconds",
+            "Time from accepting a turn to its first streamed text chunk.",
+            buckets,
+        )
+        self.turn_duration = Histogram(
+            "adk_turn_duration_seconds",
+            "Total duration of a turn including tool calls.",
+            buckets,
+        )
+        self.model_call_latency = Histogram(
+            "adk_model_call_duration_seconds",
+            "Latency of a single model call until its final response.",
+            buckets,
+            labelnames=("agent", "status"),
+        )
+        self.tool_call_latency = Histogram(
+            "adk_tool_call_duration_seconds",
+            "Latency of a single tool call.",
+            buckets,
+            labelnames=("tool", "status"),
+        )
+        self.llm_round_trips = Histogram(
+            "adk_turn_llm_round_trips",
+            "Number of model calls made by one invocation.",
+            ROUND_TRIP_BUCKETS,
+        )
+        self.active_streams = Gauge(
+            "adk_active_streams",
+            "Number of SSE responses currently streaming to clients.",
+        )
+        self.active_turns = Gauge(
+            "adk_active_turns",
+            "Number of turns currently running.",
+        )
+        self._metrics: list[Any] = [
+            self.time_to_first_token,
+            self.turn_duration,
+            self.model_call_latency,
+            self.tool_call_latency,
+            self.llm_round_trips,
+            self.active_streams,
+            self.active_turns,
+        ]
+
+        for tool in KNOWN_TOOLS:
+            for status in ("ok", "error"):
+                self.tool_call_latency.labels(tool, status)
+
+    def register_gauge(self, name: str, documentation: str, callback: Callable[[], float]):
+        """Adds a gauge whose value is read from ``callback`` at scrape time."""
+        self._metrics.append(Gauge(name, documentation, callback))
+
+    async def track_stream(self, frames: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Counts ``frames`` as an active stream while the client is reading it."""
+        self.active_streams.inc()
+        try:
+            async for frame in frames:
+                yield frame
+        finally:
+            self.active_streams.dec()
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        lines.append("")
+        return "\n".join(lines)
@@ -0,0 +1,128 @@
+import time
+from typing import Any, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+from .metrics import ServerMetrics
+
+# 異常終了したinvocationの計測状態が溜まり続けないようにする上限
+_MAX_TRACKED_INVOCATIONS = 1024
+
+
+class _InvocationTimings:
+    __slots__ = ("model_started", "tool_started", "round_trips")
+
+    def __init__(self):
+        self.model_started: dict[str, float] = {}
+        self.tool_started: dict[str, float] = {}
+        self.round_trips = 0
+
+
+class MetricsPlugin(BasePlugin):
+    """
+    ADK plugin recording model call latency per agent, tool call latency and
+    the number of model calls per invocation into ``ServerMetrics``.
+
+    Registered on the Runner it sees every agent in the tree, including
+    agents run through AgentTool, without touching the agent definitions.
+    """
+
+    def __init__(self, metrics: ServerMetrics):
+        super().__init__(name="metrics")
+        self.metrics = metrics
+        self._invocations: dict[str, _InvocationTimings] = {}
+
+    def _timings(self, invocation_id: str) -> _InvocationTimings:
+        timings = self._invocations.get(invocation_id)
+        if timings is None:
+            if len(self._invocations) >= _MAX_TRACKED_INVOCATIONS:
+                self._invocations.pop(next(iter(self._invocations)))
+            timings = self._invocations[invocation_id] = _InvocationTimings()
+        return timings
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        timings = self._invocations.pop(invocation_context.invocation_id, None)
+        if timings is not None and timings.round_trips:
+            self.metrics.llm_round_trips.observe(timings.round_trips)
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        timings = self._timings(callback_context.invocation_id)
+        timings.model_started[callback_context.agent_name] = time.perf_counter()
+        timings.round_trips += 1
+        return None
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        # ストリーミング中の部分応答ではなく、最終応答までの時間を計測する
+        if not llm_response.partial:
+            self._observe_model(callback_context, "ok")
+        return None
+
+    async def on_model_error_callback(
+        self,
+        *,
+        callback_context: CallbackContext,
+        llm_request: LlmRequest,
+        error: Exception,
+    ) -> Optional[LlmResponse]:
+        self._observe_model(callback_context, "error")
+        return None
+
+    def _observe_model(self, callback_context: CallbackContext, status: str):
+        timings = self._invocations.get(callback_context.invocation_id)
+        if timings is None:
+            return
+        started = timings.model_started.pop(callback_context.agent_name, None)
+        if started is not None:
+            self.metrics.model_call_latency.labels(callback_context.agent_name, status).observe(
+                time.perf_counter() - started
+            )
+
+    async def before_tool_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        timings = self._timings(tool_context.invocation_id)
+        timings.tool_started[tool_context.function_call_id or tool.name] = time.perf_counter()
+        return None
+
+    async def after_tool_callback(
+        self,
+        *,
+        tool: BaseTool,
+        tool_args: dict[str, Any],
+        tool_context: ToolContext,
+        result: dict,
+    ) -> Optional[dict]:
+        status = "error" if isinstance(result, dict) and result.get("status") == "ERROR" else "ok"
+        self._observe_tool(tool, tool_context, status)
+        return None
+
+    async def on_tool_error_callback(
+        self,
+        *,
+        tool: BaseTool,
+        tool_args: dict[str, Any],
+        tool_context: ToolContext,
+        error: Exception,
+    ) -> Optional[dict]:
+        self._observe_tool(tool, tool_context, "error")
+        return None
+
+    def _observe_tool(self, tool: BaseTool, tool_context: ToolContext, status: str):
+        timings = self._invocations.get(tool_context.invocation_id)
+        if timings is None:
+            return
+        started = timings.tool_started.pop(tool_context.function_call_id or tool.name, None)
+        if started is not None:
+            self.metrics.tool_call_latency.labels(tool.name, status).observe(
+                time.perf_counter() - started
+            )
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Callable, Optional, Union
+
+from .config import ReplayConfig
+from .sse import encode_message
+
+logger = logging.getLogger(__name__)
+
+# フレーム1件あたりの管理コストの概算（タプルとbytesオブジェクトのヘッダ分）
+_FRAME_OVERHEAD = 96
+
+# 要求された位置のフレームが既に破棄されていたことをクライアントに知らせる
+REPLAY_GAP_FRAME = encode_message({"replay_gap": True})
+
+# 送るときに作るフレーム。作れなくなった（元のデータが破棄された）場合はNoneを返す
+DeferredFrame = Callable[[], Optional[bytes]]
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of the most recent SSE frames of one session.
+
+    Every published frame gets an ``id:`` of the form ``<generation>-<seq>``.
+    ``seq`` increases across the turns of the session; ``generation`` changes
+    whenever the buffer is recreated, so ids from an evicted buffer are never
+    mistaken for ids of the current one.
+
+    Bulk payloads that already live elsewhere (e.g. rows in the result
+    store) are published as deferred frames: only the callable that renders
+    them is kept, so they count as ``_FRAME_OVERHEAD`` against the byte cap
+    and cannot push the rest of the turn out of the buffer.
+    """
+
+    def __init__(self, config: ReplayConfig, on_resize: Callable[[int], None]):
+        self.generation = secrets.token_hex(4)
+        self.running = False
+        self.last_access = time.monotonic()
+        self.size = 0
+        self.closed = False
+        self._config = config
+        self._on_resize = on_resize
+        self._frames: deque[tuple[int, Union[bytes, DeferredFrame]]] = deque()
+        self._next_seq = 1
+        self._changed = asyncio.Event()
+
+    def start_turn(self) -> int:
+        """Marks a turn as running and returns the cursor just before its first frame."""
+        self.running = True
+        self.last_access = time.monotonic()
+        return self._next_seq - 1
+
+    def finish_turn(self) -> None:
+        self.running = False
+        self.last_access = time.monotonic()
+        self._notify()
+
+    def publish(self, payload: bytes) -> None:
+        """Appends an encoded ``data:`` frame, prefixed with its ``id:`` line."""
+        seq = self._next_seq
+        frame = self._with_id(seq, payload)
+        self._append(frame, len(frame) + _FRAME_OVERHEAD)
+
+    def publish_deferred(self, render: DeferredFrame) -> None:
+        """Appends a frame whose ``data:`` payload is rendered when it is sent."""
+        self._append(render, _FRAME_OVERHEAD)
+
+    def _append(self, frame: Union[bytes, DeferredFrame], size: int) -> None:
+        seq = self._next_seq
+        self._next_seq += 1
+        self._frames.append((seq, frame))
+
+        delta = size
+        while self._frames and (
+            len(self._frames) > self._config.max_frames_per_session
+            or self.size + delta > self._config.max_bytes_per_session
+        ):
+            _, dropped = self._frames.popleft()
+            delta -= _frame_size(dropped)
+        self.size += delta
+        self._on_resize(delta)
+        self._notify()
+
+    def _with_id(self, seq: int, payload: bytes) -> bytes:
+        return b"id: %s-%d\n%s" % (self.generation.encode(), seq, payload)
+
+    def clear(self) -> None:
+        """Drops all frames; subscribers still reading end their stream."""
+        self.closed = True
+        self._frames.clear()
+        self._on_resize(-self.size)
+        self.size = 0
+        self._notify()
+
+    def cursor_for(self, last_event_id: Optional[str]) -> int:
+        """Translates a ``Last-Event-ID`` into a cursor in this buffer."""
+        if last_event_id:
+            generation, _, seq = last_event_id.rpartition("-")
+            if generation == self.generation and seq.isdigit():
+                return int(seq)
+        # 別世代のIDやIDなしの場合はバッファ先頭から再送する
+        return self._frames[0][0] - 1 if self._frames else self._next_seq - 1
+
+    async def subscribe(self, cursor: int) -> AsyncIterator[bytes]:
+        """Yields buffered frames after ``cursor``, then follows the running turn.
+
+        Frames are looked up by sequence number on every step, since the
+        deque may shift while a frame is being sent. Whenever frames after
+        ``cursor`` were evicted before they could be sent, a replay gap
+        frame is sent first. The stream ends when the buffer is cleared.
+        """
+        while not self.closed:
+            self.last_access = time.monotonic()
+            changed = self._changed
+            if self._frames:
+                first_seq = self._frames[0][0]
+                if first_seq - 1 > cursor:
+                    # 送る前に上限で破棄されたフレームがあることを知らせる
+                    cursor = first_seq - 1
+                    yield REPLAY_GAP_FRAME
+                    continue
+                # seqは連続しているので、次のフレームの位置は先頭のseqから求まる
+                index = cursor + 1 - first_seq
+                if index < len(self._frames):
+                    cursor, frame = self._frames[index]
+                    if callable(frame):
+                        payload = frame()
+                        # 元のデータが先に破棄されていれば、欠けたことだけを知らせる
+                        frame = REPLAY_GAP_FRAME if payload is None else self._with_id(cursor, payload)
+                    yield frame
+                    continue
+            if not self.running:
+                return
+            await changed.wait()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+def _frame_size(frame: Union[bytes, DeferredFrame]) -> int:
+    return _FRAME_OVERHEAD if callable(frame) else len(frame) + _FRAME_OVERHEAD
+
+
+class ReplayRegistry:
+    """
+    Holds one ReplayBuffer per session with memory caps.
+
+    Idle buffers (no running turn) are evicted in LRU order once they exceed
+    ``idle_ttl``, when there are more than ``max_sessions`` buffers, or when
+    all buffers together exceed ``max_total_bytes``.
+    """
+
+    def __init__(self, config: ReplayConfig):
+        self.config = config
+        self.total_bytes = 0
+        self.evicted = 0
+        self._buffers: OrderedDict[tuple[str, str], ReplayBuffer] = OrderedDict()
+
+    def get(self, user_id: str, session_id: str) -> Optional[ReplayBuffer]:
+        buffer = self._buffers.get((user_id, session_id))
+        if buffer is not None:
+            self._buffers.move_to_end((user_id, session_id))
+            buffer.last_access = time.monotonic()
+        return buffer
+
+    def get_or_create(self, user_id: str, session_id: str) -> ReplayBuffer:
+        buffer = self.get(user_id, session_id)
+        if buffer is None:
+            buffer = ReplayBuffer(self.config, self._resize)
+            self._buffers[(user_id, session_id)] = buffer
+        self._evict()
+        return buffer
+
+    def _resize(self, delta: int) -> None:
+        self.total_bytes += delta
+        if delta > 0 and self.total_bytes > self.config.max_total_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        sessions = len(self._buffers)
+        total_bytes = self.total_bytes
+        victims = []
+        for key, buffer in self._buffers.items():
+            over_limit = (
+                sessions > self.config.max_sessions
+                or total_bytes > self.config.max_total_bytes
+            )
+            expired = now - buffer.last_access > self.config.idle_ttl
+            if not over_limit and not expired:
+                # LRU順なので、以降は上限内かつ期限内
+                break
+            if buffer.running:
+                continue
+            victims.append(key)
+            sessions -= 1
+            total_bytes -= buffer.size
+
+        for key in victims:
+            self._buffers.pop(key).clear()
+            self.evicted += 1
+            logger.debug("Evicted replay buffer for %s", key)
+
+    def snapshot(self) -> dict:
+        """Returns the current counters as a plain dict."""
+        return {
+            "sessions": len(self._buffers),
+            "total_bytes": self.total_bytes,
+            "evicted": self.evicted,
+        }
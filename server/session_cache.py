@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig
+
+from .config import SessionCacheConfig
+
+logger = logging.getLogger(__name__)
+
+# 存在確認だけなのでイベント履歴は最新1件に絞って読み込む
+_EXISTENCE_CHECK_CONFIG = GetSessionConfig(num_recent_events=1)
+
+
+@dataclass
+class SessionCacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    created: int = 0
+
+
+class SessionCache:
+    """
+    Bounded LRU+TTL cache of session ids known to exist in the session service.
+
+    ``ensure`` answers from memory for known sessions. On a miss it runs one
+    cheap existence check (the session row plus at most one event) and creates
+    the session only if it is missing. Concurrent misses for the same key share
+    a single in-flight lookup so first messages on a new session never race
+    each other to create it.
+    """
+
+    def __init__(
+        self,
+        session_service: BaseSessionService,
+        app_name: str,
+        config: SessionCacheConfig,
+    ):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.config = config
+        self.stats = SessionCacheStats()
+        self._known: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._inflight: dict[tuple[str, str], asyncio.Task] = {}
+
+    async def ensure(self, user_id: str, session_id: str) -> str:
+        """Makes sure the session exists, creating it on first use.
+
+        Args:
+            user_id: The user owning the session.
+            session_id: The client-supplied session id.
+
+        Returns:
+            str: The session id.
+        """
+        key = (user_id, session_id)
+        expires_at = self._known.get(key)
+        if expires_at is not None:
+            if expires_at > time.monotonic():
+                self._known.move_to_end(key)
+                self.stats.hits += 1
+                return session_id
+            del self._known[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+            task = asyncio.ensure_future(self._resolve(user_id, session_id))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # 待機側がキャンセルされても共有中の解決処理は止めない
+        return await asyncio.shield(task)
+
+    def invalidate(self, user_id: str, session_id: str) -> None:
+        """Forgets a session, e.g. after it was deleted or reported missing."""
+        self._known.pop((user_id, session_id), None)
+
+    async def _resolve(self, user_id: str, session_id: str) -> str:
+        session = await self.session_service.get_session(
+            app_name=self.app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=_EXISTENCE_CHECK_CONFIG,
+        )
+        if session is None:
+            try:
+                await self.session_service.create_session(
+                    app_name=self.app_name,
+                    user_id=user_id,
+                    session_id=session_id,
+                )
+                self.stats.created += 1
+            except AlreadyExistsError:
+                # 別プロセスが先に作成した場合はそのまま利用する
+                logger.debug("Session %s was created concurrently", session_id)
+
+        self._remember((user_id, session_id))
+        return session_id
+
+    def _remember(self, key: tuple[str, str]) -> None:
+        self._known[key] = time.monotonic() + self.config.ttl
+        self._known.move_to_end(key)
+        while len(self._known) > self.config.max_entries:
+            self._known.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        """Returns the current counters as a plain dict."""
+        return {
+            "size": len(self._known),
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "coalesced": self.stats.coalesced,
+            "created": self.stats.created,
+        }
@@ -0,0 +1,60 @@
+from typing import Optional
+
+from google.adk.sessions import BaseSessionService
+from google.adk.sessions.database_session_service import DatabaseSessionService
+
+from ..config import HistoryConfig, SessionStoreConfig
+from .async_database_session_service import AsyncDatabaseSessionService
+from .write_behind_session_service import WriteBehindSessionService
+
+__all__ = [
+    "AsyncDatabaseSessionService",
+    "WriteBehindSessionService",
+    "create_session_service",
+]
+
+
+def create_session_service(
+    config: SessionStoreConfig, history: Optional[HistoryConfig] = None
+) -> BaseSessionService:
+    """Builds the session service selected by ``SESSION_BACKEND``.
+
+    Args:
+        config: Session store configuration.
+        history: Optional windowed history policy.
+
+    Returns:
+        BaseSessionService: The configured session service.
+
+    Raises:
+        ValueError: If the backend name is unknown, or write-behind or
+            windowed history is requested for a backend that does not
+            support it.
+    """
+    if config.write_behind and config.backend != "async_database":
+        raise ValueError("SESSION_WRITE_BEHIND requires SESSION_BACKEND=async_database")
+    if history and history.enabled and config.backend != "async_database":
+        raise ValueError("Windowed history requires SESSION_BACKEND=async_database")
+
+    if config.backend == "database":
+        return DatabaseSessionService(db_url=config.database_url)
+
+    if config.backend == "async_database":
+        pool_options = dict(
+            pool_size=config.pool_size,
+            max_overflow=config.max_overflow,
+            pool_recycle=config.pool_recycle,
+            pool_timeout=config.pool_timeout,
+            statement_cache_size=config.statement_cache_size,
+            history=history,
+        )
+        if config.write_behind:
+            return WriteBehindSessionService(
+                config.database_url,
+                flush_interval=config.write_behind_flush_ms / 1000,
+                max_batch_events=config.write_behind_max_batch,
+                **pool_options,
+            )
+        return AsyncDatabaseSessionService(config.database_url, **pool_options)
+
+    raise ValueError(f"Unknown SESSION_BACKEND: {config.backend}")
@@ -0,0 +1,444 @@
+import asyncio
+import copy
+import logging
+from datetime import datetime
+from typing import Any, Optional
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.sessions import Session, State
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from google.adk.sessions.database_session_service import (
+    Base,
+    StorageAppState,
+    StorageEvent,
+    StorageSession,
+    StorageUserState,
+)
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from typing_extensions import override
+
+from ..config import HistoryConfig
+from .history import (
+    SnapshotBase,
+    StorageSnapshot,
+    build_summary_event,
+    summarize_events,
+    trim_window,
+)
+
+logger = logging.getLogger(__name__)
+
+# 同期ドライバのURLを非同期ドライバのURLに読み替える
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(db_url: str) -> str:
+    """Rewrites a synchronous SQLAlchemy URL to use the matching async driver."""
+    url = make_url(db_url)
+    drivername = _ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def _split_state_delta(state: Optional[dict[str, Any]]) -> tuple[dict, dict, dict]:
+    app_state, user_state, session_state = {}, {}, {}
+    for key, value in (state or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            app_state[key.removeprefix(State.APP_PREFIX)] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_state[key.removeprefix(State.USER_PREFIX)] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_state[key] = value
+    return app_state, user_state, session_state
+
+
+def _merge_state(app_state: dict, user_state: dict, session_state: dict) -> dict:
+    merged_state = copy.deepcopy(session_state)
+    for key, value in app_state.items():
+        merged_state[State.APP_PREFIX + key] = value
+    for key, value in user_state.items():
+        merged_state[State.USER_PREFIX + key] = value
+    return merged_state
+
+
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+class AsyncDatabaseSessionService(BaseSessionService):
+    """
+    Session service backed by an async SQLAlchemy engine and connection pool.
+
+    It reads and writes the same tables as ADK's DatabaseSessionService, so the
+    two backends can be swapped on an existing database. Unlike the ADK
+    service, no database call blocks the event loop: Postgres goes through
+    asyncpg and SQLite through aiosqlite.
+
+    With a ``history`` policy, sessions loaded by the Runner only carry the
+    most recent events (by count and/or token budget) plus a synthetic summary
+    event built from the ``session_snapshots`` table, so per-turn load time
+    and prompt size stay flat as a session grows. Events that fell out of the
+    window but are not yet folded into the snapshot (at most
+    ``snapshot_every`` of them) are left out of the context.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        *,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        pool_recycle: int = 1800,
+        pool_timeout: float = 30,
+        statement_cache_size: int = 100,
+        history: Optional[HistoryConfig] = None,
+        **kwargs: Any,
+    ):
+        """Initializes the async engine.
+
+        Args:
+            db_url: Database URL. Synchronous driver names are rewritten to
+                their async counterparts (asyncpg / aiosqlite).
+            pool_size: Number of connections kept open in the pool.
+            max_overflow: Extra connections allowed above ``pool_size``.
+            pool_recycle: Seconds after which a pooled connection is replaced.
+            pool_timeout: Seconds to wait for a free connection.
+            statement_cache_size: Prepared statement cache size per connection
+                (asyncpg only).
+            history: Optional windowed history policy.
+            **kwargs: Passed through to ``create_async_engine``.
+        """
+        url = make_url(to_async_url(db_url))
+        engine_kwargs: dict[str, Any] = {"pool_pre_ping": True, **kwargs}
+        if url.get_backend_name() != "sqlite":
+            engine_kwargs.update(
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_recycle=pool_recycle,
+                pool_timeout=pool_timeout,
+            )
+        if url.get_driver_name() == "asyncpg":
+            url = url.update_query_dict(
+                {"prepared_statement_cache_size": str(statement_cache_size)}
+            )
+
+        self.db_engine = create_async_engine(url, **engine_kwargs)
+        if url.get_backend_name() == "sqlite":
+            event.listen(self.db_engine.sync_engine, "connect", _set_sqlite_pragma)
+
+        self.database_session_factory = async_sessionmaker(
+            self.db_engine, class_=AsyncSession, expire_on_commit=False
+        )
+        self.history = history if history and history.enabled else None
+        self._tables_ready = False
+        self._tables_lock = asyncio.Lock()
+
+    async def _session(self) -> AsyncSession:
+        if not self._tables_ready:
+            async with self._tables_lock:
+                if not self._tables_ready:
+                    async with self.db_engine.begin() as connection:
+                        await connection.run_sync(Base.metadata.create_all)
+                        if self.history:
+                            await connection.run_sync(SnapshotBase.metadata.create_all)
+                    self._tables_ready = True
+        return self.database_session_factory()
+
+    async def close(self) -> None:
+        """Closes all pooled connections."""
+        await self.db_engine.dispose()
+
+    @override
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        async with await self._session() as sql_session:
+            if session_id and await sql_session.get(
+                StorageSession, (app_name, user_id, session_id)
+            ):
+                raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+
+            storage_app_state = await sql_session.get(StorageAppState, (app_name))
+            if not storage_app_state:
+                storage_app_state = StorageAppState(app_name=app_name, state={})
+                sql_session.add(storage_app_state)
+            storage_user_state = await sql_session.get(StorageUserState, (app_name, user_id))
+            if not storage_user_state:
+                storage_user_state = StorageUserState(app_name=app_name, user_id=user_id, state={})
+                sql_session.add(storage_user_state)
+
+            app_state_delta, user_state_delta, session_state = _split_state_delta(state)
+            if app_state_delta:
+                storage_app_state.state = storage_app_state.state | app_state_delta
+            if user_state_delta:
+                storage_user_state.state = storage_user_state.state | user_state_delta
+
+            storage_session = StorageSession(
+                app_name=app_name,
+                user_id=user_id,
+                id=session_id,
+                state=session_state,
+            )
+            sql_session.add(storage_session)
+            await sql_session.commit()
+            await sql_session.refresh(storage_session)
+
+            merged_state = _merge_state(
+                storage_app_state.state, storage_user_state.state, session_state
+            )
+            return storage_session.to_session(state=merged_state)
+
+    @override
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        if config is None and self.history:
+            return await self._get_windowed_session(app_name, user_id, session_id)
+
+        async with await self._session() as sql_session:
+            storage_session = await sql_session.get(
+                StorageSession, (app_name, user_id, session_id)
+            )
+            if storage_session is None:
+                return None
+
+            stmt = select(StorageEvent).where(
+                StorageEvent.app_name == app_name,
+                StorageEvent.user_id == user_id,
+                StorageEvent.session_id == session_id,
+            )
+            if config and config.after_timestamp:
+                stmt = stmt.where(
+                    StorageEvent.timestamp >= datetime.fromtimestamp(config.after_timestamp)
+                )
+            stmt = stmt.order_by(StorageEvent.timestamp.desc())
+            if config and config.num_recent_events:
+                stmt = stmt.limit(config.num_recent_events)
+            storage_events = (await sql_session.scalars(stmt)).all()
+
+            storage_app_state = await sql_session.get(StorageAppState, (app_name))
+            storage_user_state = await sql_session.get(StorageUserState, (app_name, user_id))
+
+            merged_state = _merge_state(
+                storage_app_state.state if storage_app_state else {},
+                storage_user_state.state if storage_user_state else {},
+                storage_session.state,
+            )
+            events = [e.to_event() for e in reversed(storage_events)]
+            return storage_session.to_session(state=merged_state, events=events)
+
+    async def _get_windowed_session(
+        self, app_name: str, user_id: str, session_id: str
+    ) -> Optional[Session]:
+        async with await self._session() as sql_session:
+            storage_session = await sql_session.get(
+                StorageSession, (app_name, user_id, session_id)
+            )
+            if storage_session is None:
+                return None
+
+            snapshot = await sql_session.get(StorageSnapshot, (app_name, user_id, session_id))
+            stmt = self._events_query(app_name, user_id, session_id, snapshot)
+            stmt = stmt.order_by(StorageEvent.timestamp.desc())
+            if self.history.max_events:
+                stmt = stmt.limit(self.history.max_events)
+            storage_events = (await sql_session.scalars(stmt)).all()
+
+            storage_app_state = await sql_session.get(StorageAppState, (app_name))
+            storage_user_state = await sql_session.get(StorageUserState, (app_name, user_id))
+
+            merged_state = _merge_state(
+                storage_app_state.state if storage_app_state else {},
+                storage_user_state.state if storage_user_state else {},
+                storage_session.state,
+            )
+            events = trim_window([e.to_event() for e in reversed(storage_events)], self.history)
+            summary_event = build_summary_event(snapshot)
+            if summary_event:
+                events.insert(0, summary_event)
+            return storage_session.to_session(state=merged_state, events=events)
+
+    async def maybe_snapshot(self, *, app_name: str, user_id: str, session_id: str) -> bool:
+        """Folds events that fell out of the history window into the session snapshot.
+
+        Runs only once more than ``snapshot_every`` events have accumulated
+        beyond the window, and only deserializes those events.
+
+        Args:
+            app_name: The name of the app.
+            user_id: The ID of the user.
+            session_id: The ID of the session.
+
+        Returns:
+            bool: Whether a new snapshot was written.
+        """
+        if not self.history:
+            return False
+
+        retain = self.history.max_events or self.history.snapshot_every
+        async with await self._session() as sql_session:
+            snapshot = await sql_session.get(StorageSnapshot, (app_name, user_id, session_id))
+            uncovered = await sql_session.scalar(
+                self._events_query(app_name, user_id, session_id, snapshot)
+                .with_only_columns(func.count())
+                .order_by(None)
+            )
+            if uncovered <= retain + self.history.snapshot_every:
+                return False
+
+            stmt = (
+                self._events_query(app_name, user_id, session_id, snapshot)
+                .order_by(StorageEvent.timestamp.asc())
+                .limit(uncovered - retain)
+            )
+            storage_events = (await sql_session.scalars(stmt)).all()
+            if snapshot is None:
+                snapshot = StorageSnapshot(
+                    app_name=app_name, user_id=user_id, session_id=session_id, summary=""
+                )
+                snapshot.event_count = 0
+                sql_session.add(snapshot)
+
+            snapshot.summary = summarize_events(
+                snapshot.summary,
+                [e.to_event() for e in storage_events],
+                self.history.summary_max_chars,
+            )
+            snapshot.covered_until = storage_events[-1].timestamp
+            snapshot.event_count += len(storage_events)
+            await sql_session.commit()
+
+        logger.info(
+            "Snapshotted %d events of session %s (%d in total)",
+            len(storage_events),
+            session_id,
+            snapshot.event_count,
+        )
+        return True
+
+    @staticmethod
+    def _events_query(
+        app_name: str, user_id: str, session_id: str, snapshot: Optional[StorageSnapshot]
+    ):
+        stmt = select(StorageEvent).where(
+            StorageEvent.app_name == app_name,
+            StorageEvent.user_id == user_id,
+            StorageEvent.session_id == session_id,
+        )
+        if snapshot is not None:
+            stmt = stmt.where(StorageEvent.timestamp > snapshot.covered_until)
+        return stmt
+
+    @override
+    async def list_sessions(
+        self, *, app_name: str, user_id: Optional[str] = None
+    ) -> ListSessionsResponse:
+        async with await self._session() as sql_session:
+            stmt = select(StorageSession).where(StorageSession.app_name == app_name)
+            user_stmt = select(StorageUserState).where(StorageUserState.app_name == app_name)
+            if user_id is not None:
+                stmt = stmt.where(StorageSession.user_id == user_id)
+                user_stmt = user_stmt.where(StorageUserState.user_id == user_id)
+            results = (await sql_session.scalars(stmt)).all()
+
+            storage_app_state = await sql_session.get(StorageAppState, (app_name))
+            app_state = storage_app_state.state if storage_app_state else {}
+            user_states_map = {
+                storage_user_state.user_id: storage_user_state.state
+                for storage_user_state in (await sql_session.scalars(user_stmt)).all()
+            }
+
+            sessions = []
+            for storage_session in results:
+                merged_state = _merge_state(
+                    app_state,
+                    user_states_map.get(storage_session.user_id, {}),
+                    storage_session.state,
+                )
+                sessions.append(storage_session.to_session(state=merged_state))
+            return ListSessionsResponse(sessions=sessions)
+
+    @override
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        async with await self._session() as sql_session:
+            await sql_session.execute(
+                delete(StorageSession).where(
+                    StorageSession.app_name == app_name,
+                    StorageSession.user_id == user_id,
+                    StorageSession.id == session_id,
+                )
+            )
+            if self.history:
+                await sql_session.execute(
+                    delete(StorageSnapshot).where(
+                        StorageSnapshot.app_name == app_name,
+                        StorageSnapshot.user_id == user_id,
+                        StorageSnapshot.session_id == session_id,
+                    )
+                )
+            await sql_session.commit()
+
+    @override
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        event = self._trim_temp_delta_state(event)
+
+        async with await self._session() as sql_session:
+            storage_session = await sql_session.get(
+                StorageSession, (session.app_name, session.user_id, session.id)
+            )
+            if storage_session.update_timestamp_tz > session.last_update_time:
+                raise ValueError(
+                    "The last_update_time provided in the session object is earlier"
+                    " than the update_time in the storage_session. Please check if it"
+                    " is a stale session."
+                )
+
+            if event.actions and event.actions.state_delta:
+                app_state_delta, user_state_delta, session_state_delta = _split_state_delta(
+                    event.actions.state_delta
+                )
+                if app_state_delta:
+                    storage_app_state = await sql_session.get(StorageAppState, (session.app_name))
+                    storage_app_state.state = storage_app_state.state | app_state_delta
+                if user_state_delta:
+                    storage_user_state = await sql_session.get(
+                        StorageUserState, (session.app_name, session.user_id)
+                    )
+                    storage_user_state.state = storage_user_state.state | user_state_delta
+                if session_state_delta:
+                    storage_session.state = storage_session.state | session_state_delta
+
+            sql_session.add(StorageEvent.from_event(session, event))
+            await sql_session.commit()
+            await sql_session.refresh(storage_session)
+
+            session.last_update_time = storage_session.update_timestamp_tz
+
+        await super().append_event(session=session, event=event)
+        return event
@@ -0,0 +1,139 @@
+import json
+from datetime import datetime
+from typing import Optional
+
+from google.adk.events import Event
+from google.genai.types import Content, Part
+from sqlalchemy import Integer, String, Text, func
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy.types import DateTime
+
+from ..config import HistoryConfig
+
+SNAPSHOT_INVOCATION_ID = "history_snapshot"
+_SUMMARY_HEADER = "[Summary of the earlier conversation]\n"
+
+# 1トークンあたりの文字数の概算
+_CHARS_PER_TOKEN = 4
+
+
+class SnapshotBase(DeclarativeBase):
+    """Base class for the snapshot table, kept apart from ADK's own metadata."""
+
+
+class StorageSnapshot(SnapshotBase):
+    """Summary of the events of a session up to ``covered_until``."""
+
+    __tablename__ = "session_snapshots"
+
+    app_name: Mapped[str] = mapped_column(String(128), primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    session_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    summary: Mapped[str] = mapped_column(Text, default="")
+    covered_until: Mapped[datetime] = mapped_column(DateTime)
+    event_count: Mapped[int] = mapped_column(Integer, default=0)
+    update_time: Mapped[datetime] = mapped_column(
+        DateTime, default=func.now(), onupdate=func.now()
+    )
+
+
+def estimate_tokens(event: Event) -> int:
+    """Roughly estimates how many prompt tokens an event contributes."""
+    if not event.content or not event.content.parts:
+        return 0
+    chars = 0
+    for part in event.content.parts:
+        if part.text:
+            chars += len(part.text)
+        if part.function_call:
+            chars += len(json.dumps(part.function_call.args or {}, ensure_ascii=False, default=str))
+        if part.function_response:
+            chars += len(
+                json.dumps(part.function_response.response or {}, ensure_ascii=False, default=str)
+            )
+    return chars // _CHARS_PER_TOKEN + 1
+
+
+def _is_user_message(event: Event) -> bool:
+    return (
+        event.author == "user"
+        and event.content is not None
+        and any(part.text for part in event.content.parts or [])
+    )
+
+
+def trim_window(events: list[Event], config: HistoryConfig) -> list[Event]:
+    """Keeps the most recent events that fit the configured token budget.
+
+    The window always starts at a user message, so it never opens with a
+    function response whose function call was cut off.
+
+    Args:
+        events: Recent events in chronological order.
+        config: History policy.
+
+    Returns:
+        list[Event]: The trimmed window in chronological order.
+    """
+    start = 0
+    if config.max_tokens:
+        budget = config.max_tokens
+        start = len(events)
+        for index in range(len(events) - 1, -1, -1):
+            budget -= estimate_tokens(events[index])
+            if budget < 0:
+                break
+            start = index
+
+    while start < len(events) and not _is_user_message(events[start]):
+        start += 1
+    if start == len(events) and events:
+        # 予算内にユーザー発話が1件も収まらない場合は最後の発話から始める
+        for index in range(len(events) - 1, -1, -1):
+            if _is_user_message(events[index]):
+                return events[index:]
+        return events
+    return events[start:]
+
+
+def summarize_events(previous_summary: str, events: list[Event], max_chars: int) -> str:
+    """Folds events into a running plain-text summary without calling a model.
+
+    Args:
+        previous_summary: Summary of everything before ``events``.
+        events: Events to append to the summary, in chronological order.
+        max_chars: Upper bound of the summary length; the oldest lines are
+            dropped first.
+
+    Returns:
+        str: The new summary.
+    """
+    lines = previous_summary.splitlines() if previous_summary else []
+    for event in events:
+        if not event.content or not event.content.parts:
+            continue
+        for part in event.content.parts:
+            if part.text and not event.partial:
+                speaker = "User" if event.author == "user" else event.author
+                lines.append(f"{speaker}: {part.text.strip()[:300]}")
+            elif part.function_call:
+                lines.append(f"{event.author} called {part.function_call.name}")
+
+    summary = "\n".join(lines)
+    if len(summary) > max_chars:
+        summary = summary[-max_chars:]
+        summary = summary[summary.find("\n") + 1 :]
+    return summary
+
+
+def build_summary_event(snapshot: Optional[StorageSnapshot]) -> Optional[Event]:
+    """Builds the synthetic event that stands in for the summarized history."""
+    if snapshot is None or not snapshot.summary:
+        return None
+    return Event(
+        id=f"{SNAPSHOT_INVOCATION_ID}-{snapshot.event_count}",
+        invocation_id=SNAPSHOT_INVOCATION_ID,
+        author="user",
+        timestamp=snapshot.covered_until.timestamp(),
+        content=Content(role="user", parts=[Part(text=_SUMMARY_HEADER + snapshot.summary)]),
+    )
@@ -0,0 +1,266 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig
+from google.adk.sessions.database_session_service import (
+    StorageAppState,
+    StorageEvent,
+    StorageSession,
+    StorageUserState,
+)
+from typing_extensions import override
+
+from .async_database_session_service import AsyncDatabaseSessionService, _split_state_delta
+
+logger = logging.getLogger(__name__)
+
+SessionKey = tuple[str, str, str]
+
+
+@dataclass
+class WriteBehindStats:
+    commits: int = 0
+    events_written: int = 0
+    largest_batch: int = 0
+    failed_commits: int = 0
+    events_dropped: int = 0
+
+
+class WriteBehindSessionService(AsyncDatabaseSessionService):
+    """
+    AsyncDatabaseSessionService that group-commits event appends.
+
+    ``append_event`` updates the in-memory session immediately and queues the
+    event. Queued events of all sessions are written in one transaction once
+    ``flush_interval`` has passed since the first queued event, or as soon as
+    ``max_batch_events`` are queued. ``flush_interval`` is therefore the
+    durability window: events acknowledged within it can be lost if the
+    process dies. Callers should ``flush_session`` at the end of a turn;
+    reads of a session with queued or in-flight events wait for that
+    session's commits first, so they always see prior writes.
+
+    When a group commit fails, its sessions are retried one transaction per
+    session, so only the events of the failing session are lost. Events of
+    a session deleted in the meantime are dropped.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        *,
+        flush_interval: float = 0.05,
+        max_batch_events: int = 500,
+        **kwargs: Any,
+    ):
+        super().__init__(db_url, **kwargs)
+        self.flush_interval = flush_interval
+        self.max_batch_events = max_batch_events
+        self.stats = WriteBehindStats()
+        self._pending: list[tuple[Session, Event]] = []
+        self._pending_keys: set[SessionKey] = set()
+        # コミット中のバッチと、そのバッチに含まれるセッション
+        self._inflight: dict[asyncio.Future, set[SessionKey]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._commit_lock = asyncio.Lock()
+
+    @override
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        event = self._trim_temp_delta_state(event)
+        # DBへの書き込みを待たずにメモリ上のセッションへ反映する
+        await BaseSessionService.append_event(self, session=session, event=event)
+
+        self._pending.append((session, event))
+        self._pending_keys.add((session.app_name, session.user_id, session.id))
+        if len(self._pending) >= self.max_batch_events:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._start_flush
+            )
+        return event
+
+    async def flush(self) -> None:
+        """Writes all queued events and waits until every pending commit finished.
+
+        Raises:
+            Exception: The error of the first session whose events could not
+                be written.
+        """
+        if self._pending:
+            self._start_flush()
+        if not self._inflight:
+            return
+        failures: dict[SessionKey, Exception] = {}
+        for result in await asyncio.gather(*self._inflight):
+            failures.update(result)
+        if failures:
+            raise next(iter(failures.values()))
+
+    async def flush_session(self, app_name: str, user_id: str, session_id: str) -> None:
+        """Writes the queued events of one session and waits only for its commits.
+
+        Raises:
+            Exception: The error of a failed commit of this session's events.
+        """
+        error = await self._wait_for((app_name, user_id, session_id))
+        if error is not None:
+            raise error
+
+    @override
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        await self.flush_session(app_name, user_id, session_id)
+        return await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+
+    @override
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        # 削除するセッションのイベントは、書き込みに失敗していても構わない
+        await self._wait_for((app_name, user_id, session_id))
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    @override
+    async def close(self) -> None:
+        await self.flush()
+        await super().close()
+
+    async def _wait_for(self, key: SessionKey) -> Optional[Exception]:
+        if key in self._pending_keys:
+            self._start_flush()
+        commits = [future for future, keys in self._inflight.items() if key in keys]
+        if not commits:
+            return None
+        for result in await asyncio.gather(*commits):
+            if key in result:
+                return result[key]
+        return None
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch = self._pending
+        keys = self._pending_keys
+        self._pending = []
+        self._pending_keys = set()
+        future = asyncio.ensure_future(self._commit(batch))
+        self._inflight[future] = keys
+        future.add_done_callback(self._on_commit_done)
+
+    def _on_commit_done(self, future: asyncio.Future) -> None:
+        self._inflight.pop(future, None)
+        # 失敗はログ出力済みなので、誰もflushを待っていなくても警告を出さない
+        if not future.cancelled():
+            future.exception()
+
+    async def _commit(self, batch: list[tuple[Session, Event]]) -> dict[SessionKey, Exception]:
+        """Writes a batch and returns the errors of the sessions that could not be written."""
+        failures: dict[SessionKey, Exception] = {}
+        # コミット順序をイベント順に保つため、グループコミットは1つずつ実行する
+        async with self._commit_lock:
+            try:
+                self._record_commit(await self._write_batch(batch))
+            except Exception:
+                logger.warning(
+                    "Group commit of %d events failed, retrying per session", len(batch), exc_info=True
+                )
+                # 失敗したセッションのイベントだけを失うように、セッションごとに書き直す
+                by_session: dict[SessionKey, list[tuple[Session, Event]]] = {}
+                for session, event in batch:
+                    by_session.setdefault((session.app_name, session.user_id, session.id), []).append(
+                        (session, event)
+                    )
+                for key, events in by_session.items():
+                    try:
+                        self._record_commit(await self._write_batch(events))
+                    except Exception as error:
+                        self.stats.failed_commits += 1
+                        logger.exception("Commit of %d events of session %s failed", len(events), key)
+                        failures[key] = error
+        return failures
+
+    def _record_commit(self, events: int) -> None:
+        self.stats.commits += 1
+        self.stats.events_written += events
+        self.stats.largest_batch = max(self.stats.largest_batch, events)
+
+    async def _write_batch(self, batch: list[tuple[Session, Event]]) -> int:
+        """Writes a batch in one transaction and returns the number of events written."""
+        written = dropped = 0
+        async with await self._session() as sql_session:
+            storage_sessions: dict[SessionKey, Optional[StorageSession]] = {}
+            sessions_with_state: set[SessionKey] = set()
+
+            for session, event in batch:
+                key = (session.app_name, session.user_id, session.id)
+                if key not in storage_sessions:
+                    storage_sessions[key] = await sql_session.get(StorageSession, key)
+                    if storage_sessions[key] is None:
+                        logger.warning("Session %s was deleted, dropping its queued events", key)
+                storage_session = storage_sessions[key]
+                if storage_session is None:
+                    dropped += 1
+                    continue
+
+                if event.actions and event.actions.state_delta:
+                    app_state_delta, user_state_delta, session_state_delta = _split_state_delta(
+                        event.actions.state_delta
+                    )
+                    if app_state_delta:
+                        storage_app_state = await sql_session.get(StorageAppState, (session.app_name))
+                        storage_app_state.state = storage_app_state.state | app_state_delta
+                    if user_state_delta:
+                        storage_user_state = await sql_session.get(
+                            StorageUserState, (session.app_name, session.user_id)
+                        )
+                        storage_user_state.state = storage_user_state.state | user_state_delta
+                    if session_state_delta:
+                        storage_session.state = storage_session.state | session_state_delta
+                        sessions_with_state.add(key)
+
+                sql_session.add(StorageEvent.from_event(session, event))
+                written += 1
+
+            await sql_session.commit()
+            self.stats.events_dropped += dropped
+
+            # update_timeが変わるのはセッション行を更新した場合のみ
+            update_times = {}
+            for key in sessions_with_state:
+                await sql_session.refresh(storage_sessions[key])
+                update_times[key] = storage_sessions[key].update_timestamp_tz
+
+        for session, _ in batch:
+            update_time = update_times.get((session.app_name, session.user_id, session.id))
+            if update_time is not None:
+                session.last_update_time = update_time
+        return written
+
+    def snapshot(self) -> dict:
+        """Returns the current counters as a plain dict."""
+        return {
+            "pending": len(self._pending),
+            "inflight_commits": len(self._inflight),
+            "commits": self.stats.commits,
+            "events_written": self.stats.events_written,
+            "largest_batch": self.stats.largest_batch,
+            "failed_commits": self.stats.failed_commits,
+            "events_dropped": self.stats.events_dropped,
+        }
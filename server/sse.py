@@ -0,0 +1,93 @@
+import json
+import time
+from typing import Any, Optional
+
+from .config import SseConfig
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+except ImportError:
+    _json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def _dumps(obj: Any) -> bytes:
+        return _json_encoder.encode(obj).encode()
+
+
+_DATA_PREFIX = b"data: "
+_FRAME_END = b"\n\n"
+_TEXT_FRAME_HEAD = b'data: {"mime_type":"text/plain","data":'
+_TEXT_FRAME_TAIL = b"}" + _FRAME_END
+
+
+def encode_text(text: str) -> bytes:
+    """Encodes a text/plain message as one SSE frame."""
+    return _TEXT_FRAME_HEAD + _dumps(text) + _TEXT_FRAME_TAIL
+
+
+def encode_message(message: dict) -> bytes:
+    """Encodes an arbitrary JSON message as one SSE frame."""
+    return _DATA_PREFIX + _dumps(message) + _FRAME_END
+
+
+# run_asyncの場合はturn_complete: Trueが返却されないので後付けするフレーム
+TURN_COMPLETE_FRAME = encode_message({"turn_complete": True, "interrupted": False})
+
+
+class TextCoalescer:
+    """
+    Merges consecutive partial text chunks into fewer, larger SSE frames.
+
+    Buffered text is flushed once it reaches ``coalesce_bytes`` or once the
+    oldest buffered chunk is older than ``coalesce_window_ms``. The window is
+    checked when the next chunk arrives, so callers must ``flush`` at event
+    boundaries and at the end of the turn. With both limits at 0 every chunk
+    is encoded immediately.
+    """
+
+    __slots__ = ("_window", "_max_bytes", "_parts", "_size", "_started_at", "chunks", "frames")
+
+    def __init__(self, config: SseConfig):
+        self._window = config.coalesce_window_ms / 1000
+        self._max_bytes = config.coalesce_bytes
+        self._parts: list[str] = []
+        self._size = 0
+        self._started_at = 0.0
+        self.chunks = 0
+        self.frames = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._window > 0 or self._max_bytes > 0
+
+    def add(self, text: str) -> Optional[bytes]:
+        """Buffers a chunk and returns a frame if a flush threshold was reached."""
+        self.chunks += 1
+        if not self.enabled:
+            self.frames += 1
+            return encode_text(text)
+
+        now = time.monotonic()
+        if not self._parts:
+            self._started_at = now
+        self._parts.append(text)
+        self._size += len(text.encode())
+
+        if (self._max_bytes and self._size >= self._max_bytes) or (
+            self._window and now - self._started_at >= self._window
+        ):
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[bytes]:
+        """Returns the buffered text as one frame, or None if nothing is buffered."""
+        if not self._parts:
+            return None
+        text = "".join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        self.frames += 1
+        return encode_text(text)
@@ -0,0 +1,97 @@
+import builtins
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# 内訳に出すimportのネストの深さ（0は各段階で直接importしたモジュール）
+_MAX_REPORTED_DEPTH = 1
+
+
+class StartupProfile:
+    """
+    Cold-start timeline of the server.
+
+    ``mark`` records when a point was reached, relative to when the profile
+    was created (the top of ``main.py``), and ``phase`` records how long a
+    step took. Both are always recorded since they cost a few clock reads.
+
+    In profile mode ``builtins.__import__`` is also wrapped until ``finish``
+    to time every module imported for the first time, like
+    ``python -X importtime`` but in-process, so the breakdown can be read
+    from ``/stats`` of a running server.
+    """
+
+    def __init__(self, enabled: bool = False, top: int = 15, started: Optional[float] = None):
+        self.enabled = enabled
+        self.top = top
+        self.started = started if started is not None else time.perf_counter()
+        self.marks: dict[str, float] = {}
+        self.phases: dict[str, float] = {}
+        self._imports: list[tuple[str, float, int]] = []
+        self._local = threading.local()
+        self._original_import = builtins.__import__
+        self._installed = enabled
+        if enabled:
+            builtins.__import__ = self._timed_import
+
+    def mark(self, name: str):
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.started
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def finish(self):
+        """Stops timing imports and logs the breakdown in profile mode."""
+        if not self._installed:
+            return
+        if builtins.__import__ == self._timed_import:
+            builtins.__import__ = self._original_import
+        self._installed = False
+        snapshot = self.snapshot()
+        logger.info("Startup marks (s): %s", snapshot["marks"])
+        logger.info("Startup phases (s): %s", snapshot["phases"])
+        for entry in snapshot["imports"]:
+            logger.info(
+                "Startup import %-50s %8.3fs", "  " * entry["depth"] + entry["module"], entry["seconds"]
+            )
+
+    def snapshot(self) -> dict:
+        snapshot = {
+            "marks": {name: round(value, 3) for name, value in self.marks.items()},
+            "phases": {name: round(value, 3) for name, value in self.phases.items()},
+        }
+        if self.enabled:
+            imports = sorted(
+                (entry for entry in self._imports if entry[2] <= _MAX_REPORTED_DEPTH),
+                key=lambda entry: entry[1],
+                reverse=True,
+            )
+            snapshot["imports"] = [
+                {"module": name, "seconds": round(seconds, 3), "depth": depth}
+                for name, seconds, depth in imports[: self.top]
+            ]
+        return snapshot
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # 読み込み済みのモジュールと相対importは計測しない（呼び出し元の時間に含まれる）
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._local.depth = depth
+            self._imports.append((name, time.perf_counter() - started, depth))
@@ -0,0 +1,188 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Optional
+
+# 終わらなかった（呼び出し側が途中でやめた）実行のトレースを保持しておく上限
+_MAX_OPEN_TRACES = 1024
+
+# Chrome trace形式ではプロセスIDでトラックをまとめる（1つの実行を1つのプロセスとして表示する）
+_PID = 1
+
+
+class Span:
+    """One timed operation: an invocation, an agent run, a model call or a tool call."""
+
+    __slots__ = ("span_id", "parent", "root", "name", "category", "track", "start_us", "end_us", "args")
+
+    def __init__(
+        self,
+        span_id: int,
+        parent: Optional["Span"],
+        name: str,
+        category: str,
+        track: int,
+        start_us: int,
+        args: Optional[dict[str, Any]],
+    ):
+        self.span_id = span_id
+        self.parent = parent
+        self.root = parent.root if parent is not None else self
+        self.name = name
+        self.category = category
+        self.track = track
+        self.start_us = start_us
+        self.end_us: Optional[int] = None
+        self.args = args
+
+    @property
+    def open(self) -> bool:
+        return self.end_us is None
+
+
+class _Trace:
+    __slots__ = ("events", "tracks", "dropped")
+
+    def __init__(self):
+        self.events: list[dict[str, Any]] = []
+        self.tracks: dict[int, str] = {}
+        self.dropped = 0
+
+
+class Tracer:
+    """
+    Collects spans and turns them into Chrome trace / Perfetto JSON.
+
+    Spans are grouped into traces by their root span (the outermost
+    invocation). Each asyncio task gets its own track, so spans of the same
+    task nest by time and concurrent branches (e.g. ``ParallelAgent``) show
+    up side by side. When a child starts on another track than its parent,
+    a flow arrow links the two.
+
+    Only finished spans are kept, as complete (``"X"``) events, and a
+    trace is handed out and forgotten by ``finish`` once its root ends.
+    Nothing here depends on google.adk; ``TracingPlugin`` feeds it.
+    """
+
+    def __init__(self, max_spans: int = 100000):
+        self.max_spans = max_spans
+        self._origin = time.perf_counter_ns()
+        self._ids = itertools.count(1)
+        self._track_ids = itertools.count(1)
+        self._tracks: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+        self._thread_tracks: dict[int, int] = {}
+        self._traces: dict[int, _Trace] = {}
+        self.traces_finished = 0
+        self.spans_recorded = 0
+        self.spans_dropped = 0
+
+    def now_us(self) -> int:
+        return (time.perf_counter_ns() - self._origin) // 1000
+
+    def start(
+        self,
+        name: str,
+        category: str,
+        parent: Optional[Span] = None,
+        args: Optional[dict[str, Any]] = None,
+    ) -> Span:
+        """Opens a span under ``parent`` (a new trace when there is none)."""
+        span = Span(next(self._ids), parent, name, category, self._track(), self.now_us(), args)
+        trace = self._traces.get(span.root.span_id)
+        if trace is None:
+            if len(self._traces) >= _MAX_OPEN_TRACES:
+                self._traces.pop(next(iter(self._traces)))
+            trace = self._traces[span.root.span_id] = _Trace()
+        trace.tracks.setdefault(span.track, name)
+        if parent is not None and parent.track != span.track and self._has_room(trace, 2):
+            # 別のタスクで動く子には、親のトラックから矢印を引く
+            flow = {"name": "spawn", "cat": "link", "id": span.span_id, "ts": span.start_us, "pid": _PID}
+            trace.events.append({**flow, "ph": "s", "tid": parent.track})
+            trace.events.append({**flow, "ph": "f", "bp": "e", "tid": span.track})
+        return span
+
+    def end(self, span: Span, args: Optional[dict[str, Any]] = None):
+        """Closes ``span`` and records it; closing it twice has no effect."""
+        if not span.open:
+            return
+        span.end_us = self.now_us()
+        trace = self._traces.get(span.root.span_id)
+        if trace is None or not self._has_room(trace, 1):
+            return
+        event_args = {"span_id": span.span_id}
+        if span.parent is not None:
+            event_args["parent_id"] = span.parent.span_id
+        if span.args:
+            event_args.update(span.args)
+        if args:
+            event_args.update(args)
+        trace.events.append(
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start_us,
+                "dur": span.end_us - span.start_us,
+                "pid": _PID,
+                "tid": span.track,
+                "args": event_args,
+            }
+        )
+        self.spans_recorded += 1
+
+    def finish(self, root: Span) -> dict[str, Any]:
+        """Returns the Chrome trace of ``root`` and forgets it."""
+        trace = self._traces.pop(root.span_id, None) or _Trace()
+        self.traces_finished += 1
+        metadata = [
+            {"name": "process_name", "ph": "M", "pid": _PID, "args": {"name": root.name}},
+            *(
+                {"name": "thread_name", "ph": "M", "pid": _PID, "tid": track, "args": {"name": name}}
+                for track, name in trace.tracks.items()
+            ),
+        ]
+        return {
+            "traceEvents": metadata + trace.events,
+            "displayTimeUnit": "ms",
+            "otherData": {"root": root.name, "dropped_spans": trace.dropped, **(root.args or {})},
+        }
+
+    def write(self, trace: dict[str, Any], path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(trace, ensure_ascii=False, default=str), encoding="utf-8")
+        return path
+
+    def snapshot(self) -> dict:
+        return {
+            "open_traces": len(self._traces),
+            "traces_finished": self.traces_finished,
+            "spans_recorded": self.spans_recorded,
+            "spans_dropped": self.spans_dropped,
+        }
+
+    def _has_room(self, trace: _Trace, events: int) -> bool:
+        if len(trace.events) + events <= self.max_spans:
+            return True
+        trace.dropped += 1
+        self.spans_dropped += 1
+        return False
+
+    def _track(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            thread = threading.get_ident()
+            track = self._thread_tracks.get(thread)
+            if track is None:
+                track = self._thread_tracks[thread] = next(self._track_ids)
+            return track
+        track = self._tracks.get(task)
+        if track is None:
+            track = self._tracks[task] = next(self._track_ids)
+        return track
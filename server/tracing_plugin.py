@@ -0,0 +1,217 @@
+import asyncio
+import functools
+import logging
+import re
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from .config import TracingConfig
+from .tracing import Span, Tracer
+
+logger = logging.getLogger(__name__)
+
+# 実行中のスパン（エージェントやツールの中で始まったスパンの親になる）。
+# asyncioのタスクはコンテキストを複製するので、ParallelAgentの各ブランチや並行なツール呼び出しは
+# それぞれ自分の親を持つ
+_current_span: ContextVar[Optional[Span]] = ContextVar("adk_trace_span", default=None)
+
+# 中断された実行のスパンが溜まり続けないようにする上限
+_MAX_TRACKED_SPANS = 1024
+
+
+def _remember(spans: dict, key: Any, span: Span):
+    if len(spans) >= _MAX_TRACKED_SPANS:
+        spans.pop(next(iter(spans)))
+    spans[key] = span
+
+
+class TracingPlugin(BasePlugin):
+    """
+    ADK plugin recording a span per invocation, agent run, model call and
+    tool call into ``tracer``.
+
+    Agent and tool spans become the parent of whatever starts inside them,
+    so the tree follows ``SequentialAgent``/``LoopAgent``/``ParallelAgent``
+    nesting and agent transfers. AgentTool runs its agent in a nested
+    Runner that inherits this plugin; that invocation is attached under
+    the tool call. When the outermost invocation ends its trace is written
+    to ``output_dir`` as ``<invocation_id>.json`` (Chrome trace / Perfetto).
+
+    Without the plugin nothing is recorded, so tracing costs nothing when
+    disabled (see ``create_tracing_plugins``).
+    """
+
+    def __init__(self, tracer: Tracer, output_dir: Optional[Path] = None):
+        super().__init__(name="tracing")
+        self.tracer = tracer
+        self.output_dir = output_dir
+        self._invocations: dict[str, Span] = {}
+        self._models: dict[tuple[str, str], Span] = {}
+        self._tools: dict[str, Span] = {}
+
+    async def before_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        parent = _current_span.get()
+        # ツールの中で始まった実行（AgentTool）だけを入れ子にする。
+        # それ以外は、前の実行が異常終了して残ったスパンなので親にしない
+        if parent is None or parent.category != "tool" or not parent.open:
+            parent = None
+        span = self.tracer.start(
+            f"invocation {invocation_context.agent.name}",
+            "invocation",
+            parent,
+            {
+                "invocation_id": invocation_context.invocation_id,
+                "session_id": invocation_context.session.id,
+                "user_id": invocation_context.user_id,
+            },
+        )
+        _remember(self._invocations, invocation_context.invocation_id, span)
+        _current_span.set(span)
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        span = self._invocations.pop(invocation_context.invocation_id, None)
+        if span is None:
+            return
+        self.tracer.end(span)
+        _current_span.set(span.parent)
+        if span.parent is None:
+            trace = self.tracer.finish(span)
+            if self.output_dir is not None:
+                path = self.output_dir / f"{_file_name(invocation_context.invocation_id)}.json"
+                await asyncio.to_thread(self.tracer.write, trace, path)
+                logger.info("Trace written to %s", path)
+
+    async def before_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> Optional[types.Content]:
+        span = self.tracer.start(
+            agent.name, "agent", _current_span.get(), {"agent_type": type(agent).__name__}
+        )
+        _current_span.set(span)
+        return None
+
+    async def after_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> Optional[types.Content]:
+        span = _current_span.get()
+        # 途中で失敗して閉じられなかった子のスパンを飛ばして、このエージェントのスパンを探す
+        while span is not None and not (span.category == "agent" and span.name == agent.name):
+            span = span.parent
+        if span is not None:
+            self.tracer.end(span)
+            _current_span.set(span.parent)
+        return None
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        span = self.tracer.start(f"model {llm_request.model or ''}".strip(), "model", _current_span.get())
+        _remember(self._models, (callback_context.invocation_id, callback_context.agent_name), span)
+        return None
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        # ストリーミング中の部分応答ではなく、最終応答で閉じる
+        if llm_response.partial:
+            return None
+        span = self._models.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if span is not None:
+            usage = llm_response.usage_metadata
+            self.tracer.end(
+                span,
+                {
+                    "prompt_tokens": usage.prompt_token_count,
+                    "output_tokens": usage.candidates_token_count,
+                }
+                if usage
+                else None,
+            )
+        return None
+
+    async def on_model_error_callback(
+        self,
+        *,
+        callback_context: CallbackContext,
+        llm_request: LlmRequest,
+        error: Exception,
+    ) -> Optional[LlmResponse]:
+        span = self._models.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if span is not None:
+            self.tracer.end(span, {"error": f"{type(error).__name__}: {error}"})
+        return None
+
+    async def before_tool_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        span = self.tracer.start(f"tool {tool.name}", "tool", _current_span.get())
+        _remember(self._tools, tool_context.function_call_id or tool.name, span)
+        _current_span.set(span)
+        return None
+
+    async def after_tool_callback(
+        self,
+        *,
+        tool: BaseTool,
+        tool_args: dict[str, Any],
+        tool_context: ToolContext,
+        result: dict,
+    ) -> Optional[dict]:
+        status = "error" if isinstance(result, dict) and result.get("status") == "ERROR" else "ok"
+        self._end_tool(tool, tool_context, {"status": status})
+        return None
+
+    async def on_tool_error_callback(
+        self,
+        *,
+        tool: BaseTool,
+        tool_args: dict[str, Any],
+        tool_context: ToolContext,
+        error: Exception,
+    ) -> Optional[dict]:
+        self._end_tool(tool, tool_context, {"status": "error", "error": f"{type(error).__name__}: {error}"})
+        return None
+
+    def _end_tool(self, tool: BaseTool, tool_context: ToolContext, args: dict[str, Any]):
+        span = self._tools.pop(tool_context.function_call_id or tool.name, None)
+        if span is None:
+            return
+        self.tracer.end(span, args)
+        if _current_span.get() is span:
+            _current_span.set(span.parent)
+
+
+def _file_name(invocation_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", invocation_id)
+
+
+@functools.cache
+def get_tracer(max_spans: int) -> Tracer:
+    """Tracer shared by the plugins of one process."""
+    return Tracer(max_spans)
+
+
+def create_tracing_plugins(config: Optional[TracingConfig] = None) -> list[BasePlugin]:
+    """Returns ``[TracingPlugin]`` when ``TRACE_ENABLED=1``, otherwise no plugins.
+
+    Args:
+        config: Tracing configuration. Read from the environment when omitted.
+
+    Returns:
+        list[BasePlugin]: Plugins to add to a Runner or App.
+    """
+    config = config or TracingConfig.from_env()
+    if not config.enabled:
+        return []
+    return [TracingPlugin(get_tracer(config.max_spans), Path(config.output_dir))]
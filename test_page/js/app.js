@@ -7,6 +7,9 @@ const userId = "user1";
 const sessionId = crypto.randomUUID();
 const send_url =
   "http://" + window.location.host + "/send/" + userId + "/" + sessionId;
+const resume_url =
+  "http://" + window.location.host + "/resume/" + userId + "/" + sessionId;
+const MAX_RESUME_ATTEMPTS = 5;
 
 
 const messageForm = document.getElementById("messageForm");
@@ -14,6 +17,8 @@ const messageInput = document.getElementById("message");
 const messagesDiv = document.getElementById("messages");
 const sendButton = document.getElementById("sendButton");
 let currentMessageId = null;
+let lastEventId = null;  // 最後に受信したSSEフレームのID（再接続時に送る）
+let turnCompleted = false;
 
 
 messageForm.onsubmit = function (e) {
@@ -35,6 +40,8 @@ messageForm.onsubmit = function (e) {
 
 
 async function sendMessage(message) {
+  turnCompleted = false;
+  let accepted = false;  // サーバーがターンを受け付けた（2xxで応答した）か
   try {
     const response = await fetch(send_url, {
       method: 'POST',
@@ -49,36 +56,73 @@ async function sendMessage(message) {
       return;
     }
 
-    const reader = response.body.getReader();
-    const decoder = new TextDecoder();
-    let buffer = '';  // SSEのチャンクを受け取る時、不完全な行を一時的に保持するバッファ
+    accepted = true;
+    await readEventStream(response);
+  } catch (error) {
+    console.error('Error sending message:', error);
+  }
+
+  // 受け付けられたターンの接続が完了前に切れた場合だけ、受信済みの位置から再開する。
+  // 拒否された（429など）場合に再開すると、同じセッションの別のターンの出力を受け取ってしまう
+  if (accepted && !turnCompleted) {
+    await resumeStream();
+  }
+}
 
-    while (true) {
-      const { done, value } = await reader.read();
 
-      if (done) {
-        break;
+async function resumeStream() {
+  for (let attempt = 1; attempt <= MAX_RESUME_ATTEMPTS && !turnCompleted; attempt++) {
+    await new Promise((resolve) => setTimeout(resolve, 500 * attempt));
+    console.log("[RESUME] attempt " + attempt + " from " + lastEventId);
+    try {
+      const headers = {};
+      if (lastEventId) {
+        headers['Last-Event-ID'] = lastEventId;
+      }
+      const response = await fetch(resume_url, { headers: headers });
+      if (response.status === 204) {
+        return;  // 再開できるストリームがない
       }
+      if (response.ok) {
+        await readEventStream(response);
+      }
+    } catch (error) {
+      console.error('Error resuming stream:', error);
+    }
+  }
+}
+
+
+async function readEventStream(response) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';  // SSEのチャンクを受け取る時、不完全な行を一時的に保持するバッファ
+
+  while (true) {
+    const { done, value } = await reader.read();
 
-      buffer += decoder.decode(value, { stream: true });
-      const lines = buffer.split('\n');
-      buffer = lines.pop(); 
-
-      for (const line of lines) {
-        if (line.startsWith('data: ')) {
-          const data = line.substring(6); // Remove 'data: ' prefix
-          try {
-            const message_from_server = JSON.parse(data);
-            console.log("[AGENT TO CLIENT] ", message_from_server);
-            handleServerMessage(message_from_server);
-          } catch (e) {
-            console.error('Error parsing SSE data:', e);
-          }
+    if (done) {
+      break;
+    }
+
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+
+    for (const line of lines) {
+      if (line.startsWith('id: ')) {
+        lastEventId = line.substring(4);
+      } else if (line.startsWith('data: ')) {
+        const data = line.substring(6); // Remove 'data: ' prefix
+        try {
+          const message_from_server = JSON.parse(data);
+          console.log("[AGENT TO CLIENT] ", message_from_server);
+          handleServerMessage(message_from_server);
+        } catch (e) {
+          console.error('Error parsing SSE data:', e);
         }
       }
     }
-  } catch (error) {
-    console.error('Error sending message:', error);
   }
 }
 
@@ -86,6 +130,7 @@ async function sendMessage(message) {
 function handleServerMessage(message_from_server) {
   if (message_from_server.turn_complete && message_from_server.turn_complete == true) {
     currentMessageId = null;
+    turnCompleted = true;
     return;
   }
 
@@ -102,6 +147,13 @@ function handleServerMessage(message_from_server) {
 
     scrollToBottom();
   }
+
+  // execute_sqlの全行はモデルを経由せずにチャンクで届く
+  if (message_from_server.mime_type == "application/vnd.query-result+json") {
+    appendResultRows(message_from_server);
+    currentMessageId = null;
+    scrollToBottom();
+  }
 }
 
 // Helper functions
@@ -123,6 +175,28 @@ function appendTextToMessage(messageId, text) {
   messageElement.innerHTML += htmlFormattedText;
 }
 
+function appendResultRows(message) {
+  let table = document.getElementById(message.result_handle);
+  if (table == null) {
+    table = document.createElement("table");
+    table.id = message.result_handle;
+    table.border = 1;
+    const header = table.insertRow();
+    for (const column of message.columns) {
+      const cell = document.createElement("th");
+      cell.textContent = column;
+      header.appendChild(cell);
+    }
+    messagesDiv.appendChild(table);
+  }
+  for (const row of message.rows) {
+    const tableRow = table.insertRow();
+    for (const column of message.columns) {
+      tableRow.insertCell().textContent = row[column];
+    }
+  }
+}
+
 function scrollToBottom() {
   messagesDiv.scrollTop = messagesDiv.scrollHeight;
 }
\ No newline at end of file